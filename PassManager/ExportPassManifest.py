@@ -0,0 +1,18 @@
+"""
+Export the enabled passes of a Katana script as JSONL render jobs, without
+opening the UI:
+
+    katana --script PassManager/ExportPassManifest.py shot.katana passes.jsonl
+
+See PassManager.v1.Manifest for the options.
+"""
+from __future__ import absolute_import
+
+import os
+import sys
+
+
+if __name__ == '__main__':
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from PassManager.v1 import Manifest
+    Manifest.Main(sys.argv[1:])
@@ -0,0 +1,271 @@
+from __future__ import absolute_import
+
+import fnmatch
+import logging
+import operator
+import re
+
+from .PassModel import DEFAULT_SETTINGS, PASS_ATTRIBUTE_NAMES, PassModelError, CoerceSetting
+from .PassEdits import PassEditQueue
+from .Instrumentation import Span, Count
+
+__all__ = [
+    'PassQuery',
+    'ParsePassQuery',
+    'FindPasses',
+    'BulkEdit',
+]
+
+log = logging.getLogger("PassManager.BulkEdit")
+
+_tokenPattern = re.compile(r'"[^"]*"|\'[^\']*\'|[<>!=~]=?|[^\s<>!=~]+')
+
+# Leading words that only make a query read like a sentence. 'pass' is also
+# a field, it is only skipped when a field or another filler follows it.
+_FILLER_WORDS = ('all', 'every', 'passes', 'pass', 'of')
+
+_OPERATORS = {
+    '=': operator.eq,
+    '==': operator.eq,
+    '!=': operator.ne,
+    '>': operator.gt,
+    '>=': operator.ge,
+    '<': operator.lt,
+    '<=': operator.le,
+    '~': None,
+}
+
+_TRUE_WORDS = ('1', 'true', 'yes', 'on')
+_FALSE_WORDS = ('0', 'false', 'no', 'off')
+
+
+def _FieldNames():
+    """Query field -> (field kind, record attribute or setting key)."""
+    fields = {
+        'node': ('node', None),
+        'type': ('record', 'passType'),
+        'name': ('record', 'name'),
+        'iteration': ('record', 'iteration'),
+        'enabled': ('record', 'enabled'),
+        'pass': ('record', 'fullName'),
+        'fullname': ('record', 'fullName'),
+    }
+    for key, attribute in PASS_ATTRIBUTE_NAMES.items():
+        fields[key.lower()] = ('setting', key)
+        fields[attribute.lower()] = ('setting', key)
+    return fields
+
+
+_FIELDS = _FieldNames()
+
+
+def _ParseValue(field, key, text):
+    if field == 'record' and key == 'enabled':
+        if text.lower() in _TRUE_WORDS:
+            return True
+        if text.lower() in _FALSE_WORDS:
+            return False
+        raise PassModelError("Expected true or false for 'enabled', got '%s'." % text)
+    if field == 'setting':
+        return CoerceSetting(key, text)
+    if field == 'record' and key == 'iteration':
+        try:
+            return int(text)
+        except ValueError:
+            raise PassModelError("Expected a number for '%s', got '%s'." % (key, text))
+    return text
+
+
+class _Condition(object):
+    __slots__ = ('field', 'key', 'op', 'value')
+
+    def __init__(self, field, key, op, value):
+        self.field = field
+        self.key = key
+        self.op = op
+        self.value = value
+
+    def matches(self, node, record, settings):
+        if self.field == 'node':
+            actual = node.getName()
+        elif self.field == 'record':
+            actual = getattr(record, self.key)
+        else:
+            actual = settings.get(self.key, DEFAULT_SETTINGS[self.key])
+        if self.op == '~' or (self.op in ('=', '==') and isinstance(self.value, str)
+                              and any(c in self.value for c in '*?[')):
+            return fnmatch.fnmatchcase(str(actual), str(self.value))
+        try:
+            return _OPERATORS[self.op](actual, self.value)
+        except TypeError:
+            return False
+
+
+class PassQuery(object):
+    """
+    A parsed pass query: conditions joined by 'where' or 'and', all of which
+    must hold. A condition is 'field op value' or 'field value' for
+    equality, and string values may be glob patterns:
+
+        type rfl where iteration > 2
+        all passes of type shdw
+        node PassManager1 and camera ~ /root/world/cam/* and enabled = true
+
+    Fields are node, type, name, iteration, enabled, pass and every pass
+    setting, by setting or attribute name (camera, denoise, visible...).
+    Settings are compared after inheritance, see Inheritance.SettingsResolver.
+    An empty query matches every pass.
+    """
+
+    def __init__(self, text):
+        self.text = text
+        self.__conditions = self.__parse(text)
+
+    def __str__(self):
+        return self.text
+
+    def usesSettings(self):
+        return any(condition.field == 'setting' for condition in self.__conditions)
+
+    def __equalities(self, field, key):
+        """Return the values an exact equality on a field limits the query to, or None."""
+        values = None
+        for condition in self.__conditions:
+            if condition.field == field and condition.key == key \
+                    and condition.op in ('=', '==') and isinstance(condition.value, str) \
+                    and not any(c in condition.value for c in '*?['):
+                values = {condition.value} if values is None else values & {condition.value}
+        return values
+
+    def nodeNames(self):
+        """Return the node names an equality on 'node' limits the query to, or None."""
+        return self.__equalities('node', None)
+
+    def candidates(self, passModel):
+        """
+        Return the passes of passModel the query may match. Equalities on
+        pass, type and name are looked up in the model's indexes, other
+        queries get every pass.
+        """
+        fullNames = self.__equalities('record', 'fullName')
+        if fullNames is not None:
+            return [record for record in map(passModel.getPass, sorted(fullNames))
+                    if record is not None]
+        passTypes = self.__equalities('record', 'passType')
+        if passTypes is None:
+            return passModel
+        names = self.__equalities('record', 'name')
+        if names is None:
+            return [record for passType in sorted(passTypes)
+                    for record in passModel.passesOfType(passType)]
+        return [record for passType in sorted(passTypes) for name in sorted(names)
+                for record in passModel.passesOf(passType, name)]
+
+    def matches(self, node, record, settings=None):
+        return all(condition.matches(node, record, settings or record.settings)
+                   for condition in self.__conditions)
+
+    @staticmethod
+    def __parse(text):
+        tokens = [token[1:-1] if token[:1] in '"\'' else token
+                  for token in _tokenPattern.findall(text or '')]
+        while len(tokens) > 1 and tokens[0].lower() in _FILLER_WORDS and \
+                (tokens[1].lower() in _FILLER_WORDS or tokens[1].lower() in _FIELDS):
+            tokens.pop(0)
+
+        conditions = []
+        clause = []
+        for token in tokens + ['and']:
+            if token.lower() in ('where', 'and'):
+                if clause:
+                    conditions.append(PassQuery.__parseClause(clause, text))
+                clause = []
+            else:
+                clause.append(token)
+        return conditions
+
+    @staticmethod
+    def __parseClause(clause, text):
+        if len(clause) == 2:
+            clause = [clause[0], '=', clause[1]]
+        if len(clause) != 3 or clause[1] not in _OPERATORS:
+            raise PassModelError("Cannot read '%s' in query '%s', expected "
+                                 "'field operator value'." % (' '.join(clause), text))
+        name, op, value = clause
+        try:
+            field, key = _FIELDS[name.lower()]
+        except KeyError:
+            raise PassModelError("Unknown field '%s' in query '%s', expected one of %s."
+                                 % (name, text, ', '.join(sorted(_FIELDS))))
+        return _Condition(field, key, op, _ParseValue(field, key, value))
+
+
+def ParsePassQuery(query):
+    """Return query as a PassQuery, parsing it if it is a string."""
+    return query if isinstance(query, PassQuery) else PassQuery(query)
+
+
+def FindPasses(query, nodes=None):
+    """
+    Return (node, record) for every pass of the live PassManager nodes, or of
+    the given nodes, that matches query.
+    """
+    query = ParsePassQuery(query)
+    if nodes is None:
+        from .Registry import GetPassManagerNodes
+        nodes = GetPassManagerNodes()
+    names = query.nodeNames()
+    matches = []
+    for node in nodes:
+        if names is not None and node.getName() not in names:
+            continue
+        resolver = node.getSettingsResolver() if query.usesSettings() else None
+        for record in query.candidates(node.getPassModel()):
+            settings = resolver.settings(record) if resolver is not None else None
+            if query.matches(node, record, settings):
+                matches.append((node, record))
+    return matches
+
+
+def BulkEdit(query, nodes=None, enabled=None, **settings):
+    """
+    Set enabled and/or settings on every pass matching query, see PassQuery.
+    All nodes are edited in one undo group and each node updates its network
+    once. Returns {node name: number of passes edited}.
+    """
+    import Utils
+
+    unknown = set(settings) - set(DEFAULT_SETTINGS)
+    if unknown:
+        raise PassModelError("Unknown pass settings: %s." % ', '.join(sorted(unknown)))
+    settings = {key: CoerceSetting(key, value) for key, value in settings.items()}
+    query = ParsePassQuery(query)
+
+    with Span('bulkEdit', log, query=str(query)):
+        queues = {}
+        for node, record in FindPasses(query, nodes):
+            # Passes already holding the values are left out of the undo group
+            if (enabled is None or record.enabled == bool(enabled)) and \
+                    all(record.settings.get(key) == value for key, value in settings.items()):
+                continue
+            queue = queues.get(node)
+            if queue is None:
+                queue = queues[node] = PassEditQueue()
+            if enabled is not None:
+                queue.setEnabled(record, enabled)
+            if settings:
+                queue.updateSettings(record, **settings)
+
+        report = {}
+        if not queues:
+            return report
+        Utils.UndoStack.OpenGroup('Bulk Edit Passes: %s' % query)
+        try:
+            for node, queue in queues.items():
+                report[node.getName()] = node.applyPassEdits(queue.take())
+        finally:
+            Utils.UndoStack.CloseGroup()
+    Count('bulkEdit.passes', sum(report.values()))
+    log.info('Bulk edit "%s" changed %d passes on %d nodes',
+             query, sum(report.values()), len(report))
+    return report
@@ -0,0 +1,130 @@
+from __future__ import absolute_import
+
+import logging
+import re
+import threading
+from collections import OrderedDict
+
+from .PassModel import DEFAULT_SETTINGS
+
+__all__ = [
+    'CelResolutionCache',
+    'GetSharedCelCache',
+    'NormalizeCel',
+    'COLLECTION_SETTINGS',
+]
+
+log = logging.getLogger("PassManager.CelCache")
+
+# Pass settings holding CEL collections
+COLLECTION_SETTINGS = ('VisibilityON', 'VisibilityOFF', 'Holdout', 'Prune')
+
+EMPTY_CELS = ('', '(())', '()')
+
+_whitespace = re.compile(r'\s+')
+
+
+def NormalizeCel(expression):
+    """
+    Return a canonical form of a CEL expression so equivalent spellings share
+    a cache entry: whitespace is collapsed and the terms of a plain path list
+    such as '((/root/b /root/a))' are sorted and de-duplicated.
+    """
+    expression = _whitespace.sub(' ', (expression or '').strip())
+    if expression in EMPTY_CELS:
+        return ''
+    if expression.startswith('((') and expression.endswith('))'):
+        body = expression[2:-2].strip()
+        if body and not any(c in body for c in '()+-^'):
+            return '((%s))' % ' '.join(sorted(set(body.split(' '))))
+    return expression
+
+
+class CelResolutionCache(object):
+    """
+    LRU cache of resolved CEL expressions.
+
+    Entries are keyed by the normalized expression and a hash of the scene it
+    was resolved against, and hold a sorted tuple of matching locations so
+    passes sharing an expression also share the result.
+    """
+
+    def __init__(self, maxSize=256):
+        self.__maxSize = maxSize
+        self.__entries = OrderedDict()
+        self.__lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.__entries)
+
+    def clear(self):
+        with self.__lock:
+            self.__entries.clear()
+
+    def peek(self, expression, sceneHash):
+        """Return the cached locations for an expression, or None if unresolved."""
+        normalized = NormalizeCel(expression)
+        if not normalized:
+            return ()
+        with self.__lock:
+            locations = self.__entries.get((normalized, sceneHash))
+            if locations is not None:
+                self.__entries.move_to_end((normalized, sceneHash))
+            return locations
+
+    def resolve(self, expression, sceneHash, resolver):
+        """
+        Return the sorted locations matched by expression, calling
+        resolver(normalizedExpression) only when the result is not cached.
+        """
+        normalized = NormalizeCel(expression)
+        if not normalized:
+            return ()
+        key = (normalized, sceneHash)
+        with self.__lock:
+            locations = self.__entries.get(key)
+            if locations is not None:
+                self.__entries.move_to_end(key)
+                self.hits += 1
+                return locations
+            self.misses += 1
+        locations = tuple(sorted(set(resolver(normalized))))
+        with self.__lock:
+            self.__entries[key] = locations
+            while len(self.__entries) > self.__maxSize:
+                self.__entries.popitem(last=False)
+        return locations
+
+    def resolvePass(self, record, sceneHash, resolver, settings=None):
+        """
+        Return {setting: locations} for the four collections of a pass, from
+        its own settings or the given effective ones.
+        """
+        if settings is None:
+            settings = record.settings
+        return {key: self.resolve(settings.get(key, DEFAULT_SETTINGS[key]),
+                                  sceneHash, resolver)
+                for key in COLLECTION_SETTINGS}
+
+    def matchCounts(self, record, sceneHash, settings=None):
+        """Return {setting: match count or None} using only cached results."""
+        if settings is None:
+            settings = record.settings
+        counts = {}
+        for key in COLLECTION_SETTINGS:
+            locations = self.peek(settings.get(key, DEFAULT_SETTINGS[key]), sceneHash)
+            counts[key] = None if locations is None else len(locations)
+        return counts
+
+
+_sharedCache = None
+
+
+def GetSharedCelCache():
+    """Return the session-wide cache shared by every PassManager node."""
+    global _sharedCache
+    if _sharedCache is None:
+        _sharedCache = CelResolutionCache()
+    return _sharedCache
@@ -0,0 +1,99 @@
+from __future__ import absolute_import
+
+import logging
+import time
+
+from .PassModel import PASS_LOCATION_ROOT, PassModelError, ParsePassName
+
+__all__ = ['PassDiscovery']
+
+log = logging.getLogger("PassManager.Discovery")
+
+
+class PassDiscovery(object):
+    """
+    Finds the passes that already exist in the incoming scene a slice at a
+    time, so traversing a heavy scene never blocks the UI for long.
+
+    The provider cooks locations through Geolib, which must only be called
+    from the UI thread, so the work happens inside ``takeBatches``: each
+    call cooks pass locations for at most timeSlice seconds and returns the
+    batches of (fullName, settings) tuples found so far. The UI calls it
+    from a timer; with timeSlice None one call cooks everything. ``cancel``
+    stops the traversal before the next location.
+    """
+
+    def __init__(self, provider, root=PASS_LOCATION_ROOT, batchSize=64, timeSlice=0.008):
+        self.__provider = provider
+        self.__root = root.rstrip('/')
+        self.__batchSize = batchSize
+        self.__timeSlice = timeSlice
+        self.__names = None
+        self.__batch = []
+        self.__cancelled = False
+        self.error = None
+        self.count = 0
+
+    def start(self):
+        """Read the children of the pass root, the passes are cooked by takeBatches."""
+        try:
+            self.__provider.prepare()
+            self.__names = iter(self.__provider.listChildren(self.__root))
+        except Exception as exception:
+            self.__fail(exception)
+
+    def cancel(self):
+        self.__cancelled = True
+
+    def isCancelled(self):
+        return self.__cancelled
+
+    def isFinished(self):
+        """True once every location was cooked and every batch has been taken."""
+        return self.__names is None and not self.__batch
+
+    def wait(self, timeout=None):
+        """Cook every remaining location now, without a time limit."""
+        self.__cook(None)
+
+    def takeBatches(self):
+        """Cook locations for one time slice and return the batches found since the last call."""
+        return self.__cook(self.__timeSlice)
+
+    def __fail(self, exception):
+        self.error = exception
+        self.__names = None
+        log.error('Error discovering passes under "%s"', self.__root,
+                  exc_info=exception)
+
+    def __cook(self, timeSlice):
+        batches = []
+        deadline = time.perf_counter() + timeSlice if timeSlice is not None else None
+        try:
+            while self.__names is not None and not self.__cancelled:
+                name = next(self.__names, None)
+                if name is None:
+                    self.__names = None
+                    break
+                try:
+                    ParsePassName(name)
+                except PassModelError:
+                    log.debug('Skipping "%s/%s", not a pass name', self.__root, name)
+                    continue
+                settings = self.__provider.getPassSettings(self.__root + '/' + name)
+                self.__batch.append((name, settings))
+                self.count += 1
+                if len(self.__batch) >= self.__batchSize:
+                    batches.append(self.__batch)
+                    self.__batch = []
+                if deadline is not None and time.perf_counter() >= deadline:
+                    break
+        except Exception as exception:
+            self.__fail(exception)
+        if self.__cancelled:
+            self.__names = None
+            self.__batch = []
+        elif self.__names is None and self.__batch:
+            batches.append(self.__batch)
+            self.__batch = []
+        return batches
@@ -1,3 +1,5 @@
+import logging
+
 from PyQt5 import (
     QtCore,
     QtWidgets,
@@ -8,15 +10,75 @@ from Katana import (
     UI4,
     NodegraphAPI,
 )
-from functools import partial
 from . import ScriptActions as SA
 from . import EditorResources as resources
+from .PassModel import PassModel, PassModelError, FormatPassName, ParsePassName
+from .PassTreeModel import PassTreeModel, PassFilterProxyModel
+from .SearchIndex import PassSearchIndex
+from .Presets import GetPresetLibrary
+from .CelCache import GetSharedCelCache
+from .SceneGraph import KatanaSceneGraphProvider
+from .Discovery import PassDiscovery
+from .PassEdits import PassEditQueue
+from .Validation import PassValidator, CheckPassName, ERROR
+from .Instrumentation import Span, Count
+
+log = logging.getLogger("PassManager.Editor")
+
+# Editor edits are written to the node this long after the last one, 0
+# writes them on the next event loop iteration
+EDIT_DEBOUNCE_MS = 0
+
+# Passes are validated again this long after the last edit
+VALIDATION_DELAY_MS = 250
+
+# Name rows are expanded in tree order until this many passes are shown, the
+# rest stay collapsed as the view lays out every row of an expanded name
+EXPAND_PASS_LIMIT = 500
 
 class PassManagerEditor(QtWidgets.QWidget):
     def __init__(self, parent, node):
         super().__init__(parent)
+        with Span('editor.populate', log, passes=len(node.getPassModel())):
+            self.__build(node)
+
+    def __build(self, node):
+        """Create the widgets and the tree model over the node's passes."""
         self.__node = node
+        self.__passModel = node.getPassModel()
         self.__showIncomeSceneChecked = False
+        self.__sceneGraph = KatanaSceneGraphProvider(node)
+        self.__celCache = GetSharedCelCache()
+        self.__incomingModel = None
+        self.__searchIndex = PassSearchIndex(self.__passModel)
+        self.__incomingSearchIndex = None
+        self.__discovery = None
+        self.__discoveryTimer = QtCore.QTimer(self)
+        self.__discoveryTimer.setInterval(30)
+        self.__discoveryTimer.timeout.connect(self.__onDiscoveryTimeout)
+        self.__editQueue = PassEditQueue()
+        self.__editTimer = QtCore.QTimer(self)
+        self.__editTimer.setSingleShot(True)
+        self.__editTimer.setInterval(EDIT_DEBOUNCE_MS)
+        self.__editTimer.timeout.connect(self.__flushEdits)
+        # Filters again once pending model changes reached the search index
+        self.__filterTimer = QtCore.QTimer(self)
+        self.__filterTimer.setSingleShot(True)
+        self.__filterTimer.setInterval(0)
+        self.__filterTimer.timeout.connect(self.__applyFilter)
+        self.__filtering = False
+        # Validation runs on a thread pool, its results are polled like discovery's
+        self.__validator = PassValidator(self.__passModel, node.getSettingsResolver(),
+                                         self.__sceneGraph, self.__celCache)
+        self.__validation = None
+        self.__issues = {}
+        self.__validationDelayTimer = QtCore.QTimer(self)
+        self.__validationDelayTimer.setSingleShot(True)
+        self.__validationDelayTimer.setInterval(VALIDATION_DELAY_MS)
+        self.__validationDelayTimer.timeout.connect(self.__startValidation)
+        self.__validationTimer = QtCore.QTimer(self)
+        self.__validationTimer.setInterval(30)
+        self.__validationTimer.timeout.connect(self.__onValidationTimeout)
         self.setLayout(QtWidgets.QVBoxLayout())
 
         # Toolbar layout
@@ -28,8 +90,8 @@ class PassManagerEditor(QtWidgets.QWidget):
         self.__addButton = UI4.Widgets.ToolbarButton(
             toolTip='Add Pass', 
             parent=self,
-            normalPixmap=UI4.Util.IconManager.GetPixmap(resources.Icons.plus_icon),
-            rolloverPixmap=UI4.Util.IconManager.GetPixmap(resources.Icons.plus_icon_rollover)
+            normalPixmap=resources.GetPixmap(resources.Icons.plus_icon),
+            rolloverPixmap=resources.GetPixmap(resources.Icons.plus_icon_rollover)
         )
         self.__addButton.clicked.connect(self.__onAddButtonClicked)
         self.__toolbarLayout.addWidget(self.__addButton, alignment=QtCore.Qt.AlignLeft)
@@ -41,32 +103,49 @@ class PassManagerEditor(QtWidgets.QWidget):
         self.__showIncomeSceneButton = UI4.Widgets.ToolbarButton(
             toolTip="Show Income Scene",
             parent=self,
-            normalPixmap=UI4.Util.IconManager.GetPixmap(resources.Icons.gear_icon),
-            rolloverPixmap=UI4.Util.IconManager.GetPixmap(resources.Icons.gear_icon_rollover)
+            normalPixmap=resources.GetPixmap(resources.Icons.gear_icon),
+            rolloverPixmap=resources.GetPixmap(resources.Icons.gear_icon_rollover)
         )
         self.__showIncomeSceneButton.mousePressEvent = self.__onShowIncomeSceneButtonClicked
         self.__toolbarLayout.addWidget(self.__showIncomeSceneButton, alignment=QtCore.Qt.AlignRight)
 
-        # Tree widget
-        self.__treeWidget = QtWidgets.QTreeWidget(self)
-        self.__treeWidget.setHeaderLabels(['Name', 'Enable'])
-        self.__treeWidget.setSelectionMode(QtWidgets.QTreeWidget.SingleSelection)
-        self.__treeWidget.setAllColumnsShowFocus(True)
-        self.__treeWidget.setRootIsDecorated(True)
-        self.__treeWidget.setSortingEnabled(True)
+        # Tree view, rows are kept sorted by the model itself
+        self.__treeModel = PassTreeModel(self.__passModel, self)
+        self.__treeModel.setToolTipProvider(self.__passToolTip)
+        self.__treeModel.setCheckHandler(self.__onPassChecked, self.__editQueue)
+        self.__treeModel.setBadgeProvider(self.__passBadge)
+        self.__passModel.addListener(self.__onPassModelChanged)
+
+        # Filter box, each keystroke only changes which rows the proxy shows
+        self.__filterModel = PassFilterProxyModel(self)
+        self.__filterModel.setSourceModel(self.__treeModel)
+        self.__filterModel.rowsInserted.connect(self.__onRowsInserted)
+        self.__filterModel.modelReset.connect(self.__onModelReset)
+        self.__filterLineEdit = QtWidgets.QLineEdit(self)
+        self.__filterLineEdit.setPlaceholderText('Filter passes')
+        self.__filterLineEdit.setClearButtonEnabled(True)
+        self.__filterLineEdit.textChanged.connect(self.__applyFilter)
+        self.layout().addWidget(self.__filterLineEdit)
+
+        self.__treeView = QtWidgets.QTreeView(self)
+        self.__treeView.setModel(self.__filterModel)
+        self.__treeView.setSelectionMode(QtWidgets.QTreeView.SingleSelection)
+        self.__treeView.setAllColumnsShowFocus(True)
+        self.__treeView.setRootIsDecorated(True)
+        self.__treeView.setUniformRowHeights(True)
 
         # Set specific column widths
-        self.__treeWidget.header().setSectionResizeMode(0, QtWidgets.QHeaderView.Interactive)
-        self.__treeWidget.header().resizeSection(0, 200)
-        self.__treeWidget.header().setSectionResizeMode(1, QtWidgets.QHeaderView.Interactive)
-        self.__treeWidget.header().resizeSection(1, 50)
+        self.__treeView.header().setSectionResizeMode(0, QtWidgets.QHeaderView.Interactive)
+        self.__treeView.header().resizeSection(0, 200)
+        self.__treeView.header().setSectionResizeMode(1, QtWidgets.QHeaderView.Interactive)
+        self.__treeView.header().resizeSection(1, 50)
 
         # Connect the context menu event
-        self.__treeWidget.setContextMenuPolicy(QtCore.Qt.CustomContextMenu)
-        self.__treeWidget.customContextMenuRequested.connect(self.__onTreeItemContextMenu)
+        self.__treeView.setContextMenuPolicy(QtCore.Qt.CustomContextMenu)
+        self.__treeView.customContextMenuRequested.connect(self.__onTreeItemContextMenu)
 
-        self.layout().addWidget(self.__treeWidget)
-        self.layout().addWidget(UI4.Widgets.VBoxLayoutResizer(self.__treeWidget, 120))
+        self.layout().addWidget(self.__treeView)
+        self.layout().addWidget(UI4.Widgets.VBoxLayoutResizer(self.__treeView, 120))
         self.layout().addSpacing(1)
 
         self.__parameterWidgetLayout = QtWidgets.QVBoxLayout()
@@ -74,73 +153,159 @@ class PassManagerEditor(QtWidgets.QWidget):
 
         self.layout().addStretch()
 
-    def __addRow(self, root_name, child_name=None, grandchild_name=None, enable_state=True):
-        """Add a row to the tree widget with support for up to 3 levels of hierarchy."""
-        # Ensure root_name is valid
-        if not isinstance(root_name, str):
-            raise TypeError("root_name must be a string")
-
-        # Find or create the root item
-        root_item = self.__findOrCreateItem(self.__treeWidget.invisibleRootItem(), root_name)
-        root_item.setExpanded(True)
-        if child_name:
-            # Ensure child_name is valid
-            if not isinstance(child_name, str):
-                raise TypeError("child_name must be a string")
-            # Find or create the child item under the root
-            child_item = self.__findOrCreateItem(root_item, child_name)
-            child_item.setExpanded(True)
-            if grandchild_name:
-                # Ensure grandchild_name is valid
-                if not isinstance(grandchild_name, str):
-                    raise TypeError("grandchild_name must be a string")
-                # Create the grandchild item under the child
-                grandchild_item = QtWidgets.QTreeWidgetItem(child_item, [grandchild_name])
-                grandchild_item.setExpanded(True)
-                self.__addCheckbox(grandchild_item, enable_state)
+        self.__expandRows()
+        self.__validationDelayTimer.start()
+
+    def setEditDebounce(self, milliseconds):
+        """Wait this long after the last edit before writing edits to the node."""
+        self.__editTimer.setInterval(milliseconds)
+
+    def __onPassChecked(self, record, enabled):
+        """Queue a checkbox change, see __flushEdits."""
+        self.__editQueue.setEnabled(record, enabled)
+        self.__editTimer.start()
+
+    def __flushEdits(self):
+        """
+        Write the queued edits to the node in one undo group. Repeated edits
+        of a pass were already collapsed by the queue.
+        """
+        self.__editTimer.stop()
+        edits = self.__editQueue.take()
+        if edits:
+            self.__node.applyPassEdits(edits)
+
+    def __applyFilter(self):
+        """Show only the passes matching the filter box."""
+        self.__filterTimer.stop()
+        query = self.__filterLineEdit.text()
+        # Spans the whole keystroke, the view's expansion included
+        with Span('editor.filter', log):
+            records = self.__searchIndex.search(query)
+            incomingRecords = None
+            if records is not None and self.__incomingSearchIndex is not None:
+                incomingRecords = self.__incomingSearchIndex.search(query)
+            self.__filtering = True
+            try:
+                self.__filterModel.setMatches(records, incomingRecords)
+            finally:
+                self.__filtering = False
+            self.__expandRows()
+
+    def __expandRows(self):
+        """
+        Expand every type row and, in tree order, the name rows of the first
+        EXPAND_PASS_LIMIT passes shown, collapsing the others. Only type and
+        name rows are visited, unlike expandAll, which walks every pass row.
+        """
+        view = self.__treeView
+        shown = 0
+        for key, count in self.__filterModel.passCounts():
+            index = self.__filterModel.mapFromSource(self.__treeModel.indexForKey(key))
+            if not index.isValid():
+                continue
+            if not view.isExpanded(index.parent()):
+                view.expand(index.parent())
+            shown += count
+            expanded = shown <= EXPAND_PASS_LIMIT
+            if view.isExpanded(index) != expanded:
+                view.setExpanded(index, expanded)
+
+    def __onPassModelChanged(self, event, record, oldFullName):
+        """Filter again after passes were added, renamed or deleted, and validate."""
+        if self.__filterModel.isFiltering() and event != PassModel.CHANGED:
+            self.__filterTimer.start()
+        self.__validationDelayTimer.start()
+
+    def __startValidation(self):
+        """Check the passes edited since the last validation, on the validator's threads."""
+        if self.__validation is not None:
+            self.__validation.cancel()
+        self.__validation = self.__validator.start()
+        self.__validationTimer.start()
+
+    def __stopValidation(self):
+        self.__validationDelayTimer.stop()
+        self.__validationTimer.stop()
+        if self.__validation is not None:
+            self.__validation.cancel()
+            self.__validation = None
+
+    def __onValidationTimeout(self):
+        """Update the badges of the passes whose issues changed."""
+        validation = self.__validation
+        if validation is None:
+            self.__validationTimer.stop()
+            return
+        for id, issues in validation.takeResults():
+            if issues:
+                self.__issues[id] = issues
             else:
-                # If only a child item is specified
-                self.__addCheckbox(child_item, enable_state)
-        else:
-            # If only a root item is specified
-            self.__addCheckbox(root_item, enable_state)
-
-    def __findOrCreateItem(self, parent, name):
-        """Find an existing item with the given name or create it."""
-        for i in range(parent.childCount()):
-            child = parent.child(i)
-            if child.text(0) == name:
-                return child
-        # If the item doesn't exist, create it
-        item = QtWidgets.QTreeWidgetItem(parent, [name])  # Ensure `name` is a string
-        return item
-
-    def __addCheckbox(self, item, enable_state):
-        """Add a checkbox to the specified item."""
-        checkbox = QtWidgets.QCheckBox()
-        checkbox.setChecked(enable_state)
-        checkbox.stateChanged.connect(partial(self.__onCheckboxChanged, item.text(0)))
-        self.__treeWidget.setItemWidget(item, 1, checkbox)
-
-
-    def __onCheckboxChanged(self, name, state):
-        """Handle changes to the checkbox state."""
-        print(f"Checkbox for '{name}' changed to {'Checked' if state == QtCore.Qt.Checked else 'Unchecked'}")
+                self.__issues.pop(id, None)
+            record = self.__passModel.getPassById(id)
+            if record is not None:
+                self.__treeModel.refreshPass(record)
+        if validation.isFinished():
+            self.__validationTimer.stop()
+            self.__validation = None
+            Count('editor.validatedPasses', validation.checked)
+
+    def __passBadge(self, record):
+        """Show an error or warning badge on passes with validation issues."""
+        issues = self.__issues.get(record.id)
+        if not issues:
+            return None
+        if any(issue.severity == ERROR for issue in issues):
+            return resources.GetPixmap(resources.Icons.error_badge)
+        return resources.GetPixmap(resources.Icons.warning_badge)
+
+    def __onRowsInserted(self, parent, first, last):
+        """Expand the type and name rows that lead to newly inserted passes."""
+        # Rows the filter shows again keep their expansion, see __expandRows
+        if self.__filtering:
+            return
+        if parent.isValid() and parent.parent().isValid():
+            self.__treeView.expand(parent.parent())
+            self.__treeView.expand(parent)
+
+    def __onModelReset(self):
+        """Expand the tree again after a batched update replaced it."""
+        self.__expandRows()
+
+    def __effectiveSettings(self, record):
+        """Return the inherited settings of the node's own passes, None for incoming ones."""
+        if self.__passModel.getPass(record.fullName) is not record:
+            return None
+        return self.__node.getSettingsResolver().settings(record)
+
+    def __passToolTip(self, record):
+        """Show collection match counts already resolved by the shared CEL cache."""
+        counts = self.__celCache.matchCounts(record, self.__sceneGraph.sceneHash(),
+                                             self.__effectiveSettings(record))
+        lines = [record.fullName]
+        for key, count in counts.items():
+            lines.append(f"{key}: {'?' if count is None else count}")
+        if self.__passModel.getPass(record.fullName) is record:
+            for issue in self.__issues.get(record.id, ()):
+                lines.append(f"{issue.severity.capitalize()}: {issue.message}")
+        return '\n'.join(lines)
 
     def __onAddButtonClicked(self):
         """Handle the 'Add Pass' button click."""
-        dialog = AddPassDialog(self)
+        presets = GetPresetLibrary()
+        presets.refresh()
+        dialog = AddPassDialog(self, presets.types(), presets.names())
         if dialog.exec_() == QtWidgets.QDialog.Accepted:
             name = dialog.getName()
-            # Extract the hierarchy from the name (e.g., split by underscores)
-            parts = name.split('_')  # Assuming format like "root_child_grandchild"
-            root_name = parts[0]
-            child_name = parts[1] if len(parts) > 1 else None
-            grandchild_name = name
-
-            # Add the row with the parsed hierarchy
-            self.__addRow(root_name, child_name, grandchild_name, enable_state=True)
-            print(f"Added new row: {name}")
+            self.__flushEdits()
+            try:
+                with Span('editor.add', log):
+                    # Presets reach the pass through the node's settings resolver
+                    self.__node.addPasses([name])
+            except PassModelError as exception:
+                log.warning(str(exception))
+                return
+            log.debug("Added new row: %s", name)
 
     def __onShowIncomeSceneButtonClicked(self, event):
         """Show context menu with a checkbox for the 'Show Income Scene' button."""
@@ -150,38 +315,122 @@ class PassManagerEditor(QtWidgets.QWidget):
             # Add checkbox action to the menu
             show_income_scene_action = QtWidgets.QAction("Show Income Scene", self)
             show_income_scene_action.setCheckable(True)
-            show_income_scene_action.setChecked(False)  # Initial state
+            show_income_scene_action.setChecked(self.__showIncomeSceneChecked)
             show_income_scene_action.triggered.connect(self.__onShowIncomeSceneChecked)
 
-            # Add the action to the menu and display it
+            # Bulk import of passes from a file
+            import_action = QtWidgets.QAction("Import Passes...", self)
+            import_action.triggered.connect(self.__onImportPasses)
+
+            # Add the actions to the menu and display it
             menu.addAction(show_income_scene_action)
+            menu.addSeparator()
+            menu.addAction(import_action)
             menu.exec_(self.__showIncomeSceneButton.mapToGlobal(event.pos()))
 
     def __onShowIncomeSceneChecked(self, checked):
         """Handle the 'Show Income Scene' checkbox toggle."""
         self.__showIncomeSceneChecked = checked
-        print(f"'Show Income Scene' checkbox set to: {'Checked' if checked else 'Unchecked'}")
+        log.debug("'Show Income Scene' checkbox set to: %s", 'Checked' if checked else 'Unchecked')
+        self.__stopDiscovery()
+        if checked:
+            self.__incomingModel = PassModel()
+            self.__incomingSearchIndex = PassSearchIndex(self.__incomingModel)
+            self.__incomingModel.addListener(self.__onPassModelChanged)
+            self.__treeModel.setIncomingModel(self.__incomingModel)
+            self.__discovery = PassDiscovery(self.__sceneGraph)
+            self.__discovery.start()
+            self.__discoveryTimer.start()
+        else:
+            self.__incomingModel = None
+            self.__incomingSearchIndex = None
+            self.__treeModel.setIncomingModel(None)
+        self.__applyFilter()
+
+    def __stopDiscovery(self):
+        """Cancel a running discovery of incoming passes."""
+        self.__discoveryTimer.stop()
+        if self.__discovery is not None:
+            self.__discovery.cancel()
+            self.__discovery = None
+
+    def __onDiscoveryTimeout(self):
+        """Cook the next slice of incoming passes and move them into the tree."""
+        discovery = self.__discovery
+        if discovery is None:
+            self.__discoveryTimer.stop()
+            return
+        batches = discovery.takeBatches()
+        if batches:
+            incomingModel = self.__incomingModel
+            with Span('editor.discoveryBatch', log, batches=len(batches)), incomingModel.batch():
+                for batch in batches:
+                    for name, settings in batch:
+                        try:
+                            # Compare by key, 'bty_char_1' is the pass 'bty_char_01'
+                            passType, passName, iteration = ParsePassName(name)
+                            if incomingModel.isIterationFree(passType, passName, iteration):
+                                incomingModel.addPass(passType, passName, iteration,
+                                                      settings=settings)
+                        except PassModelError as exception:
+                            log.warning("Skipping incoming pass '%s': %s", name, exception)
+        if discovery.isFinished():
+            self.__discoveryTimer.stop()
+            self.__discovery = None
+            Count('editor.discoveredPasses', discovery.count)
+            log.info("Found %d passes in the incoming scene", discovery.count)
+
+    def showEvent(self, event):
+        """Catch up on edits made while the editor was hidden."""
+        super().showEvent(event)
+        self.__validationDelayTimer.start()
+
+    def hideEvent(self, event):
+        """Stop traversing the incoming scene once the editor goes away."""
+        self.__flushEdits()
+        self.__stopDiscovery()
+        self.__stopValidation()
+        super().hideEvent(event)
+
+    def __onImportPasses(self):
+        """Add every pass described in a JSON or CSV file in one undo step."""
+        path, _ = QtWidgets.QFileDialog.getOpenFileName(
+            self, "Import Passes", "", "Pass Files (*.json *.csv)")
+        if not path:
+            return
+        self.__flushEdits()
+        try:
+            with Span('editor.import', log):
+                records = self.__node.importPasses(path)
+        except (PassModelError, OSError, ValueError) as exception:
+            log.error("Could not import passes from '%s': %s", path, exception)
+            return
+        log.info("Imported %d passes from '%s'", len(records), path)
 
     def __onTreeItemContextMenu(self, position):
         """Display a context menu for the tree widget items."""
-        item = self.__treeWidget.itemAt(position)
-        if item is not None:
+        item = self.__filterModel.mapToSource(self.__treeView.indexAt(position))
+        if item.isValid():
             menu = QtWidgets.QMenu(self)
 
-            # Add "Adopt for Editing" option
-            if self.__showIncomeSceneChecked:
+            # Add "Adopt for Editing" option, incoming passes are read-only
+            if self.__showIncomeSceneChecked and self.__treeModel.isIncoming(item):
                 adopt_action = QtWidgets.QAction("Adopt for Editing", self)
                 adopt_action.triggered.connect(lambda: self.__onAdoptForEditing(item))
                 menu.addAction(adopt_action)
-
-                # Add a separator
-                menu.addSeparator()
+                menu.exec_(self.__treeView.viewport().mapToGlobal(position))
+                return
 
             # Add "Rename" option
             rename_action = QtWidgets.QAction("Rename", self)
             rename_action.triggered.connect(lambda: self.__onRenameItem(item))
             menu.addAction(rename_action)
 
+            # Add "Set Base" option
+            base_action = QtWidgets.QAction("Set Base...", self)
+            base_action.triggered.connect(lambda: self.__onSetBase(item))
+            menu.addAction(base_action)
+
             # Add "Delete" option
             delete_action = QtWidgets.QAction("Delete", self)
             delete_action.triggered.connect(lambda: self.__onDeleteItem(item))
@@ -192,140 +441,133 @@ class PassManagerEditor(QtWidgets.QWidget):
             duplicate_action.triggered.connect(lambda: self.__onDuplicateItem(item))
             menu.addAction(duplicate_action)
 
+            # Add "Resolve Collections" option
+            resolve_action = QtWidgets.QAction("Resolve Collections", self)
+            resolve_action.triggered.connect(lambda: self.__onResolveCollections(item))
+            menu.addAction(resolve_action)
+
             # Show the menu at the cursor's position
-            menu.exec_(self.__treeWidget.viewport().mapToGlobal(position))
+            menu.exec_(self.__treeView.viewport().mapToGlobal(position))
 
     def __onAdoptForEditing(self, item):
         """Handle the 'Adopt for Editing' action."""
-        print(f"Adopted '{item.text(0)}' for editing.")
+        record = self.__treeModel.recordForIndex(item)
+        if record is None:
+            return
+        self.__flushEdits()
+        if record.fullName in self.__passModel:
+            log.warning("'%s' is already edited by this node.", record.fullName)
+            return
+        with Span('editor.adopt', log):
+            self.__node.addPasses([{'fullName': record.fullName,
+                                    'enabled': record.enabled,
+                                    'settings': dict(record.settings)}])
+        log.debug("Adopted '%s' for editing.", record.fullName)
+
+    def __onResolveCollections(self, item):
+        """Resolve the CEL collections of a pass through the shared cache."""
+        record = self.__treeModel.recordForIndex(item)
+        if record is None:
+            return
+        with Span('editor.resolveCollections', log):
+            locations = self.__celCache.resolvePass(
+                record, self.__sceneGraph.sceneHash(), self.__sceneGraph.resolveCel,
+                self.__effectiveSettings(record))
+        for key, matches in locations.items():
+            log.info("%s %s: %d locations", record.fullName, key, len(matches))
 
     def __onRenameItem(self, item):
         """Handle the 'Rename' action."""
-        parent_item = item.parent()
+        record = self.__treeModel.recordForIndex(item)
+        if record is None:
+            return
         dialog = RenameDialog(self)
-        
+
         if dialog.exec_() == QtWidgets.QDialog.Accepted:
             new_name = dialog.getName()
-            current_name = item.text(0)
+            # Validate against the passes as they will be after pending edits
+            self.__flushEdits()
+            current_name = record.fullName
 
             # Validate the new name format (must follow the format: type_name_iteration, e.g., 'bty_char_01')
-            new_name_parts = new_name.split('_')
-            if new_name_parts[-1].isdigit():
-                root_name = new_name_parts[0]
-                child_name = new_name_parts[1]
-                iteration = int(new_name_parts[-1])
-
-                # Check if the name is valid and follows the format: 'root_child_iteration'
-                if root_name == current_name.split('_')[0] and child_name == current_name.split('_')[1]:
-                    # Ensure the name is not already taken (check children and grandchildren)
-                    name_taken = False
-                    if parent_item is not None:
-                        grandparent_item = parent_item.parent()  # Check if it's a grandchild under a child item
-                        if grandparent_item is not None:
-                            for i in range(grandparent_item.childCount()):
-                                child_item = grandparent_item.child(i)
-                                for j in range(child_item.childCount()):
-                                    grandchild_item = child_item.child(j)
-                                    grandchild_name = grandchild_item.text(0)
-                                    if new_name == grandchild_name:
-                                        name_taken = True
-                                        break
-                                if name_taken:
-                                    break
-                    
-                    # If the name is not taken, rename the item
-                    if not name_taken:
-                        print(f"Renaming item: '{current_name}' to '{new_name}'")
-                        item.setText(0, new_name)
-                    else:
-                        print("A pass with this name already exists.")
-                else:
-                    print("The new name doesn't match the correct format.")
+            issues = CheckPassName(new_name)
+            if issues:
+                log.warning(issues[0].message)
+                return
+            pass_type, name, iteration = ParsePassName(new_name)
+
+            # The type and name must stay the same, only the iteration can change
+            if (pass_type, name) != record.key:
+                log.warning("The new name doesn't match the correct format.")
+            elif iteration == record.iteration:
+                return
+            # Compare by key, 'bty_char_1' is the pass 'bty_char_01'
+            elif not self.__passModel.isIterationFree(pass_type, name, iteration):
+                log.warning("A pass with this name already exists.")
             else:
-                print("Invalid name format. Ensure it follows the pattern 'type_name_iteration'.")
-
+                new_name = FormatPassName(pass_type, name, iteration)
+                log.debug("Renaming item: '%s' to '%s'", current_name, new_name)
+                self.__editQueue.renamePass(record, new_name)
+                self.__editTimer.start()
 
     def __onDeleteItem(self, item):
         """Handle the 'Delete' action."""
-        parent_item = item.parent()
-
-        if parent_item is not None:
-            grandparent_item = parent_item.parent()  # Check if it's a grandchild under a child item
-            if grandparent_item is not None:
-                # Delete the grandchild item first
-                index = parent_item.indexOfChild(item)
-                parent_item.takeChild(index)
-                print(f"Deleted grandchild item: {item.text(0)}")
-
-                # If the parent (child) has no more items, delete it too
-                if parent_item.childCount() == 0:
-                    grandparent_item.removeChild(parent_item)
-                    print(f"Deleted child item: {parent_item.text(0)}")
-
-                    # If the grandparent (root) has no more children, delete it
-                    if grandparent_item.childCount() == 0:
-                        index = self.__treeWidget.indexOfTopLevelItem(grandparent_item)
-                        self.__treeWidget.takeTopLevelItem(index)
-                        print(f"Deleted root item: {grandparent_item.text(0)}")
+        record = self.__treeModel.recordForIndex(item)
+        if record is not None:
+            self.__flushEdits()
+            with Span('editor.delete', log), self.__node.undoGroup('Delete Pass') as passModel:
+                passModel.deletePass(record.fullName)
+            log.debug("Deleted pass: %s", record.fullName)
+
+    def __onSetBase(self, item):
+        """Handle the 'Set Base' action, the pass then inherits the base's settings."""
+        record = self.__treeModel.recordForIndex(item)
+        if record is None:
+            return
+        none_label = "(none)"
+        descendants = {variant.id for variant in self.__passModel.descendantsOf(record)}
+        candidates = sorted(other.fullName for other in self.__passModel
+                            if other is not record and other.id not in descendants)
+        base = self.__passModel.baseOf(record)
+        items = [none_label] + candidates
+        current = items.index(base.fullName) if base is not None else 0
+        name, accepted = QtWidgets.QInputDialog.getItem(
+            self, "Set Base", f"Base of {record.fullName}:", items, current, False)
+        if not accepted:
+            return
+        self.__flushEdits()
+        try:
+            with Span('editor.setBase', log), self.__node.undoGroup('Set Base') as passModel:
+                passModel.setBase(record.fullName, None if name == none_label else name)
+        except PassModelError as exception:
+            log.warning(str(exception))
 
     def __onDuplicateItem(self, item):
         """Handle the 'Duplicate' action."""
-        parent_item = item.parent()
-
-        # Only allow duplication of a grandchild
-        if parent_item is not None:
-            grandparent_item = parent_item.parent()  # Check if it's a grandchild under a child item
-            if grandparent_item is not None:
-                # Duplicate grandchild item
-                name = item.text(0)
-                checkbox_widget = self.__treeWidget.itemWidget(item, 1)
-                checkbox_state = checkbox_widget.isChecked() if checkbox_widget else False
-                
-                # Split the name to extract the iteration number
-                name_split = name.split("_")
-                iteration = int(name_split[-1])
-
-                # Find the next available iteration number
-                existing_iterations = []
-                for i in range(grandparent_item.childCount()):
-                    child_item = grandparent_item.child(i)
-                    for j in range(child_item.childCount()):
-                        grandchild_item = child_item.child(j)
-                        grandchild_name = grandchild_item.text(0)
-                        grandchild_parts = grandchild_name.split("_")
-                        if len(grandchild_parts) >= 3 and grandchild_parts[-1].isdigit():
-                            existing_iterations.append(int(grandchild_parts[-1]))
-
-                # Find the next available iteration
-                next_iteration = iteration + 1
-                while next_iteration in existing_iterations:
-                    next_iteration += 1
-
-                # Create the new name with the next available iteration
-                name_split[-1] = f"{next_iteration:02}"
-                grandchild_name = "_".join(name_split)
-
-                # Add the new duplicated item with the next available iteration
-                self.__addRow(grandparent_item.text(0), parent_item.text(0), grandchild_name, enable_state=checkbox_state)
-                print(f"Duplicated item: {name} -> {grandchild_name}")
+        record = self.__treeModel.recordForIndex(item)
+        if record is not None:
+            self.__flushEdits()
+            with Span('editor.duplicate', log), self.__node.undoGroup('Duplicate Pass') as passModel:
+                duplicate = passModel.duplicatePass(record.fullName)
+            log.debug("Duplicated item: %s -> %s", record.fullName, duplicate.fullName)
 
 
 class AddPassDialog(QtWidgets.QDialog):
 
-    def __init__(self, parent=None):
+    def __init__(self, parent=None, types=(), names=()):
         super().__init__(parent)
         self.setWindowTitle("Add Pass")
         self.setLayout(QtWidgets.QHBoxLayout())
 
-        # Type ComboBox
+        # Type ComboBox, types and names come from the preset library
         self.typeComboBox = QtWidgets.QComboBox()
-        self.typeComboBox.addItems(['bty', 'rfl', 'shdw', 'util'])
+        self.typeComboBox.addItems(list(types))
         self.layout().addWidget(QtWidgets.QLabel("Type:"))
         self.layout().addWidget(self.typeComboBox)
 
         # Name ComboBox
         self.nameComboBox = QtWidgets.QComboBox()
-        self.nameComboBox.addItems(['char', 'crowd', 'env', 'fx', 'prop', 'vhcl', 'custom'])
+        self.nameComboBox.addItems(list(names) + ['custom'])
         self.nameComboBox.currentIndexChanged.connect(self.__onNameChanged)
         self.layout().addWidget(QtWidgets.QLabel("Name:"))
         self.layout().addWidget(self.nameComboBox)
@@ -4,7 +4,8 @@ from PyQt5 import QtGui
 __all__ = [
     "Colors",
     "Icons",
-    "StyleSheets"
+    "StyleSheets",
+    "GetPixmap"
 ]
 
 class Icons:
@@ -16,3 +17,19 @@ class Icons:
     gear_icon_rollover = os.path.join(__root, "gearDark16_hilite.png")
     plus_icon = os.path.join(__root, "plus16.png")
     plus_icon_rollover = os.path.join(__root, "plusHilite16.png")
+    # Badges of passes with validation errors and warnings
+    error_badge = os.path.join(__root, "interrupted16.png")
+    warning_badge = os.path.join(__root, "ignore16.png")
+
+
+# Pixmaps shared by every editor of the session, keyed by file path
+_pixmaps = {}
+
+
+def GetPixmap(path):
+    """Return the pixmap of an icon file, loading it once per session."""
+    pixmap = _pixmaps.get(path)
+    if pixmap is None:
+        from Katana import UI4
+        pixmap = _pixmaps[path] = UI4.Util.IconManager.GetPixmap(path)
+    return pixmap
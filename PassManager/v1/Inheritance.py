@@ -0,0 +1,92 @@
+from __future__ import absolute_import
+
+import logging
+from collections import OrderedDict
+
+from .PassModel import DEFAULT_SETTINGS
+from .CelCache import COLLECTION_SETTINGS, EMPTY_CELS
+
+__all__ = ['SettingsResolver', 'OwnOverrides']
+
+log = logging.getLogger("PassManager.Inheritance")
+
+
+def OwnOverrides(record):
+    """
+    Return the settings a pass sets itself. Like OpScript.lua's override
+    mode, an empty collection keeps the inherited value.
+    """
+    return {key: value for key, value in record.settings.items()
+            if key in DEFAULT_SETTINGS
+            and not (key in COLLECTION_SETTINGS and value in EMPTY_CELS)}
+
+
+class SettingsResolver(object):
+    """
+    Effective settings of the passes of a PassModel, with pass inheritance
+    (base pass -> variants) flattened when passes are authored so the
+    network only ever receives final values.
+
+    Passes without a base start from the settings defaults returns for their
+    type, such as Presets.PresetLibrary.defaultSettings, or DEFAULT_SETTINGS
+    without it, so presets stay under every value a pass or its base sets.
+
+    Results are memoized per pass. The owner reports edits like it does to
+    NetworkSync.NetworkReconciler: ``passChanged`` drops the entries of the
+    pass and of its descendants only, ``passesReset`` drops everything.
+    """
+
+    def __init__(self, passModel, defaults=None):
+        self.__passModel = passModel
+        self.__defaults = defaults
+        self.__typeDefaults = {}
+        self.__effective = {}
+
+    def passesReset(self):
+        """Forget every pass, such as after a batched edit or a preset change."""
+        self.__typeDefaults.clear()
+        self.__effective.clear()
+
+    def passChanged(self, record):
+        """Forget the effective settings of a pass and of its descendants."""
+        self.__effective.pop(record.id, None)
+        for variant in self.__passModel.descendantsOf(record):
+            self.__effective.pop(variant.id, None)
+
+    def passRemoved(self, record):
+        self.__effective.pop(record.id, None)
+
+    def settings(self, record):
+        """Return the effective settings of a pass, in DEFAULT_SETTINGS order."""
+        settings = self.__effective.get(record.id)
+        if settings is not None:
+            return settings
+        # Walk up to the nearest resolved ancestor, then resolve back down
+        chain = [record]
+        seen = {record.id}
+        base = self.__passModel.baseOf(record)
+        while base is not None and base.id not in self.__effective and base.id not in seen:
+            chain.append(base)
+            seen.add(base.id)
+            base = self.__passModel.baseOf(base)
+        settings = self.__effective[base.id] if base is not None and base.id in self.__effective \
+            else self.__rootSettings(chain[-1].passType)
+        for ancestor in reversed(chain):
+            settings = OrderedDict(settings)
+            settings.update(OwnOverrides(ancestor))
+            self.__effective[ancestor.id] = settings
+        return settings
+
+    def __rootSettings(self, passType):
+        if self.__defaults is None:
+            return DEFAULT_SETTINGS
+        settings = self.__typeDefaults.get(passType)
+        if settings is None:
+            settings = OrderedDict(DEFAULT_SETTINGS)
+            settings.update(self.__defaults(passType))
+            self.__typeDefaults[passType] = settings
+        return settings
+
+    def values(self, record):
+        """Return the effective settings as a tuple in DEFAULT_SETTINGS order."""
+        return tuple(self.settings(record).values())
@@ -0,0 +1,171 @@
+from __future__ import absolute_import
+
+import bisect
+import functools
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+
+__all__ = [
+    'Span',
+    'Timed',
+    'Count',
+    'GetStats',
+    'Summary',
+    'LogSummary',
+    'DumpChromeTrace',
+    'Reset',
+]
+
+log = logging.getLogger("PassManager.Instrumentation")
+
+# Upper bounds of the latency histogram buckets, in milliseconds
+BUCKETS_MS = (0.1, 0.5, 1.0, 5.0, 10.0, 50.0, 100.0, 500.0, 1000.0, float('inf'))
+
+# Most recent spans kept for DumpChromeTrace
+MAX_TRACE_EVENTS = 100000
+
+_lock = threading.Lock()
+_stats = {}
+_counters = {}
+_traceEvents = deque(maxlen=MAX_TRACE_EVENTS)
+_epoch = time.perf_counter()
+
+
+class _OperationStats(object):
+    __slots__ = ('count', 'total', 'min', 'max', 'buckets')
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.min = float('inf')
+        self.max = 0.0
+        self.buckets = [0] * len(BUCKETS_MS)
+
+    def add(self, milliseconds):
+        self.count += 1
+        self.total += milliseconds
+        self.min = min(self.min, milliseconds)
+        self.max = max(self.max, milliseconds)
+        self.buckets[bisect.bisect_left(BUCKETS_MS, milliseconds)] += 1
+
+    def asDict(self):
+        return {
+            'count': self.count,
+            'totalMs': self.total,
+            'meanMs': self.total / self.count if self.count else 0.0,
+            'minMs': self.min if self.count else 0.0,
+            'maxMs': self.max,
+            'histogram': {('<=%g' % bound): n for bound, n in zip(BUCKETS_MS, self.buckets)},
+        }
+
+
+class Span(object):
+    """
+    Times a block as one named operation:
+
+        with Span('network.sync', log):
+            ...
+
+    The duration goes to the operation's histogram and the trace buffer, and
+    is logged at DEBUG level on the given logger.
+    """
+
+    __slots__ = ('name', 'logger', 'args', 'start')
+
+    def __init__(self, name, logger=None, **args):
+        self.name = name
+        self.logger = logger
+        self.args = args
+        self.start = None
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, excType, excValue, traceback):
+        end = time.perf_counter()
+        milliseconds = (end - self.start) * 1000.0
+        with _lock:
+            stats = _stats.get(self.name)
+            if stats is None:
+                stats = _stats[self.name] = _OperationStats()
+            stats.add(milliseconds)
+            _traceEvents.append((self.name, self.start, end - self.start,
+                                 threading.get_ident(), self.args))
+        if self.logger is not None and self.logger.isEnabledFor(logging.DEBUG):
+            self.logger.debug('%s took %.3f ms%s', self.name, milliseconds,
+                              ' %r' % self.args if self.args else '')
+        return False
+
+
+def Timed(name, logger=None):
+    """Decorator timing every call of a function as a Span."""
+    def decorate(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with Span(name, logger):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def Count(name, amount=1):
+    """Increment a named counter."""
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + amount
+
+
+def GetStats():
+    """Return {'operations': {name: stats}, 'counters': {name: value}}."""
+    with _lock:
+        return {
+            'operations': {name: stats.asDict() for name, stats in _stats.items()},
+            'counters': dict(_counters),
+        }
+
+
+def Summary():
+    """Return a table of every operation's count and latencies, and the counters."""
+    data = GetStats()
+    lines = ['%-32s %8s %10s %10s %10s' % ('operation', 'count', 'mean ms', 'max ms', 'total ms')]
+    for name, stats in sorted(data['operations'].items()):
+        lines.append('%-32s %8d %10.3f %10.3f %10.3f' % (
+            name, stats['count'], stats['meanMs'], stats['maxMs'], stats['totalMs']))
+    for name, value in sorted(data['counters'].items()):
+        lines.append('%-32s %8d' % (name, value))
+    return '\n'.join(lines)
+
+
+def LogSummary(logger=log, level=logging.INFO):
+    logger.log(level, 'PassManager timings:\n%s', Summary())
+
+
+def DumpChromeTrace(path):
+    """Write the buffered spans as a Chrome trace (chrome://tracing, Perfetto)."""
+    pid = os.getpid()
+    with _lock:
+        events = [{
+            'name': name,
+            'cat': name.split('.', 1)[0],
+            'ph': 'X',
+            'ts': (start - _epoch) * 1e6,
+            'dur': duration * 1e6,
+            'pid': pid,
+            'tid': tid,
+            'args': args,
+        } for name, start, duration, tid, args in _traceEvents]
+    with open(path, 'w') as f:
+        json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, f)
+    log.info('Wrote %d trace events to "%s"', len(events), path)
+    return path
+
+
+def Reset():
+    with _lock:
+        _stats.clear()
+        _counters.clear()
+        _traceEvents.clear()
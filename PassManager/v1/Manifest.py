@@ -0,0 +1,185 @@
+from __future__ import absolute_import
+
+import argparse
+import json
+import logging
+import multiprocessing
+import sys
+
+from .PassModel import PassModel, PASS_ATTRIBUTE_NAMES, PASS_LOCATION_ROOT
+from .PassStore import DecodePasses
+from .Inheritance import SettingsResolver
+from .Presets import GetPresetLibrary
+from .CelCache import NormalizeCel, COLLECTION_SETTINGS
+from .Instrumentation import Span, Count
+
+__all__ = [
+    'GetManifestTasks',
+    'IterManifestJobs',
+    'WriteManifest',
+    'ExportManifest',
+    'Main',
+]
+
+log = logging.getLogger("PassManager.Manifest")
+
+# Enabled passes described by one worker task
+CHUNK_SIZE = 1000
+
+
+def GetManifestTasks(nodes=None):
+    """
+    Return (node name, encoded pass table) for every PassManager node of the
+    project, or of the given nodes. Only parameters are read here, decoding
+    is left to the workers of IterManifestJobs.
+    """
+    if nodes is None:
+        from Katana import NodegraphAPI
+        nodes = NodegraphAPI.GetAllNodesByType('PassManager')
+    tasks = []
+    for node in nodes:
+        param = node.getParameter('passes')
+        if param is None:
+            log.warning('PassManager node "%s" has no stored passes, upgrade it first.',
+                        node.getName())
+            continue
+        tasks.append((node.getName(), param.getValue(0)))
+    return tasks
+
+
+def _PassJob(nodeName, record, settings):
+    job = {
+        'node': nodeName,
+        'pass': record.fullName,
+        'type': record.passType,
+        'name': record.name,
+        'iteration': record.iteration,
+        'location': PASS_LOCATION_ROOT + record.fullName,
+    }
+    for key, value in settings.items():
+        if key in COLLECTION_SETTINGS:
+            value = NormalizeCel(value)
+        job[PASS_ATTRIBUTE_NAMES[key]] = value
+    return job
+
+
+def _EnabledPasses(text):
+    """Decode a pass table, return its enabled passes by name and their resolver."""
+    passModel = PassModel()
+    passModel.restore(DecodePasses(text))
+    resolver = SettingsResolver(passModel, GetPresetLibrary().defaultSettings)
+    records = sorted((record for record in passModel if record.enabled),
+                     key=lambda record: record.fullName)
+    return records, resolver
+
+
+# The table a worker process decoded last, as (text, records, resolver). The
+# chunks of a node mostly land on the same workers, which then decode the
+# node once each instead of once per chunk.
+_workerTable = None
+
+
+def _ChunkJobs(task):
+    """Describe one chunk of a node's enabled passes, in a worker."""
+    global _workerTable
+    nodeName, text, start, stop = task
+    if _workerTable is None or _workerTable[0] != text:
+        _workerTable = (text,) + _EnabledPasses(text)
+    _text, records, resolver = _workerTable
+    return [_PassJob(nodeName, record, resolver.settings(record))
+            for record in records[start:stop]]
+
+
+def _Chunks(tasks, chunkSize):
+    """Split tasks into (node name, text, start, stop) ranges of enabled passes."""
+    chunks = []
+    for nodeName, text in tasks:
+        enabled = sum(1 for record in DecodePasses(text) if record.enabled)
+        chunks.extend((nodeName, text, start, min(start + chunkSize, enabled))
+                      for start in range(0, enabled, chunkSize))
+    return chunks
+
+
+def IterManifestJobs(tasks, processes=None, chunkSize=CHUNK_SIZE):
+    """
+    Yield one render job description per enabled pass of tasks, as returned
+    by GetManifestTasks, in task order. Passes are described on a pool of
+    processes in chunks of chunkSize passes, so a single node with many
+    passes is spread over the pool too, or in this process when processes
+    is 1. Each worker decodes a node's table once and resolves inheritance
+    itself, since a pass may inherit from any other pass of its node.
+    """
+    tasks = list(tasks)
+    chunks = _Chunks(tasks, chunkSize) if processes != 1 else ()
+    if len(chunks) < 2:
+        for nodeName, text in tasks:
+            records, resolver = _EnabledPasses(text)
+            for record in records:
+                yield _PassJob(nodeName, record, resolver.settings(record))
+        return
+    with multiprocessing.Pool(processes) as pool:
+        for jobs in pool.imap(_ChunkJobs, chunks, chunksize=1):
+            for job in jobs:
+                yield job
+
+
+def WriteManifest(jobs, stream):
+    """Write jobs as JSON lines, flushing after each node, and return the count."""
+    count = 0
+    node = None
+    for job in jobs:
+        if job['node'] != node:
+            node = job['node']
+            stream.flush()
+        stream.write(json.dumps(job, sort_keys=True))
+        stream.write('\n')
+        count += 1
+    stream.flush()
+    return count
+
+
+def ExportManifest(output, nodes=None, processes=None):
+    """
+    Write the render jobs of every enabled pass of the project to output, a
+    path or '-' for stdout, and return the number of jobs.
+    """
+    with Span('manifest.export', log):
+        tasks = GetManifestTasks(nodes)
+        jobs = IterManifestJobs(tasks, processes)
+        if output == '-':
+            count = WriteManifest(jobs, sys.stdout)
+        else:
+            with open(output, 'w') as f:
+                count = WriteManifest(jobs, f)
+    Count('manifest.jobs', count)
+    log.info('Wrote %d pass jobs from %d PassManager nodes to "%s"',
+             count, len(tasks), output)
+    return count
+
+
+def Main(argv=None):
+    """
+    Headless entry point, see PassManager/ExportPassManifest.py:
+
+        katana --script PassManager/ExportPassManifest.py shot.katana passes.jsonl
+    """
+    parser = argparse.ArgumentParser(
+        description='Export the enabled passes of a Katana script as JSONL render jobs.')
+    parser.add_argument('script', help='Katana script to load')
+    parser.add_argument('output', nargs='?', default='-',
+                        help="JSONL file to write, '-' for stdout (default)")
+    parser.add_argument('--processes', type=int, default=None,
+                        help='worker processes, defaults to the CPU count')
+    parser.add_argument('--node', action='append', dest='nodes',
+                        help='only export the PassManager node with this name, repeatable')
+    args = parser.parse_args(argv)
+
+    from Katana import KatanaFile, NodegraphAPI
+    KatanaFile.Load(args.script)
+    nodes = None
+    if args.nodes:
+        nodes = [NodegraphAPI.GetNode(name) for name in args.nodes]
+        missing = [name for name, node in zip(args.nodes, nodes) if node is None]
+        if missing:
+            parser.error('No node named %s.' % ', '.join(missing))
+    return ExportManifest(args.output, nodes, args.processes)
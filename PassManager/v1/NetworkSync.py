@@ -0,0 +1,442 @@
+from __future__ import absolute_import
+
+import bisect
+import heapq
+import logging
+import os
+
+from Katana import NodegraphAPI
+
+from .PassModel import DEFAULT_SETTINGS, PASS_ATTRIBUTE_NAMES, PASS_LOCATION_ROOT
+from .Inheritance import SettingsResolver
+from . import ScriptActions as SA
+
+__all__ = [
+    'NetworkReconciler',
+    'AddNetworkModeParam',
+    'AddLiteralValuesParam',
+    'SyncRootLocation',
+    'GetOpScriptLua',
+    'PASS_LOCATION_ROOT',
+    'PER_PASS_MODE',
+    'TABLE_MODE',
+]
+
+log = logging.getLogger("PassManager.NetworkSync")
+
+# Reference params of per-pass OpScript nodes are named 'node_pass_<record id>'
+PASS_REF_PREFIX = 'pass_'
+TABLE_REF_KEY = 'passTable'
+
+# Network modes: one OpScript per pass, or one OpScript reading a pass table
+PER_PASS_MODE = 'perPass'
+TABLE_MODE = 'table'
+
+# Expression of LocationCreate's locations.i0, '~' is the LocationCreate node
+ROOT_LOCATION_EXPRESSION = '="%s" + ~/type' % PASS_LOCATION_ROOT
+
+_luaSources = {}
+
+
+def AddNetworkModeParam(gnode, mode=PER_PASS_MODE):
+    """Create the 'networkMode' parameter of a PassManager node."""
+    param = gnode.getParameters().createChildString('networkMode', mode)
+    param.setHintString(repr({'widget': 'popup', 'options': [PER_PASS_MODE, TABLE_MODE]}))
+    return param
+
+
+def AddLiteralValuesParam(gnode, enabled=0):
+    """
+    Create the 'literalValues' parameter of a PassManager node, see
+    SyncRootLocation.
+    """
+    param = gnode.getParameters().createChildNumber('literalValues', enabled)
+    param.setHintString(repr({'widget': 'checkBox'}))
+    return param
+
+
+def _SetLiteral(param, value):
+    """Write value to param, dropping its expression, unless it already holds it."""
+    if param.isExpression():
+        param.setExpressionFlag(False)
+    elif param.getValue(0) == value:
+        return False
+    param.setValue(value, 0)
+    return True
+
+
+def _SetExpression(param, expression):
+    if param.isExpression() and param.getExpression() == expression:
+        return False
+    param.setExpression(expression)
+    return True
+
+
+def SyncRootLocation(gnode):
+    """
+    Point LocationCreate's locations.i0 and the node's OpScript CEL at the
+    passes root. With the 'literalValues' parameter on both hold plain
+    values, which the node rewrites when LocationCreate's 'type' changes,
+    so graph evaluation has no expression to run and nothing breaks when
+    the LocationCreate node is renamed. Otherwise both hold the original
+    expressions. Returns True if a parameter was written.
+    """
+    location_create_node = SA.GetRefNode(gnode, 'locationCreate')
+    opscript_node = SA.GetRefNode(gnode, 'opScript')
+    if location_create_node is None or opscript_node is None:
+        return False
+    location = location_create_node.getParameter('locations.i0')
+    cel = opscript_node.getParameter('CEL')
+    literal = gnode.getParameter('literalValues')
+
+    if literal is not None and literal.getValue(0):
+        type_param = location_create_node.getParameter('type')
+        root = PASS_LOCATION_ROOT + (type_param.getValue(0) if type_param else '')
+        changed = _SetLiteral(location, root)
+        changed = _SetLiteral(cel, root) or changed
+    else:
+        changed = _SetExpression(location, ROOT_LOCATION_EXPRESSION)
+        changed = _SetExpression(cel, '=%s/locations.i0'
+                                 % location_create_node.getName()) or changed
+    if changed:
+        log.debug('Updated the root location of "%s"', gnode.getName())
+    return changed
+
+
+def GetOpScriptLua(fileName='OpScript.lua'):
+    """Return the source of a script in the lua directory, read once per session."""
+    source = _luaSources.get(fileName)
+    if source is None:
+        path = os.path.join(os.path.dirname(__file__), 'lua', fileName)
+        with open(path, 'r') as f:
+            source = _luaSources[fileName] = f.read()
+    return source
+
+
+def _PassSignature(record, values):
+    """Everything about a pass that ends up on its OpScript node."""
+    return (record.fullName, record.enabled, values)
+
+
+class NetworkReconciler(object):
+    """
+    Keeps the internal network of a PassManagerNode in step with its pass model.
+
+    In PER_PASS_MODE each pass gets its own OpScript node, chained between
+    the Merge node and the node's OpScript, and tracked through a
+    'node_pass_<id>' reference param so it survives renames. In TABLE_MODE a
+    single OpScript running PassTable.lua serves every pass from one
+    user.passTable op arg, so the node count stays flat as passes are added.
+
+    The owner reports edits through ``passChanged`` and ``passRemoved``, and
+    ``sync`` then touches only those passes: their node or table row, the
+    links next to them and their slot in the LocationCreate locations. A
+    full diff against what was last written runs on the first sync, after a
+    mode change, after ``passesReset`` for batched edits, and after
+    ``invalidate``, which should be called whenever something else touched
+    the network, such as an undo.
+    """
+
+    def __init__(self, gnode):
+        self.__gnode = gnode
+        self.__mode = None
+        self.__signatures = {}
+        self.__rows = {}
+        self.__chain = []
+        self.__slots = {}
+        self.__resolver = None
+        self.invalidate()
+
+    def invalidate(self):
+        """Forget what was written, the next sync compares the whole network."""
+        self.__signatures = {}
+        self.passesReset()
+
+    def passesReset(self):
+        """Note that any pass may have changed, such as after a batched edit."""
+        self.__full = True
+        self.__dirty = {}
+        self.__removed = set()
+
+    def passChanged(self, record):
+        """Note that a pass was added, renamed, toggled or re-parameterized."""
+        self.__dirty[record.id] = record
+        self.__removed.discard(record.id)
+
+    def passRemoved(self, record):
+        self.__dirty.pop(record.id, None)
+        self.__removed.add(record.id)
+
+    def sync(self, passModel, mode=PER_PASS_MODE, resolver=None):
+        """
+        Reconcile the network with the model and return per-operation counts.
+        Passes get the flat settings of resolver, an Inheritance.SettingsResolver.
+        """
+        self.__resolver = resolver if resolver is not None else SettingsResolver(passModel)
+        stats = {'created': 0, 'deleted': 0, 'updated': 0, 'rewired': 0}
+        if mode != self.__mode:
+            self.__mode = mode
+            self.__full = True
+
+        if self.__full:
+            records = sorted(passModel, key=lambda record: record.id)
+            removed = None
+        else:
+            records = sorted(self.__dirty.values(), key=lambda record: record.id)
+            removed = self.__removed
+
+        if mode == TABLE_MODE:
+            if self.__full:
+                self.__syncPassNodes((), None, stats)
+            self.__syncTableNode(records, removed, stats)
+        else:
+            self.__syncPassNodes(records, removed, stats)
+            if self.__full:
+                self.__deleteTableNode(stats)
+        self.__syncLocations(records, removed)
+
+        self.__full = False
+        self.__dirty = {}
+        self.__removed = set()
+        log.debug('Synced "%s" (%s): %r', self.__gnode.getName(), mode, stats)
+        return stats
+
+    # Per-pass OpScript nodes
+
+    def __syncPassNodes(self, records, removed, stats):
+        """
+        Create, update and delete the per-pass OpScript nodes. With removed
+        set to None, records is the whole model and every other pass node is
+        deleted.
+        """
+        gnode = self.__gnode
+        if removed is None:
+            # Compare against every pass node that exists on the node
+            stale = set(SA.GetNodeReferenceParams(gnode, PASS_REF_PREFIX))
+            stale.difference_update(str(record.id) for record in records)
+            removed = {int(key) for key in stale if key.isdigit()}
+            self.__signatures = {key: value for key, value in self.__signatures.items()
+                                 if str(key) not in stale}
+            self.__chain = []
+            relink = None
+        else:
+            relink = set()
+
+        for id in removed:
+            node = SA.GetRefNode(gnode, PASS_REF_PREFIX + str(id))
+            if node is not None:
+                node.delete()
+            SA.RemoveNodeReferenceParam(gnode, 'node_' + PASS_REF_PREFIX + str(id))
+            self.__signatures.pop(id, None)
+            stats['deleted'] += 1
+            row = bisect.bisect_left(self.__chain, id)
+            if row < len(self.__chain) and self.__chain[row] == id:
+                del self.__chain[row]
+                if relink is not None:
+                    relink.add(row)
+
+        for record in records:
+            row = bisect.bisect_left(self.__chain, record.id)
+            if row == len(self.__chain) or self.__chain[row] != record.id:
+                self.__chain.insert(row, record.id)
+                if relink is not None:
+                    relink.update((row, row + 1))
+            signature = _PassSignature(record, self.__resolver.values(record))
+            if self.__signatures.get(record.id) == signature:
+                continue
+            key = PASS_REF_PREFIX + str(record.id)
+            node = SA.GetRefNode(gnode, key)
+            if node is None:
+                self.__createPassNode(record, key)
+                stats['created'] += 1
+            else:
+                self.__updatePassNode(node, record)
+                stats['updated'] += 1
+            self.__signatures[record.id] = signature
+
+        keys = [PASS_REF_PREFIX + str(id) for id in self.__chain]
+        stats['rewired'] += self.__rewire(keys, relink)
+
+    def __createPassNode(self, record, key):
+        node = NodegraphAPI.CreateNode('OpScript', self.__gnode)
+        SA.AddPassSettingsParams(node, self.__resolver.settings(record))
+        node.getParameter('script.lua').setValue(GetOpScriptLua(), 0)
+        node.getParameter('CEL').setValue(PASS_LOCATION_ROOT + record.fullName, 0)
+        node.setBypassed(not record.enabled)
+        NodegraphAPI.SetNodePosition(node, (-200, -150 - 50 * record.id))
+        SA.AddNodeReferenceParam(self.__gnode, 'node_' + key, node)
+        return node
+
+    def __updatePassNode(self, node, record):
+        cel = node.getParameter('CEL')
+        location = PASS_LOCATION_ROOT + record.fullName
+        if cel.getValue(0) != location:
+            cel.setValue(location, 0)
+        if node.isBypassed() != (not record.enabled):
+            node.setBypassed(not record.enabled)
+        for key, value in self.__resolver.settings(record).items():
+            param = node.getParameter('user.' + key)
+            if param is not None and param.getValue(0) != value:
+                param.setValue(value, 0)
+
+    def __rewire(self, keys, rows=None):
+        """
+        Connect Merge -> keys -> OpScript, touching only wrong links. rows
+        limits the check to the inputs of the chain positions given, plus the
+        OpScript at the end; None checks every link.
+        """
+        gnode = self.__gnode
+        merge_node = SA.GetRefNode(gnode, 'merge')
+        opscript_node = SA.GetRefNode(gnode, 'opScript')
+        if rows is None:
+            rows = range(len(keys) + 1)
+        else:
+            rows = sorted(set(row for row in rows if row < len(keys)) | {len(keys)})
+        rewired = 0
+        for row in rows:
+            source = SA.GetRefNode(gnode, keys[row - 1]) if row > 0 else merge_node
+            target = SA.GetRefNode(gnode, keys[row]) if row < len(keys) else opscript_node
+            if source is None or target is None:
+                continue
+            out_port = source.getOutputPortByIndex(0)
+            in_port = target.getInputPortByIndex(0)
+            connected = in_port.getConnectedPorts()
+            if (len(connected) == 1 and connected[0].getNode() is source
+                    and connected[0].getName() == out_port.getName()):
+                continue
+            for port in connected:
+                in_port.disconnect(port)
+            in_port.connect(out_port)
+            rewired += 1
+        return rewired
+
+    # Pass table
+
+    def __syncTableNode(self, records, removed, stats):
+        """
+        Keep one user.passTable row per enabled pass on the table OpScript.
+        With removed set to None, records is the whole model.
+        """
+        gnode = self.__gnode
+        node = SA.GetRefNode(gnode, TABLE_REF_KEY)
+        if node is None:
+            node = NodegraphAPI.CreateNode('OpScript', gnode)
+            node.setName('PassTable')
+            node.getParameters().createChildGroup('user').createChildGroup('passTable')
+            node.getParameter('script.lua').setValue(GetOpScriptLua('PassTable.lua'), 0)
+            node.getParameter('CEL').setValue(PASS_LOCATION_ROOT + '*', 0)
+            NodegraphAPI.SetNodePosition(node, (-200, -150))
+            SA.AddNodeReferenceParam(gnode, 'node_' + TABLE_REF_KEY, node)
+            self.__rows = {}
+            stats['created'] += 1
+        table = node.getParameter('user.passTable')
+
+        if removed is None:
+            # Drop every row that no enabled pass claims, then compare the rest
+            wanted = {record.fullName for record in records if record.enabled}
+            for row in table.getChildren():
+                if row.getName() not in wanted:
+                    table.deleteChild(row)
+                    stats['deleted'] += 1
+            self.__rows = {}
+            removed = ()
+            stats['rewired'] += self.__rewire([TABLE_REF_KEY])
+
+        for id in removed:
+            self.__deleteRow(table, id, stats)
+        for record in records:
+            if not record.enabled:
+                self.__deleteRow(table, record.id, stats)
+                continue
+            values = self.__resolver.values(record)
+            written = self.__rows.get(record.id)
+            if written == (record.fullName, values):
+                continue
+            if written is not None and written[0] != record.fullName:
+                self.__deleteRow(table, record.id, stats)
+            self.__writeRow(table, record.fullName, values, stats)
+            self.__rows[record.id] = (record.fullName, values)
+
+    def __writeRow(self, table, name, values, stats):
+        row = table.getChild(name)
+        if row is None:
+            row = table.createChildGroup(name)
+            for key, value in zip(DEFAULT_SETTINGS, values):
+                if isinstance(value, str):
+                    row.createChildString(PASS_ATTRIBUTE_NAMES[key], value)
+                else:
+                    row.createChildNumber(PASS_ATTRIBUTE_NAMES[key], value)
+            stats['created'] += 1
+            return
+        for key, value in zip(DEFAULT_SETTINGS, values):
+            param = row.getChild(PASS_ATTRIBUTE_NAMES[key])
+            if param.getValue(0) != value:
+                param.setValue(value, 0)
+        stats['updated'] += 1
+
+    def __deleteRow(self, table, id, stats):
+        written = self.__rows.pop(id, None)
+        row = table.getChild(written[0]) if written is not None else None
+        if row is not None:
+            table.deleteChild(row)
+            stats['deleted'] += 1
+
+    def __deleteTableNode(self, stats):
+        node = SA.GetRefNode(self.__gnode, TABLE_REF_KEY)
+        if node is not None:
+            node.delete()
+            SA.RemoveNodeReferenceParam(self.__gnode, 'node_' + TABLE_REF_KEY)
+            stats['deleted'] += 1
+        self.__rows = {}
+
+    # Pass locations
+
+    def __syncLocations(self, records, removed):
+        """
+        Give every enabled pass a stable slot in LocationCreate's locations, so
+        an edit rewrites one entry instead of shifting the ones after it.
+        locations.i0 holds the passes root, free slots point back at it.
+        """
+        location_create_node = SA.GetRefNode(self.__gnode, 'locationCreate')
+        if location_create_node is None:
+            return
+        param = location_create_node.getParameter('locations')
+        root = PASS_LOCATION_ROOT.rstrip('/')
+
+        if removed is None:
+            self.__slots = {}
+            self.__freeSlots = []
+            enabled = [record for record in records if record.enabled]
+            if param.getNumChildren() != len(enabled) + 1:
+                param.resizeArray(len(enabled) + 1)
+            for slot, record in enumerate(enabled, 1):
+                self.__slots[record.id] = slot
+                self.__writeLocation(param, slot, PASS_LOCATION_ROOT + record.fullName)
+            return
+
+        for id in removed:
+            self.__freeSlot(param, id, root)
+        for record in records:
+            if not record.enabled:
+                self.__freeSlot(param, record.id, root)
+                continue
+            slot = self.__slots.get(record.id)
+            if slot is None:
+                if self.__freeSlots:
+                    slot = heapq.heappop(self.__freeSlots)
+                else:
+                    slot = param.getNumChildren()
+                    param.resizeArray(slot + 1)
+                self.__slots[record.id] = slot
+            self.__writeLocation(param, slot, PASS_LOCATION_ROOT + record.fullName)
+
+    def __freeSlot(self, param, id, root):
+        slot = self.__slots.pop(id, None)
+        if slot is not None:
+            self.__writeLocation(param, slot, root)
+            heapq.heappush(self.__freeSlots, slot)
+
+    def __writeLocation(self, param, slot, path):
+        child = param.getChildByIndex(slot)
+        if child.getValue(0) != path:
+            child.setValue(path, 0)
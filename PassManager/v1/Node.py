@@ -1,18 +1,30 @@
 from __future__ import absolute_import
 
+import contextlib
 import logging
-from collections import OrderedDict
 
-import Utils
 from Katana import NodegraphAPI
 
-from .Upgrade import Upgrade
-from . import ScriptActions as SA
+# Only the node class is needed to register the plugin. The pass model,
+# network and upgrade modules are imported when a node is first used so
+# they don't add to Katana's startup time.
 
 log = logging.getLogger("PassManagerNode.Node")
 
 class PassManagerNode(NodegraphAPI.SuperTool):
+    # True while undoGroup holds back network syncs
+    __syncSuspended = False
+    # Generation of the preset library the passes were resolved against
+    __presetGeneration = None
+
     def __init__(self):
+        from .Upgrade import CURRENT_VERSION
+        from .NetworkSync import AddNetworkModeParam, AddLiteralValuesParam
+        from .PassStore import AddPassesParam
+        from .Registry import GetNodeRegistry
+        _RegisterEventHandlers()
+        GetNodeRegistry().add(self)
+
         # Hide group node controls
         self.hideNodegraphGroupControls()
         # Add ports
@@ -22,40 +34,257 @@ class PassManagerNode(NodegraphAPI.SuperTool):
         rootParameter = self.getParameters()
         # Hidden version parameter to detect out-of-date
         # internal networks and upgrade it.
-        rootParameter.createChildNumber('version', 1)
+        rootParameter.createChildNumber('version', CURRENT_VERSION)
         rootParameter.createChildString("info", "Press 'Create Network' to build the setup.")
+        AddNetworkModeParam(self)
+        AddLiteralValuesParam(self)
+        AddPassesParam(self)
         self.__buildDefaultNetwork()
-    
+
+    def getPassModel(self):
+        """
+        Return the headless pass model of this node. It is created on first
+        use from the 'passes' parameter, so nodes whose passes are never
+        looked at are never decoded.
+        """
+        try:
+            return self.__passModel
+        except AttributeError:
+            from .PassModel import PassModel
+            from .PassStore import DecodePasses, PassTableEncoder
+            from .Inheritance import SettingsResolver
+            from .Presets import GetPresetLibrary
+            from .Instrumentation import Span
+
+            passModel = PassModel()
+            self.__passTableEncoder = PassTableEncoder()
+            self.__settingsResolver = SettingsResolver(passModel,
+                                                       GetPresetLibrary().defaultSettings)
+            param = self.getParameter('passes')
+            self.__storedPasses = param.getValue(0) if param else ''
+            if self.__storedPasses:
+                with Span('node.loadPasses', log):
+                    passModel.restore(DecodePasses(self.__storedPasses))
+            self.__passModel = passModel
+            passModel.addListener(self.__onPassModelChanged)
+            return passModel
+
+    @contextlib.contextmanager
+    def undoGroup(self, description):
+        """
+        Context manager for pass model edits made by hand: everything inside
+        is one undo group, and the internal network is updated once, when
+        the block ends. Yields the pass model.
+        """
+        import Utils
+
+        Utils.UndoStack.OpenGroup('%s in "%s"' % (description, self.getName()))
+        suspended = self.__syncSuspended
+        self.__syncSuspended = True
+        try:
+            yield self.getPassModel()
+        finally:
+            self.__syncSuspended = suspended
+            try:
+                if not suspended:
+                    self.syncNetwork()
+                    self.__storePasses()
+            finally:
+                Utils.UndoStack.CloseGroup()
+
+    def addPasses(self, specs):
+        """
+        Add many passes at once. All passes are added in one undo group and
+        the internal network is updated once, after the last pass.
+        """
+        from .Instrumentation import Span
+
+        specs = list(specs)
+        with self.undoGroup('Add %d Passes' % len(specs)) as passModel:
+            with Span('node.addPasses', log, passes=len(specs)):
+                records = passModel.addPasses(specs)
+        log.debug('Added %d passes to "%s"', len(records), self.getName())
+        return records
+
+    def applyPassEdits(self, edits):
+        """
+        Apply edits taken from a PassEdits.PassEditQueue. All edits share one
+        undo group and the internal network is updated once, after the last.
+        """
+        from .PassEdits import ApplyPassEdits
+        from .Instrumentation import Span
+
+        if not edits:
+            return 0
+        with self.undoGroup('Edit %d Passes' % len(edits)) as passModel:
+            with Span('node.applyPassEdits', log, edits=len(edits)):
+                return ApplyPassEdits(passModel, edits)
+
+    def importPasses(self, path):
+        """Add the passes described in a .json or .csv file."""
+        from .PassImport import LoadPassSpecs
+        return self.addPasses(LoadPassSpecs(path))
+
+    def __onPassModelChanged(self, event, record, oldFullName):
+        from .PassModel import PassModel
+
+        # Batched edits arrive as a single RESET, so this runs once per batch
+        reconciler = self.getNetworkReconciler()
+        for tracker in (self.__settingsResolver, reconciler, self.__passTableEncoder):
+            if event == PassModel.RESET:
+                tracker.passesReset()
+            elif event == PassModel.REMOVED:
+                tracker.passRemoved(record)
+            else:
+                tracker.passChanged(record)
+        if event == PassModel.CHANGED:
+            # Variants carry the flattened settings of their base
+            for variant in self.__passModel.descendantsOf(record):
+                reconciler.passChanged(variant)
+        # undoGroup syncs once, when its block ends
+        if not self.__syncSuspended:
+            self.syncNetwork()
+            self.__storePasses()
+
+    def reloadPasses(self):
+        """
+        Load the passes again if the 'passes' parameter no longer holds what
+        this node last wrote, as after an undo, a redo or a script setting
+        it. The network is then compared in full, since the undo may have
+        touched it too. Returns True if the passes were reloaded.
+        """
+        from .PassModel import PassModelError
+        from .PassStore import DecodePasses
+        from .Instrumentation import Span
+
+        try:
+            passModel = self.__passModel
+        except AttributeError:
+            # Not loaded yet, getPassModel() reads the current value
+            return False
+        param = self.getParameter('passes')
+        text = param.getValue(0) if param else ''
+        if text == self.__storedPasses:
+            return False
+        try:
+            records = DecodePasses(text)
+        except PassModelError as exception:
+            log.error('Cannot reload the passes of "%s": %s', self.getName(), exception)
+            return False
+        self.__storedPasses = text
+        self.getNetworkReconciler().invalidate()
+        with Span('node.reloadPasses', log):
+            # Reported as a single RESET, which syncs the network
+            passModel.restore(records)
+        return True
+
+    def __storePasses(self):
+        """Write the pass table to the 'passes' parameter if it changed."""
+        from .Instrumentation import Span
+
+        param = self.getParameter('passes')
+        if param is None:
+            return
+        with Span('node.storePasses', log):
+            text = self.__passTableEncoder.encode(self.getPassModel())
+        if text != self.__storedPasses:
+            param.setValue(text, 0)
+            self.__storedPasses = text
+
+    def getSettingsResolver(self):
+        """Return the resolver of the passes' effective, inherited settings."""
+        self.getPassModel()
+        self.__checkPresets()
+        return self.__settingsResolver
+
+    def __checkPresets(self):
+        """Resolve every pass again, and sync it, once the preset files changed."""
+        from .Presets import GetPresetLibrary
+
+        generation = GetPresetLibrary().generation
+        if generation != self.__presetGeneration:
+            self.__presetGeneration = generation
+            self.__settingsResolver.passesReset()
+            self.getNetworkReconciler().passesReset()
+
+    def validatePasses(self, provider=None):
+        """
+        Check the passes, see Validation.PassValidator, and return
+        {pass name: issues} for the passes that have any. Passes unchanged
+        since the last call are not checked again. Scene checks run against
+        provider, a SceneGraph.SceneGraphProvider, if one is given.
+        """
+        from .Validation import PassValidator
+
+        try:
+            validator, validatorProvider = self.__validator
+        except AttributeError:
+            validator = validatorProvider = None
+        if validator is None or validatorProvider is not provider:
+            if validator is not None:
+                validator.shutdown()
+            validator = PassValidator(self.getPassModel(), self.getSettingsResolver(), provider)
+            self.__validator = (validator, provider)
+        validator.validate()
+        return {record.fullName: validator.issues(record)
+                for record in self.getPassModel() if validator.issues(record)}
+
+    def getNetworkReconciler(self):
+        """Return the object that keeps the internal network in step with the passes."""
+        try:
+            return self.__reconciler
+        except AttributeError:
+            from .NetworkSync import NetworkReconciler
+            self.__reconciler = NetworkReconciler(self)
+            return self.__reconciler
+
+    def getNetworkMode(self):
+        """Return PER_PASS_MODE or TABLE_MODE, see NetworkSync.NetworkReconciler."""
+        from .NetworkSync import PER_PASS_MODE
+        param = self.getParameter('networkMode')
+        return param.getValue(0) if param else PER_PASS_MODE
+
+    def syncNetwork(self):
+        """Apply the pending pass changes to the internal network."""
+        from .Presets import GetPresetLibrary
+        from .Instrumentation import Span, Count
+
+        # Picks up edited preset files, see getSettingsResolver
+        GetPresetLibrary().refresh()
+        with Span('network.sync', log):
+            stats = self.getNetworkReconciler().sync(self.getPassModel(), self.getNetworkMode(),
+                                                     self.getSettingsResolver())
+        for key, value in stats.items():
+            if value:
+                Count('network.' + key, value)
+        return stats
+
+    def syncRootLocation(self):
+        """Write the passes root location, see NetworkSync.SyncRootLocation."""
+        from .NetworkSync import SyncRootLocation
+        return SyncRootLocation(self)
+
     def __buildDefaultNetwork(self):
-        print(self)
+        from .Instrumentation import Span
+
+        with Span('network.build', log):
+            self.__createDefaultNodes()
+
+    def __createDefaultNodes(self):
+        from . import ScriptActions as SA
+        from .Presets import GetPresetLibrary
+
         # Create the child nodes
         merge_node = NodegraphAPI.CreateNode('Merge', self)
         location_create_node = NodegraphAPI.CreateNode('LocationCreate', self)
         opscript_node = NodegraphAPI.CreateNode('OpScript', self)
+        SA.AddNodeReferenceParam(self, 'node_merge', merge_node)
+        SA.AddNodeReferenceParam(self, 'node_locationCreate', location_create_node)
+        SA.AddNodeReferenceParam(self, 'node_opScript', opscript_node)
         # Add Parameters to OpScript npde
-        root_attr = opscript_node.getParameters()
-        user_attr = root_attr.createChildGroup("user")
-        render_quality = user_attr.createChildNumber("renderQuality", 0)
-        denoise = user_attr.createChildNumber("denoise", 0)
-        camera = user_attr.createChildString("camera", '/root/world/cam/camera')
-        vis_on = user_attr.createChildString("VisibilityON", '')
-        vis_off = user_attr.createChildString("VisibilityOFF", '')
-        holdout = user_attr.createChildString("Holdout", '')
-        prune = user_attr.createChildString("Prune", '')
-        # Set widget hints
-        denoise.setHintString("{'widget': 'checkBox', 'constant': True}")
-        render_quality.setHintString("{'widget': 'mapper', 'options': {'Low': 0, 'Medium': 1, 'High': 2}, 'constant': True}")
-        camera.setHintString("{'widget': 'scenegraphLocation'}")
-        vis_on.setHintString("{'widget': 'cel'}")
-        vis_off.setHintString("{'widget': 'cel'}")
-        holdout.setHintString("{'widget': 'cel'}")
-        prune.setHintString("{'widget': 'cel'}")
-        
-        location_create_node.getParameter('locations.i0').setExpression('="/root/world/passes/" + ~/type')
-        location_create_name = location_create_node.getName()
-        opscript_node.getParameter('CEL').setExpression(f'={location_create_name}/locations.i0')
-
-
+        SA.AddPassSettingsParams(opscript_node, GetPresetLibrary().settingsFor())
+        # Expressions or literal values, depending on 'literalValues'
+        self.syncRootLocation()
 
         # Connect the nodes
         NodegraphAPI.SetNodePosition(merge_node, (0, -100))
@@ -78,8 +307,99 @@ class PassManagerNode(NodegraphAPI.SuperTool):
         self.getReturnPort(self.getOutputPortByIndex(0).getName()).connect(opscript_node.getOutputPortByIndex(0))
     
     def upgrade(self):
+        from .Upgrade import UpgradeAll, NeedsUpgrade
+        from .Registry import GetNodeRegistry
+
+        # Katana calls upgrade() on every loaded node, not __init__()
+        _RegisterEventHandlers()
+        GetNodeRegistry().add(self)
+        if not NeedsUpgrade(self):
+            return
         if not self.isLocked():
-            Upgrade(self)
+            # Katana calls upgrade() on every node of a loaded script, so the
+            # first out-of-date node upgrades all of them in one batch.
+            UpgradeAll()
+        else:
+            log.warning('Cannot upgrade locked PassManager node "%s".'
+                        % self.getName())
+
+
+def _OnParameterFinalizeValue(args):
+    """
+    Rebuild the pass network of PassManager nodes whose network mode changed,
+    and rewrite the root location of nodes whose 'literalValues' or whose
+    LocationCreate's 'type' changed.
+    """
+    networkNodes = set()
+    rootNodes = set()
+    for _eventType, _eventID, kwargs in args:
+        node = kwargs.get('node')
+        param = kwargs.get('param')
+        if node is None or param is None:
+            continue
+        if isinstance(node, PassManagerNode):
+            if param.getName() == 'networkMode':
+                networkNodes.add(node)
+            elif param.getName() == 'literalValues':
+                rootNodes.add(node)
+        elif param.getName() == 'type' and node.getType() == 'LocationCreate' \
+                and isinstance(node.getParent(), PassManagerNode):
+            rootNodes.add(node.getParent())
+    for node in networkNodes:
+        node.syncNetwork()
+    for node in rootNodes:
+        node.syncRootLocation()
+
+
+def _OnParameterSetValue(args):
+    """
+    Reload the passes of PassManager nodes whose 'passes' parameter was set
+    by something other than the node, such as an undo.
+    """
+    nodes = set()
+    for _eventType, _eventID, kwargs in args:
+        node = kwargs.get('node')
+        param = kwargs.get('param')
+        if isinstance(node, PassManagerNode) and param is not None \
+                and param.getName() == 'passes':
+            nodes.add(node)
+    for node in nodes:
+        node.reloadPasses()
+
+
+def _OnNodeCreateOrDelete(args):
+    """Keep the registry of live PassManager nodes current."""
+    from .Registry import GetNodeRegistry
+    registry = GetNodeRegistry()
+    for eventType, _eventID, kwargs in args:
+        node = kwargs.get('node')
+        if not isinstance(node, PassManagerNode):
+            continue
+        if eventType == 'node_delete':
+            registry.remove(node)
         else:
-            log.warning('Cannot upgrade locked AttributeWedge node "%s".'
-                        % self.getName())
\ No newline at end of file
+            registry.add(node)
+
+
+def _OnNodegraphLoadEnd(args):
+    """A new script replaced the node graph, seed the registry again."""
+    from .Registry import GetNodeRegistry
+    GetNodeRegistry().reset()
+
+
+_eventHandlersRegistered = False
+
+
+def _RegisterEventHandlers():
+    """Register the module's event handlers, once, when a node is first used."""
+    global _eventHandlersRegistered
+    if _eventHandlersRegistered:
+        return
+    import Utils
+    Utils.EventModule.RegisterCollapsedHandler(_OnParameterFinalizeValue,
+                                               'parameter_finalizeValue', None)
+    Utils.EventModule.RegisterCollapsedHandler(_OnParameterSetValue, 'parameter_setValue', None)
+    Utils.EventModule.RegisterCollapsedHandler(_OnNodeCreateOrDelete, 'node_create', None)
+    Utils.EventModule.RegisterCollapsedHandler(_OnNodeCreateOrDelete, 'node_delete', None)
+    Utils.EventModule.RegisterCollapsedHandler(_OnNodegraphLoadEnd, 'nodegraph_loadEnd', None)
+    _eventHandlersRegistered = True
@@ -0,0 +1,99 @@
+from __future__ import absolute_import
+
+import logging
+from collections import OrderedDict
+
+from .PassModel import PassModelError
+
+__all__ = ['PassEditQueue', 'ApplyPassEdits']
+
+log = logging.getLogger("PassManager.PassEdits")
+
+
+class _PassEdit(object):
+    """The pending rename, enable state and settings of one pass."""
+
+    __slots__ = ('record', 'fullName', 'enabled', 'settings')
+
+    def __init__(self, record):
+        self.record = record
+        self.fullName = None
+        self.enabled = None
+        self.settings = {}
+
+
+class PassEditQueue(object):
+    """
+    Editor edits waiting to be written to the node.
+
+    Edits are keyed by pass, so writing the same pass twice before a flush
+    keeps only the last value of each field. take() hands the pending edits
+    over in the order their passes were first edited, for
+    PassManagerNode.applyPassEdits.
+    """
+
+    def __init__(self):
+        self.__edits = OrderedDict()
+
+    def __len__(self):
+        return len(self.__edits)
+
+    def __edit(self, record):
+        edit = self.__edits.get(record.id)
+        if edit is None:
+            edit = self.__edits[record.id] = _PassEdit(record)
+        return edit
+
+    def setEnabled(self, record, enabled):
+        self.__edit(record).enabled = bool(enabled)
+
+    def updateSettings(self, record, **settings):
+        self.__edit(record).settings.update(settings)
+
+    def renamePass(self, record, newFullName):
+        self.__edit(record).fullName = newFullName
+
+    def pendingName(self, record):
+        """Return the name a pass will have after the flush."""
+        edit = self.__edits.get(record.id)
+        if edit is not None and edit.fullName is not None:
+            return edit.fullName
+        return record.fullName
+
+    def pendingEnabled(self, record):
+        """Return the enable state a pass will have after the flush."""
+        edit = self.__edits.get(record.id)
+        if edit is not None and edit.enabled is not None:
+            return edit.enabled
+        return record.enabled
+
+    def take(self):
+        """Return the pending edits and empty the queue."""
+        edits = list(self.__edits.values())
+        self.__edits.clear()
+        return edits
+
+
+def ApplyPassEdits(passModel, edits):
+    """
+    Write edits taken from a PassEditQueue to passModel and return the number
+    of edits applied. Edits of deleted passes are dropped, and an edit the
+    model refuses is logged without stopping the others.
+    """
+    applied = 0
+    for edit in edits:
+        record = edit.record
+        if passModel.getPass(record.fullName) is not record:
+            continue
+        try:
+            if edit.fullName is not None:
+                passModel.renamePass(record.fullName, edit.fullName)
+            if edit.enabled is not None:
+                passModel.setEnabled(record.fullName, edit.enabled)
+            if edit.settings:
+                passModel.updateSettings(record.fullName, **edit.settings)
+        except PassModelError as exception:
+            log.warning('Could not edit "%s": %s', record.fullName, exception)
+            continue
+        applied += 1
+    return applied
@@ -0,0 +1,63 @@
+from __future__ import absolute_import
+
+import csv
+import json
+import logging
+import os
+
+from .PassModel import DEFAULT_SETTINGS, PassModelError, CoerceSetting
+
+__all__ = ['LoadPassSpecs', 'ReadJsonSpecs', 'ReadCsvSpecs']
+
+log = logging.getLogger("PassManager.PassImport")
+
+
+def LoadPassSpecs(path):
+    """Read pass specs from a .json or .csv file, chosen by extension."""
+    extension = os.path.splitext(path)[1].lower()
+    if extension == '.json':
+        specs = ReadJsonSpecs(path)
+    elif extension == '.csv':
+        specs = ReadCsvSpecs(path)
+    else:
+        raise PassModelError("Unsupported pass file '%s', expected .json or .csv." % path)
+    log.info('Read %d pass specs from "%s"', len(specs), path)
+    return specs
+
+
+def ReadJsonSpecs(path):
+    """
+    Read a JSON list of pass specs. A top-level object with a 'passes' key is
+    accepted too, so the file can carry other metadata.
+    """
+    with open(path, 'r') as f:
+        data = json.load(f)
+    if isinstance(data, dict):
+        data = data.get('passes', [])
+    if not isinstance(data, list):
+        raise PassModelError("'%s' does not contain a list of passes." % path)
+    return data
+
+
+def ReadCsvSpecs(path):
+    """
+    Read pass specs from a CSV file with a header row. Columns other than
+    type, name, iteration, enabled, base and fullName are taken as settings,
+    and empty cells fall back to the pass defaults.
+    """
+    specs = []
+    with open(path, 'r', newline='') as f:
+        for row in csv.DictReader(f):
+            spec = {}
+            for key, value in row.items():
+                if key is None or value is None:
+                    continue
+                key = key.strip()
+                value = value.strip()
+                if value == '' and key in DEFAULT_SETTINGS:
+                    continue
+                if key in DEFAULT_SETTINGS:
+                    value = CoerceSetting(key, value)
+                spec[key] = value
+            specs.append(spec)
+    return specs
@@ -0,0 +1,515 @@
+from __future__ import absolute_import
+
+import contextlib
+import heapq
+import logging
+import weakref
+from collections import OrderedDict
+
+__all__ = [
+    'PassModel',
+    'PassModelError',
+    'PassRecord',
+    'IterationAllocator',
+    'DEFAULT_SETTINGS',
+    'PASS_ATTRIBUTE_NAMES',
+    'PASS_LOCATION_ROOT',
+    'FormatPassName',
+    'ParsePassName',
+    'CoerceSetting',
+]
+
+log = logging.getLogger("PassManager.PassModel")
+
+# Per-pass settings and their defaults, named after the OpScript user parameters
+DEFAULT_SETTINGS = OrderedDict([
+    ('renderQuality', 0),
+    ('denoise', 0),
+    ('camera', '/root/world/cam/camera'),
+    ('VisibilityON', ''),
+    ('VisibilityOFF', ''),
+    ('Holdout', ''),
+    ('Prune', ''),
+])
+
+# Where passes live in the scene graph, and the names their settings take in
+# the customAttributes.passSettings group written at each pass location
+PASS_LOCATION_ROOT = '/root/world/passes/'
+PASS_ATTRIBUTE_NAMES = OrderedDict([
+    ('renderQuality', 'renderQuality'),
+    ('denoise', 'denoise'),
+    ('camera', 'camera'),
+    ('VisibilityON', 'visible'),
+    ('VisibilityOFF', 'hide'),
+    ('Holdout', 'holdout'),
+    ('Prune', 'prune'),
+])
+
+
+class PassModelError(ValueError):
+    """Raised when an operation would leave the pass model inconsistent."""
+
+
+def FormatPassName(passType, name, iteration):
+    """Build a full pass name such as 'bty_char_01'."""
+    return f"{passType}_{name}_{iteration:02}"
+
+
+def ParsePassName(fullName):
+    """
+    Split a full pass name into (type, name, iteration).
+
+    The name part may itself contain underscores, only the first and last
+    tokens are treated as the type and the iteration.
+    """
+    parts = fullName.split('_')
+    if len(parts) < 3 or not parts[0] or not parts[-1].isdigit():
+        raise PassModelError(
+            "Invalid pass name '%s'. Ensure it follows the pattern "
+            "'type_name_iteration'." % fullName)
+    name = '_'.join(parts[1:-1])
+    if not name:
+        raise PassModelError("Pass name '%s' has an empty name part." % fullName)
+    return parts[0], name, int(parts[-1])
+
+
+def CoerceSetting(key, value):
+    """
+    Return value converted to the type of DEFAULT_SETTINGS[key]. Raises
+    PassModelError for keys that are not pass settings and for values that
+    do not convert, so imported, edited and scripted settings all end up with
+    the types the network expects.
+    """
+    try:
+        default = DEFAULT_SETTINGS[key]
+    except KeyError:
+        raise PassModelError("Unknown pass setting '%s'." % key)
+    if isinstance(default, str):
+        return str(value)
+    if isinstance(value, str):
+        value = value.strip()
+    try:
+        return type(default)(value)
+    except (TypeError, ValueError):
+        raise PassModelError("Expected a number for '%s', got '%s'." % (key, value))
+
+
+class PassRecord(object):
+    """
+    A single pass. Records are owned and mutated by their PassModel.
+
+    base is the id of the pass this one inherits its settings from, or None,
+    see Inheritance.SettingsResolver.
+    """
+
+    __slots__ = ('id', 'passType', 'name', 'iteration', 'enabled', 'settings', 'base')
+
+    def __init__(self, id, passType, name, iteration, enabled=True, settings=None, base=None):
+        self.id = id
+        self.passType = passType
+        self.name = name
+        self.iteration = iteration
+        self.enabled = enabled
+        self.settings = settings if settings is not None else {}
+        self.base = base
+
+    @property
+    def key(self):
+        return (self.passType, self.name)
+
+    @property
+    def fullName(self):
+        return FormatPassName(self.passType, self.name, self.iteration)
+
+    def __repr__(self):
+        return '<PassRecord %d %s%s>' % (
+            self.id, self.fullName, '' if self.enabled else ' (disabled)')
+
+
+class IterationAllocator(object):
+    """
+    Tracks the iterations in use for one (type, name) pair.
+
+    Every iteration below the cursor is either used or waiting in the free
+    min-heap, so the lowest free iteration is found without scanning.
+    """
+
+    __slots__ = ('__used', '__free', '__cursor')
+
+    def __init__(self):
+        self.__used = set()
+        self.__free = []
+        self.__cursor = 1
+
+    def __contains__(self, iteration):
+        return iteration in self.__used
+
+    def __len__(self):
+        return len(self.__used)
+
+    def reserve(self, iteration):
+        """Mark the given iteration as used."""
+        if iteration in self.__used:
+            raise PassModelError("Iteration %02d is already in use." % iteration)
+        self.__used.add(iteration)
+
+    def allocate(self):
+        """Reserve and return the lowest free iteration."""
+        while self.__free:
+            iteration = heapq.heappop(self.__free)
+            if iteration not in self.__used:
+                self.__used.add(iteration)
+                return iteration
+        while self.__cursor in self.__used:
+            self.__cursor += 1
+        iteration = self.__cursor
+        self.__cursor += 1
+        self.__used.add(iteration)
+        return iteration
+
+    def release(self, iteration):
+        """Give back an iteration so it can be allocated again."""
+        if iteration in self.__used:
+            self.__used.remove(iteration)
+            if iteration < self.__cursor:
+                heapq.heappush(self.__free, iteration)
+
+
+class PassModel(object):
+    """
+    Indexed collection of passes, independent of Qt and Katana.
+
+    Listeners are called as ``listener(event, record, oldFullName)`` after
+    every change, where event is one of the ``PassModel.*`` event constants.
+    Bound methods are held weakly so views can simply go away. Changes made
+    inside ``batch()`` are reported as a single RESET event with no record.
+    """
+
+    ADDED = 'added'
+    REMOVED = 'removed'
+    RENAMED = 'renamed'
+    CHANGED = 'changed'
+    RESET = 'reset'
+
+    def __init__(self):
+        self.__nextId = 1
+        self.__byId = {}
+        self.__variants = {}
+        self.__byFullName = {}
+        self.__byType = {}
+        self.__byTypeName = {}
+        self.__allocators = {}
+        self.__listeners = []
+        self.__batchDepth = 0
+        self.__batchDirty = False
+
+    # Listeners
+
+    def addListener(self, listener):
+        """Register a callable to be notified of model changes."""
+        if hasattr(listener, '__self__'):
+            self.__listeners.append(weakref.WeakMethod(listener))
+        else:
+            self.__listeners.append(lambda: listener)
+
+    def removeListener(self, listener):
+        self.__listeners = [ref for ref in self.__listeners
+                            if ref() not in (None, listener)]
+
+    @contextlib.contextmanager
+    def batch(self):
+        """Group several edits so listeners are notified once, at the end."""
+        self.__batchDepth += 1
+        try:
+            yield self
+        finally:
+            self.__batchDepth -= 1
+            if self.__batchDepth == 0 and self.__batchDirty:
+                self.__batchDirty = False
+                self._notify(self.RESET, None)
+
+    def isBatching(self):
+        return self.__batchDepth > 0
+
+    def _notify(self, event, record, oldFullName=None):
+        if self.__batchDepth:
+            self.__batchDirty = True
+            return
+        dead = False
+        for ref in list(self.__listeners):
+            listener = ref()
+            if listener is None:
+                dead = True
+                continue
+            listener(event, record, oldFullName)
+        if dead:
+            self.__listeners = [ref for ref in self.__listeners if ref() is not None]
+
+    # Queries
+
+    def __len__(self):
+        return len(self.__byFullName)
+
+    def __iter__(self):
+        return iter(list(self.__byFullName.values()))
+
+    def __contains__(self, fullName):
+        return fullName in self.__byFullName
+
+    def getPass(self, fullName):
+        """Return the record for the given full name, or None."""
+        return self.__byFullName.get(fullName)
+
+    def types(self):
+        return list(self.__byType)
+
+    def names(self, passType):
+        return [name for (t, name) in self.__byTypeName if t == passType]
+
+    def passesOfType(self, passType):
+        return list(self.__byType.get(passType, {}).values())
+
+    def passesOf(self, passType, name):
+        return list(self.__byTypeName.get((passType, name), {}).values())
+
+    def getPassById(self, id):
+        return self.__byId.get(id)
+
+    def baseOf(self, record):
+        """Return the record a pass inherits from, or None."""
+        return self.__byId.get(record.base) if record.base is not None else None
+
+    def variantsOf(self, record):
+        """Return the passes whose base is the given pass."""
+        return [self.__byId[id] for id in sorted(self.__variants.get(record.id, ()))]
+
+    def descendantsOf(self, record):
+        """Return every pass inheriting from the given pass, directly or not."""
+        descendants = []
+        stack = [record.id]
+        while stack:
+            for id in sorted(self.__variants.get(stack.pop(), ())):
+                descendants.append(self.__byId[id])
+                stack.append(id)
+        return descendants
+
+    def isIterationFree(self, passType, name, iteration):
+        allocator = self.__allocators.get((passType, name))
+        return allocator is None or iteration not in allocator
+
+    # Index maintenance
+
+    def __index(self, record):
+        key = record.key
+        allocator = self.__allocators.get(key)
+        if allocator is None:
+            allocator = self.__allocators[key] = IterationAllocator()
+        if record.iteration is None:
+            record.iteration = allocator.allocate()
+        else:
+            allocator.reserve(record.iteration)
+        self.__byFullName[record.fullName] = record
+        self.__byId[record.id] = record
+        if record.base is not None:
+            self.__variants.setdefault(record.base, set()).add(record.id)
+        self.__byType.setdefault(record.passType, {})[record.id] = record
+        self.__byTypeName.setdefault(key, {})[record.iteration] = record
+
+    def __unindex(self, record):
+        key = record.key
+        del self.__byFullName[record.fullName]
+        del self.__byId[record.id]
+        self.__unlinkBase(record)
+        typePasses = self.__byType[record.passType]
+        del typePasses[record.id]
+        if not typePasses:
+            del self.__byType[record.passType]
+        namePasses = self.__byTypeName[key]
+        del namePasses[record.iteration]
+        if not namePasses:
+            del self.__byTypeName[key]
+            del self.__allocators[key]
+        else:
+            self.__allocators[key].release(record.iteration)
+
+    def __unlinkBase(self, record):
+        variants = self.__variants.get(record.base)
+        if variants is not None:
+            variants.discard(record.id)
+            if not variants:
+                del self.__variants[record.base]
+
+    def __require(self, fullName):
+        record = self.__byFullName.get(fullName)
+        if record is None:
+            raise PassModelError("No pass named '%s'." % fullName)
+        return record
+
+    # Edits
+
+    def addPass(self, passType, name, iteration=None, enabled=True, settings=None, base=None):
+        """
+        Add a pass and return its record. When iteration is None the lowest
+        free iteration for (passType, name) is used. base is the full name of
+        a pass to inherit settings from.
+        """
+        if iteration is not None and not self.isIterationFree(passType, name, iteration):
+            raise PassModelError("A pass named '%s' already exists."
+                                 % FormatPassName(passType, name, iteration))
+        baseId = self.__require(base).id if base else None
+        record = PassRecord(self.__nextId, passType, name, iteration,
+                            enabled, dict(settings) if settings else None, baseId)
+        self.__nextId += 1
+        self.__index(record)
+        self._notify(self.ADDED, record)
+        return record
+
+    def addPassByName(self, fullName, enabled=True, settings=None, base=None):
+        """Add a pass from a full 'type_name_iteration' name."""
+        passType, name, iteration = ParsePassName(fullName)
+        return self.addPass(passType, name, iteration, enabled, settings, base)
+
+    def addPasses(self, specs):
+        """
+        Add several passes inside a single batch and return their records.
+
+        Each spec is either a full pass name or a dict with 'type', 'name' and
+        optionally 'iteration', 'enabled', 'base' and any settings. A base
+        must exist or come earlier in specs. Settings are converted with
+        CoerceSetting. If one spec is invalid none of the passes are kept.
+        """
+        records = []
+        with self.batch():
+            try:
+                for spec in specs:
+                    records.append(self.__addPassFromSpec(spec))
+            except Exception:
+                for record in records:
+                    self.deletePass(record.fullName)
+                raise
+        return records
+
+    def __addPassFromSpec(self, spec):
+        if isinstance(spec, str):
+            return self.addPassByName(spec)
+        spec = dict(spec)
+        fullName = spec.pop('fullName', None)
+        if fullName:
+            passType, name, iteration = ParsePassName(fullName)
+        else:
+            try:
+                passType = spec.pop('type')
+                name = spec.pop('name')
+            except KeyError as exception:
+                raise PassModelError("Pass spec %r is missing %s." % (spec, exception))
+            iteration = spec.pop('iteration', None)
+            if iteration in ('', None):
+                iteration = None
+            else:
+                iteration = int(iteration)
+        enabled = spec.pop('enabled', True)
+        if isinstance(enabled, str):
+            enabled = enabled.strip().lower() not in ('0', 'false', 'no', 'off', '')
+        base = spec.pop('base', None) or None
+        settings = dict(spec.pop('settings', None) or {})
+        settings.update(spec)
+        settings = {key: CoerceSetting(key, value) for key, value in settings.items()}
+        return self.addPass(passType, name, iteration, bool(enabled), settings, base)
+
+    def renamePass(self, fullName, newFullName):
+        """Rename a pass, re-indexing it under its new type, name and iteration."""
+        record = self.__require(fullName)
+        if newFullName == fullName:
+            return record
+        passType, name, iteration = ParsePassName(newFullName)
+        # Compare parsed keys, 'bty_char_1' is the pass 'bty_char_01'
+        if (passType, name, iteration) == (record.passType, record.name, record.iteration):
+            return record
+        if not self.isIterationFree(passType, name, iteration):
+            raise PassModelError("A pass named '%s' already exists."
+                                 % FormatPassName(passType, name, iteration))
+        self.__unindex(record)
+        record.passType, record.name, record.iteration = passType, name, iteration
+        self.__index(record)
+        self._notify(self.RENAMED, record, fullName)
+        return record
+
+    def duplicatePass(self, fullName):
+        """Copy a pass into the next free iteration of its (type, name)."""
+        source = self.__require(fullName)
+        base = self.baseOf(source)
+        return self.addPass(source.passType, source.name, None,
+                            source.enabled, source.settings,
+                            base.fullName if base is not None else None)
+
+    def deletePass(self, fullName):
+        """
+        Remove a pass and return its record. Its variants inherit from its
+        own base from then on.
+        """
+        record = self.__require(fullName)
+        variants = self.variantsOf(record)
+        self.__unindex(record)
+        self._notify(self.REMOVED, record)
+        for variant in variants:
+            self.__linkBase(variant, record.base)
+            self._notify(self.CHANGED, variant)
+        return record
+
+    def setBase(self, fullName, baseFullName):
+        """Make a pass inherit from another one, or from none with None."""
+        record = self.__require(fullName)
+        base = self.__require(baseFullName) if baseFullName else None
+        ancestor = base
+        while ancestor is not None:
+            if ancestor is record:
+                raise PassModelError("'%s' cannot inherit from its own variant '%s'."
+                                     % (fullName, baseFullName))
+            ancestor = self.baseOf(ancestor)
+        baseId = base.id if base is not None else None
+        if record.base != baseId:
+            self.__linkBase(record, baseId)
+            self._notify(self.CHANGED, record)
+        return record
+
+    def __linkBase(self, record, baseId):
+        self.__unlinkBase(record)
+        record.base = baseId
+        if baseId is not None:
+            self.__variants.setdefault(baseId, set()).add(record.id)
+
+    def setEnabled(self, fullName, enabled):
+        record = self.__require(fullName)
+        enabled = bool(enabled)
+        if record.enabled != enabled:
+            record.enabled = enabled
+            self._notify(self.CHANGED, record)
+        return record
+
+    def updateSettings(self, fullName, **settings):
+        """Merge the given values into a pass's settings."""
+        record = self.__require(fullName)
+        changed = {k: v for k, v in settings.items() if record.settings.get(k) != v}
+        if changed:
+            record.settings.update(changed)
+            self._notify(self.CHANGED, record)
+        return record
+
+    def restore(self, records):
+        """
+        Replace every pass with the given records, keeping their ids, and
+        report a single RESET. Used to load passes stored on a node.
+        """
+        with self.batch():
+            self.clear()
+            for record in records:
+                if record.fullName in self.__byFullName:
+                    raise PassModelError("A pass named '%s' already exists." % record.fullName)
+                self.__index(record)
+                self.__nextId = max(self.__nextId, record.id + 1)
+            self.__batchDirty = True
+
+    def clear(self):
+        with self.batch():
+            for record in list(self.__byFullName.values()):
+                self.deletePass(record.fullName)
@@ -0,0 +1,113 @@
+from __future__ import absolute_import
+
+import base64
+import json
+import logging
+import zlib
+
+from .PassModel import PassModelError, PassRecord
+
+__all__ = [
+    'EncodePasses',
+    'DecodePasses',
+    'PassTableEncoder',
+    'AddPassesParam',
+    'STORE_VERSION',
+]
+
+log = logging.getLogger("PassManager.PassStore")
+
+# Version of the encoded pass table, written as the 'version:' prefix
+STORE_VERSION = 1
+
+# The table is compressed again after every edit, so favour speed: level 1
+# is several times faster than the default and still shrinks it about 6x
+COMPRESSION_LEVEL = 1
+
+
+def AddPassesParam(gnode):
+    """Create the 'passes' parameter holding the encoded pass table of a node."""
+    return gnode.getParameters().createChildString('passes', '')
+
+
+def _EncodeRow(record):
+    return json.dumps([record.id, record.passType, record.name, record.iteration,
+                       1 if record.enabled else 0, record.settings, record.base],
+                      separators=(',', ':'), sort_keys=True)
+
+
+def _Pack(rows):
+    if not rows:
+        return ''
+    data = ('[%s]' % ','.join(rows)).encode('utf-8')
+    return '%d:%s' % (STORE_VERSION, base64.b64encode(zlib.compress(data, COMPRESSION_LEVEL)).decode('ascii'))
+
+
+def EncodePasses(passModel):
+    """
+    Return the passes of a model as one compact string for the node's
+    'passes' parameter: a version prefix, then base64 of zlib compressed
+    JSON rows of [id, type, name, iteration, enabled, settings, base id].
+    Only the settings a pass sets itself are stored, a value equal to the
+    default still overrides the one inherited from a base pass.
+    """
+    return _Pack([_EncodeRow(record)
+                  for record in sorted(passModel, key=lambda record: record.id)])
+
+
+class PassTableEncoder(object):
+    """
+    Produces the same string as EncodePasses, re-encoding only the rows of
+    the passes reported through ``passChanged`` and ``passRemoved``. Every
+    row is encoded again after ``passesReset``.
+    """
+
+    def __init__(self):
+        self.__rows = {}
+        self.passesReset()
+
+    def passesReset(self):
+        self.__full = True
+        self.__dirty = {}
+
+    def passChanged(self, record):
+        self.__dirty[record.id] = record
+
+    def passRemoved(self, record):
+        self.__dirty.pop(record.id, None)
+        self.__rows.pop(record.id, None)
+
+    def encode(self, passModel):
+        if self.__full:
+            self.__rows = {record.id: _EncodeRow(record) for record in passModel}
+            self.__full = False
+        else:
+            for id, record in self.__dirty.items():
+                self.__rows[id] = _EncodeRow(record)
+        self.__dirty = {}
+        return _Pack([self.__rows[id] for id in sorted(self.__rows)])
+
+
+def DecodePasses(text):
+    """Return the PassRecords stored in a string written by EncodePasses."""
+    if not text:
+        return []
+    version, _, payload = text.partition(':')
+    decoder = _decoders.get(version)
+    if decoder is None:
+        raise PassModelError("Unsupported pass table version '%s'." % version)
+    try:
+        return decoder(payload)
+    except (ValueError, TypeError, IndexError, zlib.error) as exception:
+        raise PassModelError("Could not decode the pass table: %s" % exception)
+
+
+def _DecodeVersion1(payload):
+    rows = json.loads(zlib.decompress(base64.b64decode(payload)).decode('utf-8'))
+    return [PassRecord(id, passType, name, iteration, bool(enabled), settings, base)
+            for id, passType, name, iteration, enabled, settings, base in rows]
+
+
+_decoders = {
+    '1': _DecodeVersion1,
+}
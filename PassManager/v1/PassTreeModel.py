@@ -0,0 +1,361 @@
+from __future__ import absolute_import
+
+import bisect
+import logging
+
+from PyQt5 import QtCore, QtGui
+
+from .PassModel import PassModel
+from .Instrumentation import Span
+
+__all__ = ['PassTreeModel', 'PassFilterProxyModel']
+
+log = logging.getLogger("PassManager.PassTreeModel")
+
+NAME_COLUMN = 0
+ENABLE_COLUMN = 1
+
+
+class _TreeNode(object):
+    """
+    A type, name or pass row. Children are kept sorted by their key, which is
+    (text, incoming) so a pass can be listed both locally and as incoming.
+    """
+
+    __slots__ = ('parent', 'key', 'record', 'children', 'childKeys')
+
+    def __init__(self, parent, text, record=None, incoming=False):
+        self.parent = parent
+        self.key = (text, incoming)
+        self.record = record
+        self.children = []
+        self.childKeys = []
+
+    @property
+    def text(self):
+        return self.key[0]
+
+    @property
+    def incoming(self):
+        return self.key[1]
+
+    def row(self):
+        return bisect.bisect_left(self.parent.childKeys, self.key)
+
+
+class PassTreeModel(QtCore.QAbstractItemModel):
+    """
+    Three level type / name / pass view of a PassModel.
+
+    Only the rows the view asks for are ever touched, and the enable state is
+    served through Qt.CheckStateRole instead of a widget per row. Passes of an
+    optional incoming model, found in the upstream scene, are listed read-only
+    next to the node's own passes.
+    """
+
+    def __init__(self, passModel, parent=None):
+        super().__init__(parent)
+        self.__passModel = passModel
+        self.__incomingModel = None
+        self.__root = _TreeNode(None, None)
+        self.__typeNodes = {}
+        self.__nameNodes = {}
+        self.__passNodes = {}
+        self.__toolTipProvider = None
+        self.__badgeProvider = None
+        self.__checkHandler = None
+        self.__pendingEdits = None
+        self.__rebuild()
+        passModel.addListener(self.__onPassModelChanged)
+
+    # Structure
+
+    def __rebuild(self):
+        self.__root = _TreeNode(None, None)
+        self.__typeNodes.clear()
+        self.__nameNodes.clear()
+        self.__passNodes.clear()
+        for record in self.__passModel:
+            self.__insertPassNode(record, notify=False)
+        if self.__incomingModel is not None:
+            for record in self.__incomingModel:
+                self.__insertPassNode(record, notify=False, incoming=True)
+
+    def __insertChild(self, parentNode, node, notify):
+        row = bisect.bisect_left(parentNode.childKeys, node.key)
+        if notify:
+            self.beginInsertRows(self.__indexForNode(parentNode), row, row)
+        parentNode.childKeys.insert(row, node.key)
+        parentNode.children.insert(row, node)
+        if notify:
+            self.endInsertRows()
+
+    def __removeChild(self, node):
+        parentNode = node.parent
+        row = node.row()
+        self.beginRemoveRows(self.__indexForNode(parentNode), row, row)
+        del parentNode.childKeys[row]
+        del parentNode.children[row]
+        self.endRemoveRows()
+
+    def __insertPassNode(self, record, notify=True, incoming=False):
+        typeNode = self.__typeNodes.get(record.passType)
+        if typeNode is None:
+            typeNode = self.__typeNodes[record.passType] = _TreeNode(self.__root, record.passType)
+            self.__insertChild(self.__root, typeNode, notify)
+        nameNode = self.__nameNodes.get(record.key)
+        if nameNode is None:
+            nameNode = self.__nameNodes[record.key] = _TreeNode(typeNode, record.name)
+            self.__insertChild(typeNode, nameNode, notify)
+        passNode = _TreeNode(nameNode, record.fullName, record, incoming)
+        self.__passNodes[(incoming, record.id)] = passNode
+        self.__insertChild(nameNode, passNode, notify)
+
+    def __removePassNode(self, record, incoming=False):
+        passNode = self.__passNodes.pop((incoming, record.id), None)
+        if passNode is None:
+            return
+        nameNode = passNode.parent
+        typeNode = nameNode.parent
+        self.__removeChild(passNode)
+        if not nameNode.children:
+            self.__removeChild(nameNode)
+            del self.__nameNodes[(typeNode.text, nameNode.text)]
+            if not typeNode.children:
+                self.__removeChild(typeNode)
+                del self.__typeNodes[typeNode.text]
+
+    def __indexForNode(self, node, column=NAME_COLUMN):
+        if node is None or node is self.__root:
+            return QtCore.QModelIndex()
+        return self.createIndex(node.row(), column, node)
+
+    def __onPassModelChanged(self, event, record, oldFullName, incoming=False):
+        if event == PassModel.ADDED:
+            self.__insertPassNode(record, incoming=incoming)
+        elif event == PassModel.REMOVED:
+            self.__removePassNode(record, incoming)
+        elif event == PassModel.RENAMED:
+            self.__removePassNode(record, incoming)
+            self.__insertPassNode(record, incoming=incoming)
+        elif event == PassModel.CHANGED:
+            self.refreshPass(record, incoming)
+        elif event == PassModel.RESET:
+            self.beginResetModel()
+            self.__rebuild()
+            self.endResetModel()
+
+    def __onIncomingModelChanged(self, event, record, oldFullName):
+        self.__onPassModelChanged(event, record, oldFullName, incoming=True)
+
+    # Public helpers
+
+    def setIncomingModel(self, incomingModel):
+        """Show the passes of incomingModel as read-only incoming rows, or none."""
+        if self.__incomingModel is not None:
+            self.__incomingModel.removeListener(self.__onIncomingModelChanged)
+        self.beginResetModel()
+        self.__incomingModel = incomingModel
+        self.__rebuild()
+        self.endResetModel()
+        if incomingModel is not None:
+            incomingModel.addListener(self.__onIncomingModelChanged)
+
+    def isIncoming(self, index):
+        return index.isValid() and index.internalPointer().incoming
+
+    def setToolTipProvider(self, provider):
+        """Use provider(record) to build the tool tip of pass rows."""
+        self.__toolTipProvider = provider
+
+    def setBadgeProvider(self, provider):
+        """Use provider(record) for the icon next to local pass names, or None."""
+        self.__badgeProvider = provider
+
+    def refreshPass(self, record, incoming=False):
+        """Tell the views the row of a pass needs repainting."""
+        passNode = self.__passNodes.get((incoming, record.id))
+        if passNode is not None:
+            self.dataChanged.emit(self.__indexForNode(passNode, NAME_COLUMN),
+                                  self.__indexForNode(passNode, ENABLE_COLUMN))
+
+    def setCheckHandler(self, handler, pendingEdits=None):
+        """
+        Call handler(record, enabled) for checkbox changes instead of writing
+        them to the pass model, so the caller can queue them. Checkboxes show
+        the state queued in pendingEdits, a PassEdits.PassEditQueue, until
+        the queue is flushed.
+        """
+        self.__checkHandler = handler
+        self.__pendingEdits = pendingEdits
+
+    def passModel(self):
+        return self.__passModel
+
+    def recordForIndex(self, index):
+        """Return the pass record of an index, or None for type and name rows."""
+        if not index.isValid():
+            return None
+        return index.internalPointer().record
+
+    def indexForKey(self, key):
+        """Return the index of the name row of a (type, name) key, invalid if none."""
+        return self.__indexForNode(self.__nameNodes.get(key))
+
+    def passCounts(self):
+        """Return ((type, name), number of pass rows) for every name row, in tree order."""
+        return [((typeNode.text, nameNode.text), len(nameNode.children))
+                for typeNode in self.__root.children for nameNode in typeNode.children]
+
+    def indexForRecord(self, record, column=NAME_COLUMN, incoming=False):
+        passNode = self.__passNodes.get((incoming, record.id))
+        return self.__indexForNode(passNode, column)
+
+    # QAbstractItemModel
+
+    def index(self, row, column, parent=QtCore.QModelIndex()):
+        parentNode = parent.internalPointer() if parent.isValid() else self.__root
+        if row < 0 or row >= len(parentNode.children):
+            return QtCore.QModelIndex()
+        return self.createIndex(row, column, parentNode.children[row])
+
+    def parent(self, index):
+        if not index.isValid():
+            return QtCore.QModelIndex()
+        return self.__indexForNode(index.internalPointer().parent)
+
+    def rowCount(self, parent=QtCore.QModelIndex()):
+        if parent.column() > 0:
+            return 0
+        parentNode = parent.internalPointer() if parent.isValid() else self.__root
+        return len(parentNode.children)
+
+    def columnCount(self, parent=QtCore.QModelIndex()):
+        return 2
+
+    def hasChildren(self, parent=QtCore.QModelIndex()):
+        return self.rowCount(parent) > 0
+
+    def headerData(self, section, orientation, role=QtCore.Qt.DisplayRole):
+        if orientation == QtCore.Qt.Horizontal and role == QtCore.Qt.DisplayRole:
+            return ('Name', 'Enable')[section]
+        return None
+
+    def data(self, index, role=QtCore.Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        node = index.internalPointer()
+        if index.column() == NAME_COLUMN:
+            if role == QtCore.Qt.DisplayRole:
+                return node.text
+            if role == QtCore.Qt.UserRole:
+                return node.record
+            if node.incoming:
+                if role == QtCore.Qt.FontRole:
+                    font = QtGui.QFont()
+                    font.setItalic(True)
+                    return font
+                if role == QtCore.Qt.ForegroundRole:
+                    return QtGui.QBrush(QtGui.QColor(140, 140, 140))
+            if role == QtCore.Qt.ToolTipRole and node.record is not None \
+                    and self.__toolTipProvider is not None:
+                return self.__toolTipProvider(node.record)
+            if role == QtCore.Qt.DecorationRole and node.record is not None \
+                    and not node.incoming and self.__badgeProvider is not None:
+                return self.__badgeProvider(node.record)
+        elif index.column() == ENABLE_COLUMN and node.record is not None and not node.incoming:
+            if role == QtCore.Qt.CheckStateRole:
+                enabled = node.record.enabled if self.__pendingEdits is None \
+                    else self.__pendingEdits.pendingEnabled(node.record)
+                return QtCore.Qt.Checked if enabled else QtCore.Qt.Unchecked
+        return None
+
+    def flags(self, index):
+        if not index.isValid():
+            return QtCore.Qt.NoItemFlags
+        flags = QtCore.Qt.ItemIsEnabled | QtCore.Qt.ItemIsSelectable
+        node = index.internalPointer()
+        if index.column() == ENABLE_COLUMN and node.record is not None and not node.incoming:
+            flags |= QtCore.Qt.ItemIsUserCheckable
+        return flags
+
+    def setData(self, index, value, role=QtCore.Qt.EditRole):
+        if (role != QtCore.Qt.CheckStateRole or index.column() != ENABLE_COLUMN
+                or not index.isValid()):
+            return False
+        node = index.internalPointer()
+        record = node.record
+        if record is None or node.incoming:
+            return False
+        enabled = value == QtCore.Qt.Checked
+        if self.__checkHandler is not None:
+            self.__checkHandler(record, enabled)
+            # The model only changes when the edit is flushed, show it now
+            self.dataChanged.emit(index, index, [QtCore.Qt.CheckStateRole])
+            return True
+        # The resulting CHANGED event emits dataChanged
+        with Span('editor.toggle', log):
+            self.__passModel.setEnabled(record.fullName, enabled)
+        return True
+
+
+class PassFilterProxyModel(QtCore.QSortFilterProxyModel):
+    """
+    Shows only the passes found by a search, see SearchIndex.PassSearchIndex,
+    and the type and name rows leading to them.
+
+    The matches are handed over as records, so filtering never parses names:
+    type and name rows are accepted by key and their pass rows are only
+    visited when the parent row was accepted.
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setDynamicSortFilter(False)
+        self.__ids = None
+        self.__types = set()
+        self.__keys = {}
+
+    def setMatches(self, records, incomingRecords=None):
+        """Show the given local and incoming pass records, or everything with None."""
+        if records is None:
+            if self.__ids is None:
+                return
+            self.__ids = None
+        else:
+            incomingRecords = incomingRecords or ()
+            self.__ids = ({(False, record.id) for record in records}
+                          | {(True, record.id) for record in incomingRecords})
+            self.__types = set()
+            self.__keys = {}
+            for group in (records, incomingRecords):
+                for record in group:
+                    self.__types.add(record.passType)
+                    self.__keys[record.key] = self.__keys.get(record.key, 0) + 1
+        self.invalidateFilter()
+
+    def isFiltering(self):
+        return self.__ids is not None
+
+    def passCounts(self):
+        """
+        Return ((type, name), number of passes shown) for every name row
+        shown, in tree order, see PassTreeModel.passCounts.
+        """
+        counts = self.sourceModel().passCounts()
+        if self.__ids is None:
+            return counts
+        return [(key, self.__keys[key]) for key, _ in counts if key in self.__keys]
+
+    def filterAcceptsRow(self, sourceRow, sourceParent):
+        if self.__ids is None:
+            return True
+        parentNode = sourceParent.internalPointer() if sourceParent.isValid() else None
+        if parentNode is None:
+            model = self.sourceModel()
+            node = model.index(sourceRow, NAME_COLUMN, sourceParent).internalPointer()
+            return node.text in self.__types
+        node = parentNode.children[sourceRow]
+        if node.record is not None:
+            return (node.incoming, node.record.id) in self.__ids
+        return (parentNode.text, node.text) in self.__keys
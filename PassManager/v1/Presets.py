@@ -0,0 +1,197 @@
+from __future__ import absolute_import
+
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from .PassModel import DEFAULT_SETTINGS, PassModelError
+
+__all__ = [
+    'PresetLibrary',
+    'GetPresetLibrary',
+    'GetPresetSearchPath',
+    'PRESET_PATH_ENV',
+]
+
+log = logging.getLogger("PassManager.Presets")
+
+# Extra preset directories or files, separated by os.pathsep. Later entries
+# override earlier ones, and all of them override the presets shipped here.
+PRESET_PATH_ENV = 'PASSMANAGER_PRESET_PATH'
+
+# Preset files are checked for changes at most this often, in seconds
+CHECK_INTERVAL = 2.0
+
+
+def GetPresetSearchPath():
+    """Return the preset directories and files, lowest priority first."""
+    paths = [os.path.join(os.path.dirname(__file__), 'presets')]
+    paths.extend(path for path in os.environ.get(PRESET_PATH_ENV, '').split(os.pathsep)
+                 if path)
+    return paths
+
+
+def _ReadPresetFile(path):
+    """
+    Parse a preset file:
+
+        {
+            "names": ["char", "env"],
+            "defaults": {"camera": "/root/world/cam/shotCam"},
+            "types": {"bty": {}, "rfl": {"renderQuality": 2}}
+        }
+
+    "defaults" apply to every type, each type's settings apply on top.
+    """
+    with open(path, 'r') as f:
+        data = json.load(f)
+    if not isinstance(data, dict):
+        raise PassModelError("Preset file '%s' must contain an object." % path)
+    types = data.get('types', {})
+    if isinstance(types, list):
+        types = {passType: {} for passType in types}
+    preset = {
+        'names': [str(name) for name in data.get('names', [])],
+        'defaults': dict(data.get('defaults', {})),
+        'types': OrderedDict((str(passType), dict(settings or {}))
+                             for passType, settings in types.items()),
+    }
+    for settings in [preset['defaults']] + list(preset['types'].values()):
+        unknown = set(settings) - set(DEFAULT_SETTINGS)
+        if unknown:
+            raise PassModelError("Preset file '%s' has unknown settings: %s."
+                                 % (path, ', '.join(sorted(unknown))))
+    return preset
+
+
+class PresetLibrary(object):
+    """
+    Pass types, names and default settings read from preset files.
+
+    Parsed files are cached by path and modification time. ``refresh`` only
+    stats the files, at most every CHECK_INTERVAL seconds, and re-reads the
+    ones that changed; the merged types and settings are rebuilt only then,
+    and ``generation`` is bumped so users of the settings can tell.
+    """
+
+    def __init__(self, searchPath=None):
+        self.__searchPath = searchPath
+        self.__files = {}
+        self.__lock = threading.Lock()
+        self.__lastCheck = None
+        self.__types = OrderedDict()
+        self.__names = []
+        self.__settings = {}
+        self.generation = 0
+
+    def __presetFiles(self):
+        searchPath = self.__searchPath if self.__searchPath is not None \
+            else GetPresetSearchPath()
+        files = []
+        for path in searchPath:
+            if os.path.isdir(path):
+                files.extend(os.path.join(path, fileName)
+                             for fileName in sorted(os.listdir(path))
+                             if fileName.lower().endswith('.json'))
+            elif os.path.isfile(path):
+                files.append(path)
+        return files
+
+    def refresh(self, force=False):
+        """Re-read the preset files that changed and return True if any did."""
+        now = time.monotonic()
+        with self.__lock:
+            if not force and self.__lastCheck is not None \
+                    and now - self.__lastCheck < CHECK_INTERVAL:
+                return False
+            self.__lastCheck = now
+
+            changed = False
+            files = self.__presetFiles()
+            for path in set(self.__files) - set(files):
+                del self.__files[path]
+                changed = True
+            for path in files:
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                stamp = (stat.st_mtime_ns, stat.st_size)
+                cached = self.__files.get(path)
+                if cached is not None and cached[0] == stamp:
+                    continue
+                try:
+                    preset = _ReadPresetFile(path)
+                except (OSError, ValueError) as exception:
+                    log.warning('Could not read preset file "%s": %s', path, exception)
+                    preset = None
+                self.__files[path] = (stamp, preset)
+                changed = True
+                log.debug('Loaded preset file "%s"', path)
+
+            if changed:
+                self.__merge([self.__files[path][1] for path in files
+                              if path in self.__files])
+            return changed
+
+    def __merge(self, presets):
+        types = OrderedDict()
+        names = []
+        defaults = {}
+        for preset in presets:
+            if preset is None:
+                continue
+            defaults.update(preset['defaults'])
+            for passType, settings in preset['types'].items():
+                types.setdefault(passType, {}).update(settings)
+            names.extend(name for name in preset['names'] if name not in names)
+        self.__types = types
+        self.__names = names
+        self.__settings = {passType: dict(defaults, **settings)
+                           for passType, settings in types.items()}
+        self.__settings[None] = defaults
+        self.generation += 1
+
+    def __ensureLoaded(self):
+        if self.__lastCheck is None:
+            self.refresh()
+
+    def types(self):
+        self.__ensureLoaded()
+        return list(self.__types)
+
+    def names(self):
+        self.__ensureLoaded()
+        return list(self.__names)
+
+    def settingsFor(self, passType=None):
+        """
+        Return the preset values that differ from DEFAULT_SETTINGS for a pass
+        type, or for any pass with None. Unknown types get the shared defaults.
+        """
+        self.__ensureLoaded()
+        settings = self.__settings.get(passType)
+        if settings is None:
+            settings = self.__settings.get(None, {})
+        return {key: value for key, value in settings.items()
+                if DEFAULT_SETTINGS[key] != value}
+
+    def defaultSettings(self, passType=None):
+        """Return every setting of a pass type, DEFAULT_SETTINGS with presets applied."""
+        settings = OrderedDict(DEFAULT_SETTINGS)
+        settings.update(self.settingsFor(passType))
+        return settings
+
+
+_sharedLibrary = None
+
+
+def GetPresetLibrary():
+    """Return the session-wide preset library."""
+    global _sharedLibrary
+    if _sharedLibrary is None:
+        _sharedLibrary = PresetLibrary()
+    return _sharedLibrary
@@ -0,0 +1,73 @@
+from __future__ import absolute_import
+
+import logging
+import threading
+
+from Katana import NodegraphAPI
+
+__all__ = ['NodeRegistry', 'GetNodeRegistry', 'GetPassManagerNodes']
+
+log = logging.getLogger("PassManager.Registry")
+
+
+class NodeRegistry(object):
+    """
+    The live PassManager nodes of the session.
+
+    Nodes add themselves when created or upgraded, and the node_create,
+    node_delete and nodegraph_loadEnd handlers of Node.py keep the set
+    current. The first query, and the first one after a script was loaded,
+    seeds it from the node graph. Later queries don't scan the graph.
+    """
+
+    def __init__(self, nodeType='PassManager'):
+        self.__nodeType = nodeType
+        self.__nodes = {}
+        self.__seeded = False
+        self.__lock = threading.Lock()
+
+    def add(self, node):
+        with self.__lock:
+            self.__nodes[id(node)] = node
+
+    def remove(self, node):
+        with self.__lock:
+            self.__nodes.pop(id(node), None)
+
+    def reset(self):
+        """Forget every node, the next query seeds the registry again."""
+        with self.__lock:
+            self.__nodes.clear()
+            self.__seeded = False
+
+    def nodes(self):
+        """Return the live nodes, sorted by name."""
+        with self.__lock:
+            if not self.__seeded:
+                for node in NodegraphAPI.GetAllNodesByType(self.__nodeType):
+                    self.__nodes[id(node)] = node
+                self.__seeded = True
+            # A node missed by node_delete is no longer found under its name
+            for key, node in list(self.__nodes.items()):
+                if NodegraphAPI.GetNode(node.getName()) is not node:
+                    del self.__nodes[key]
+            nodes = list(self.__nodes.values())
+        return sorted(nodes, key=lambda node: node.getName())
+
+    def __len__(self):
+        return len(self.nodes())
+
+
+_sharedRegistry = None
+
+
+def GetNodeRegistry():
+    """Return the session-wide registry of PassManager nodes."""
+    global _sharedRegistry
+    if _sharedRegistry is None:
+        _sharedRegistry = NodeRegistry()
+    return _sharedRegistry
+
+
+def GetPassManagerNodes():
+    return GetNodeRegistry().nodes()
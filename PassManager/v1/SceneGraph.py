@@ -0,0 +1,223 @@
+from __future__ import absolute_import
+
+import fnmatch
+import itertools
+import logging
+import weakref
+
+from .PassModel import PASS_ATTRIBUTE_NAMES
+
+__all__ = ['SceneGraphProvider', 'KatanaSceneGraphProvider', 'LocalSceneGraph']
+
+log = logging.getLogger("PassManager.SceneGraph")
+
+
+class SceneGraphProvider(object):
+    """
+    Read-only access to the scene coming into a PassManager node.
+
+    The pass tools only talk to the scene through this interface, so they can
+    run against a stand-in scene outside of Katana.
+    """
+
+    def sceneHash(self):
+        """Return a value that changes whenever the incoming scene may have changed."""
+        raise NotImplementedError
+
+    def resolveCel(self, expression):
+        """Return the locations matched by a CEL expression."""
+        raise NotImplementedError
+
+    def prepare(self):
+        """
+        Called on the main thread before the provider is used from a worker
+        thread, for anything that must touch the node graph.
+        """
+
+    def listChildren(self, path):
+        """Return the child names of a location, or an empty list."""
+        raise NotImplementedError
+
+    def locationExists(self, path):
+        """Return True if the location is in the scene."""
+        parent, _, name = path.rstrip('/').rpartition('/')
+        if not parent:
+            return name == 'root'
+        return name in self.listChildren(parent)
+
+    def getPassSettings(self, path):
+        """Return the customAttributes.passSettings of a location as pass settings."""
+        raise NotImplementedError
+
+
+# Bumped on every batch of node graph edits, see KatanaSceneGraphProvider.sceneHash
+_graphGeneration = itertools.count(1)
+_currentGeneration = 0
+_providers = weakref.WeakSet()
+_handlersRegistered = False
+
+
+def _EventNodes(kwargs):
+    """Return the nodes an event is about, None for a node that no longer exists."""
+    node = kwargs.get('node')
+    if node is not None:
+        return [node]
+    from Katana import NodegraphAPI
+    return [NodegraphAPI.GetNode(name)
+            for name in (kwargs.get('nodeNameA'), kwargs.get('nodeNameB')) if name] or [None]
+
+
+def _Ancestors(node):
+    """Return node and every group it is inside."""
+    nodes = []
+    while node is not None:
+        nodes.append(node)
+        node = node.getParent()
+    return nodes
+
+
+def _OnNodegraphChanged(args):
+    global _currentGeneration
+    generation = _currentGeneration = next(_graphGeneration)
+    edited = []
+    for _eventType, _eventID, kwargs in args:
+        for node in _EventNodes(kwargs):
+            edited.append(_Ancestors(node) if node is not None else None)
+    for provider in list(_providers):
+        provider._nodegraphChanged(generation, edited)
+
+
+def _RegisterNodegraphHandlers():
+    global _handlersRegistered
+    if _handlersRegistered:
+        return
+    import Utils
+    for eventType in ('parameter_finalizeValue', 'port_connect', 'port_disconnect',
+                      'node_create', 'node_delete', 'node_setBypassed'):
+        Utils.EventModule.RegisterCollapsedHandler(_OnNodegraphChanged, eventType, None)
+    _handlersRegistered = True
+
+
+class KatanaSceneGraphProvider(SceneGraphProvider):
+    """Resolves against the scene cooked at the input of a PassManager node."""
+
+    def __init__(self, node):
+        _RegisterNodegraphHandlers()
+        self.__node = node
+        self.__client = None
+        # Cache entries written before now may be of an older scene
+        self.__generation = _currentGeneration
+        _providers.add(self)
+
+    def _nodegraphChanged(self, generation, edited):
+        """
+        Called with the ancestors of every node of a batch of edits, None
+        for nodes that are gone. Edits made inside the PassManager node,
+        such as the passes it syncs to its own network, leave its incoming
+        scene alone and are ignored.
+        """
+        node = self.__node
+        if any(ancestors is None or node not in ancestors for ancestors in edited):
+            self.__generation = generation
+
+    def __upstreamNode(self):
+        ports = self.__node.getInputPortByIndex(0).getConnectedPorts()
+        return ports[0].getNode() if ports else None
+
+    def sceneHash(self):
+        # Any edit outside the PassManager node may change the incoming
+        # scene, so the hash is the upstream node plus the node graph
+        # generation of the last such edit. Generations are shared by every
+        # provider, so two providers of one upstream scene share CEL results.
+        upstream = self.__upstreamNode()
+        return (upstream.getName() if upstream else None, self.__generation)
+
+    def resolveCel(self, expression):
+        upstream = self.__upstreamNode()
+        if upstream is None:
+            return []
+        from UI4.Widgets import CollectAndSelectInScenegraph
+        collector = CollectAndSelectInScenegraph(expression, '/root')
+        return collector.collectAndSelect(select=False, node=upstream)
+
+    def prepare(self):
+        from Katana import FnGeolib, Nodes3DAPI
+        self.__client = None
+        upstream = self.__upstreamNode()
+        if upstream is None:
+            return
+        runtime = FnGeolib.GetRegisteredRuntimeInstance()
+        txn = runtime.createTransaction()
+        client = txn.createClient()
+        txn.setClientOp(client, Nodes3DAPI.GetOp(txn, upstream))
+        runtime.commit(txn)
+        self.__client = client
+
+    def __cook(self, path):
+        if self.__client is None:
+            return None
+        return self.__client.cookLocation(path)
+
+    def listChildren(self, path):
+        data = self.__cook(path)
+        if data is None:
+            return []
+        return list(data.getPotentialChildren().getNearestSample(0.0))
+
+    def getPassSettings(self, path):
+        data = self.__cook(path)
+        group = data.getAttrs().getChildByName('customAttributes.passSettings') \
+            if data is not None else None
+        if group is None:
+            return {}
+        settings = {}
+        for key, attrName in PASS_ATTRIBUTE_NAMES.items():
+            attr = group.getChildByName(attrName)
+            if attr is not None:
+                settings[key] = attr.getValue()
+        return settings
+
+
+class LocalSceneGraph(SceneGraphProvider):
+    """
+    In-memory stand-in scene, for running the pass tools without Katana.
+
+    ``locations`` maps location paths to their pass settings (or None), parent
+    locations are created implicitly. CEL support is limited to lists of
+    paths, which may use shell-style wildcards.
+    """
+
+    def __init__(self, locations=None):
+        self.__children = {}
+        self.__settings = {}
+        self.__generation = 0
+        for path, settings in (locations or {}).items():
+            self.addLocation(path, settings)
+
+    def addLocation(self, path, settings=None):
+        self.__generation += 1
+        self.__settings[path] = dict(settings) if settings else {}
+        parent, _, name = path.rpartition('/')
+        while parent:
+            children = self.__children.setdefault(parent, [])
+            if name in children:
+                break
+            children.append(name)
+            if parent in self.__settings:
+                break
+            self.__settings[parent] = {}
+            parent, _, name = parent.rpartition('/')
+
+    def sceneHash(self):
+        return (id(self), self.__generation)
+
+    def resolveCel(self, expression):
+        patterns = expression.replace('(', ' ').replace(')', ' ').split()
+        return [path for path in self.__settings
+                if any(fnmatch.fnmatchcase(path, pattern) for pattern in patterns)]
+
+    def listChildren(self, path):
+        return list(self.__children.get(path.rstrip('/'), ()))
+
+    def getPassSettings(self, path):
+        return dict(self.__settings.get(path, {}))
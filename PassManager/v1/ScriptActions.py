@@ -2,6 +2,20 @@ from __future__ import absolute_import
 
 from Katana import NodegraphAPI
 
+from .PassModel import DEFAULT_SETTINGS
+
+# Widget hints for the per-pass settings on OpScript nodes
+PASS_SETTINGS_HINTS = {
+    'mode': "{'widget': 'mapper', 'options': {'Create': 0, 'Override': 1, 'Merged Override': 2}, 'constant': True}",
+    'renderQuality': "{'widget': 'mapper', 'options': {'Low': 0, 'Medium': 1, 'High': 2}, 'constant': True}",
+    'denoise': "{'widget': 'checkBox', 'constant': True}",
+    'camera': "{'widget': 'scenegraphLocation'}",
+    'VisibilityON': "{'widget': 'cel'}",
+    'VisibilityOFF': "{'widget': 'cel'}",
+    'Holdout': "{'widget': 'cel'}",
+    'Prune': "{'widget': 'cel'}",
+}
+
 def GetRefNode(gnode, key):
     p = gnode.getParameter('node_'+key)
     if not p:
@@ -15,4 +29,34 @@ def AddNodeReferenceParam(destNode, paramName, node):
     if not param:
         param = destNode.getParameters().createChildString(paramName, '')
     
-    param.setExpression('getNode(%r).getNodeName()' % node.getName())
\ No newline at end of file
+    param.setExpression('getNode(%r).getNodeName()' % node.getName())
+
+
+def RemoveNodeReferenceParam(destNode, paramName):
+    param = destNode.getParameter(paramName)
+    if param:
+        destNode.getParameters().deleteChild(param)
+
+
+def GetNodeReferenceParams(gnode, prefix):
+    """Return {key: param} for every 'node_<prefix><key>' reference param."""
+    start = 'node_' + prefix
+    return {p.getName()[len(start):]: p
+            for p in gnode.getParameters().getChildren()
+            if p.getName().startswith(start)}
+
+
+def AddPassSettingsParams(opscriptNode, settings=None, mode=0):
+    """Create the user.* pass settings group read by OpScript.lua."""
+    values = dict(DEFAULT_SETTINGS)
+    if settings:
+        values.update(settings)
+    user_attr = opscriptNode.getParameters().createChildGroup("user")
+    user_attr.createChildNumber('mode', mode).setHintString(PASS_SETTINGS_HINTS['mode'])
+    for key, default in DEFAULT_SETTINGS.items():
+        if isinstance(default, str):
+            param = user_attr.createChildString(key, values[key])
+        else:
+            param = user_attr.createChildNumber(key, values[key])
+        param.setHintString(PASS_SETTINGS_HINTS[key])
+    return user_attr
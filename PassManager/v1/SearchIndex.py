@@ -0,0 +1,118 @@
+from __future__ import absolute_import
+
+import bisect
+import logging
+
+from .PassModel import PassModel
+
+__all__ = ['PassSearchIndex']
+
+log = logging.getLogger("PassManager.SearchIndex")
+
+
+def _RecordTokens(record):
+    """The lower case words a pass can be found by, each matched as a prefix."""
+    passType = record.passType.lower()
+    name = record.name.lower()
+    iteration = '%02d' % record.iteration
+    tokens = {record.fullName.lower(), passType, name, iteration, str(record.iteration),
+              '%s_%s' % (name, iteration)}
+    if '_' in name:
+        tokens.update(name.split('_'))
+    tokens.discard('')
+    return tokens
+
+
+class PassSearchIndex(object):
+    """
+    Prefix index over the names of the passes of a PassModel, kept up to date
+    through the model's listener events so adding, renaming or deleting a
+    pass only touches that pass's tokens.
+
+    A query is split on whitespace and every term must be the prefix of one
+    of a pass's tokens: its full name, type, name, the parts of a name with
+    underscores, 'name_iteration' or its iteration. Matching is case
+    insensitive, so 'bty ch 02' finds 'bty_char_02'.
+    """
+
+    def __init__(self, passModel):
+        self.__passModel = passModel
+        self.__tokens = []
+        self.__postings = {}
+        self.__recordTokens = {}
+        self.__records = {}
+        self.__rebuild()
+        passModel.addListener(self.__onPassModelChanged)
+
+    def __len__(self):
+        return len(self.__records)
+
+    def __rebuild(self):
+        self.__tokens = []
+        self.__postings = {}
+        self.__recordTokens = {}
+        self.__records = {}
+        for record in self.__passModel:
+            self.__records[record.id] = record
+            tokens = self.__recordTokens[record.id] = _RecordTokens(record)
+            for token in tokens:
+                self.__postings.setdefault(token, set()).add(record.id)
+        self.__tokens = sorted(self.__postings)
+
+    def __add(self, record):
+        self.__records[record.id] = record
+        tokens = self.__recordTokens[record.id] = _RecordTokens(record)
+        for token in tokens:
+            ids = self.__postings.get(token)
+            if ids is None:
+                ids = self.__postings[token] = set()
+                bisect.insort(self.__tokens, token)
+            ids.add(record.id)
+
+    def __remove(self, record):
+        self.__records.pop(record.id, None)
+        for token in self.__recordTokens.pop(record.id, ()):
+            ids = self.__postings[token]
+            ids.discard(record.id)
+            if not ids:
+                del self.__postings[token]
+                del self.__tokens[bisect.bisect_left(self.__tokens, token)]
+
+    def __onPassModelChanged(self, event, record, oldFullName):
+        if event == PassModel.ADDED:
+            self.__add(record)
+        elif event == PassModel.REMOVED:
+            self.__remove(record)
+        elif event == PassModel.RENAMED:
+            self.__remove(record)
+            self.__add(record)
+        elif event == PassModel.RESET:
+            self.__rebuild()
+
+    def __prefixIds(self, term):
+        tokens = self.__tokens
+        start = bisect.bisect_left(tokens, term)
+        end = bisect.bisect_left(tokens, term + '\uffff', start)
+        if end - start == 1:
+            return self.__postings[tokens[start]]
+        ids = set()
+        for token in tokens[start:end]:
+            ids.update(self.__postings[token])
+        return ids
+
+    def search(self, query):
+        """
+        Return the records matching every term of query, or None when the
+        query is empty and everything matches.
+        """
+        terms = sorted(set(query.lower().split()), key=len, reverse=True)
+        if not terms:
+            return None
+        # Longer terms tend to match fewer passes, start from those
+        ids = None
+        for term in terms:
+            termIds = self.__prefixIds(term)
+            ids = set(termIds) if ids is None else ids & termIds
+            if not ids:
+                return []
+        return [self.__records[id] for id in ids]
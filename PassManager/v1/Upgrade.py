@@ -1,24 +1,145 @@
 from __future__ import absolute_import
 
 import logging
+import time
 
 import Utils
+from Katana import NodegraphAPI
 
+from .NetworkSync import AddNetworkModeParam, AddLiteralValuesParam
+from .PassStore import AddPassesParam
+from .Instrumentation import Span
+from . import ScriptActions as SA
 
-__all__ = ['Upgrade']
+
+__all__ = [
+    'Upgrade',
+    'UpgradeAll',
+    'NeedsUpgrade',
+    'GetVersion',
+    'RegisterMigration',
+    'CURRENT_VERSION',
+]
 
 log = logging.getLogger("PassManager.Upgrade")
 
+# Version of the internal network created by PassManagerNode.__init__
+CURRENT_VERSION = 2
+
+# Migration steps keyed by the version they upgrade from, each one brings a
+# node from version N to N + 1
+_migrations = {}
+
+
+def RegisterMigration(fromVersion):
+    """Decorator registering a migration from fromVersion to fromVersion + 1."""
+    def register(function):
+        if fromVersion in _migrations:
+            raise ValueError('A migration from version %d is already registered.'
+                             % fromVersion)
+        _migrations[fromVersion] = function
+        return function
+    return register
+
+
+def GetVersion(node):
+    param = node.getParameter('version')
+    return int(param.getValue(0)) if param else 0
+
+
+def NeedsUpgrade(node):
+    return GetVersion(node) < CURRENT_VERSION
+
+
+def _Migrate(node):
+    """Apply every migration step the node needs, in order."""
+    version = GetVersion(node)
+    while version < CURRENT_VERSION:
+        migration = _migrations.get(version)
+        if migration is None:
+            raise RuntimeError('No migration registered from version %d.' % version)
+        migration(node)
+        version += 1
+        node.getParameter('version').setValue(version, 0)
+
 
 def Upgrade(node):
     Utils.UndoStack.DisableCapture()
     try:
-        pass
-        # This is where you would detect an out-of-date version:
-        #    node.getParameter('version')
-        # and upgrade the internal network.
+        with Span('upgrade.node', log):
+            _Migrate(node)
     except Exception as exception:
         log.exception('Error upgrading PassManager node "%s": %s'
                       % (node.getName(), str(exception)))
     finally:
-        Utils.UndoStack.EnableCapture()
\ No newline at end of file
+        Utils.UndoStack.EnableCapture()
+
+
+def UpgradeAll(nodes=None):
+    """
+    Upgrade every out-of-date PassManager node of the project, or of the given
+    nodes, with undo capture disabled once for the whole batch.
+
+    Returns a report with the seconds spent per node name and in total.
+    """
+    if nodes is None:
+        nodes = NodegraphAPI.GetAllNodesByType('PassManager')
+    outdated = [node for node in nodes if NeedsUpgrade(node) and not node.isLocked()]
+    report = {'nodes': {}, 'failed': [], 'total': 0.0}
+    if not outdated:
+        return report
+
+    start = time.perf_counter()
+    Utils.UndoStack.DisableCapture()
+    try:
+        with Span('upgrade.all', log, nodes=len(outdated)):
+            _MigrateAll(outdated, report)
+    finally:
+        Utils.UndoStack.EnableCapture()
+    report['total'] = time.perf_counter() - start
+
+    for name, seconds in sorted(report['nodes'].items()):
+        log.info('Upgraded "%s" in %.2f ms', name, seconds * 1000.0)
+    log.info('Upgraded %d PassManager nodes in %.2f ms',
+             len(report['nodes']), report['total'] * 1000.0)
+    return report
+
+
+def _MigrateAll(nodes, report):
+    for node in nodes:
+        nodeStart = time.perf_counter()
+        try:
+            with Span('upgrade.node', log):
+                _Migrate(node)
+        except Exception as exception:
+            report['failed'].append(node.getName())
+            log.exception('Error upgrading PassManager node "%s": %s'
+                          % (node.getName(), str(exception)))
+        report['nodes'][node.getName()] = time.perf_counter() - nodeStart
+
+
+# Migrations
+
+@RegisterMigration(1)
+def _UpgradeVersion1(node):
+    """
+    Version 2 tracks its children through reference params, stores its
+    passes in the 'passes' parameter and has the 'networkMode' and
+    'literalValues' parameters.
+    """
+    keys = {'Merge': 'merge', 'LocationCreate': 'locationCreate', 'OpScript': 'opScript'}
+    for child in node.getChildren():
+        key = keys.get(child.getType())
+        if key and not node.getParameter('node_' + key):
+            SA.AddNodeReferenceParam(node, 'node_' + key, child)
+    if not node.getParameter('networkMode'):
+        AddNetworkModeParam(node)
+    if not node.getParameter('literalValues'):
+        AddLiteralValuesParam(node)
+    if not node.getParameter('passes'):
+        AddPassesParam(node)
+
+    opscript_node = SA.GetRefNode(node, 'opScript')
+    user_attr = opscript_node.getParameter('user') if opscript_node else None
+    if user_attr is not None and user_attr.getChild('mode') is None:
+        user_attr.createChildNumber('mode', 0).setHintString(SA.PASS_SETTINGS_HINTS['mode'])
@@ -0,0 +1,414 @@
+from __future__ import absolute_import
+
+import hashlib
+import logging
+import os
+import queue
+import re
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from .PassModel import DEFAULT_SETTINGS, PASS_LOCATION_ROOT, PassModelError, ParsePassName
+from .CelCache import COLLECTION_SETTINGS, EMPTY_CELS, GetSharedCelCache
+from .Instrumentation import Span, Count
+
+__all__ = [
+    'PassIssue',
+    'PassValidator',
+    'ValidationRun',
+    'CheckPassName',
+    'CheckCelSyntax',
+    'ERROR',
+    'WARNING',
+]
+
+log = logging.getLogger("PassManager.Validation")
+
+ERROR = 'error'
+WARNING = 'warning'
+
+# Passes handed to a worker at once
+CHUNK_SIZE = 64
+
+_typePattern = re.compile(r'^[A-Za-z][A-Za-z0-9]*$')
+_namePattern = re.compile(r'^[A-Za-z0-9]+(_[A-Za-z0-9]+)*$')
+_celTokenPattern = re.compile(r'[()]|[^\s()]+')
+_celPathPattern = re.compile(r'^/(\$[A-Za-z_]\w*|[^\s$,;"\']*)$')
+_celOperators = ('+', '-', '^')
+
+
+class PassIssue(object):
+    """A problem found by a check, on the whole pass or on one of its settings."""
+
+    __slots__ = ('severity', 'check', 'setting', 'message')
+
+    def __init__(self, severity, check, message, setting=None):
+        self.severity = severity
+        self.check = check
+        self.setting = setting
+        self.message = message
+
+    def __eq__(self, other):
+        return isinstance(other, PassIssue) and \
+            (self.severity, self.check, self.setting, self.message) == \
+            (other.severity, other.check, other.setting, other.message)
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __repr__(self):
+        return '<PassIssue %s %s: %s>' % (self.severity, self.check, self.message)
+
+
+def CheckPassName(fullName):
+    """Return the naming issues of a full pass name such as 'bty_char_01'."""
+    try:
+        passType, name, _iteration = ParsePassName(fullName)
+    except PassModelError as exception:
+        return [PassIssue(ERROR, 'naming', str(exception))]
+    issues = []
+    if not _typePattern.match(passType):
+        issues.append(PassIssue(ERROR, 'naming', "Pass type '%s' must start with a letter "
+                                "and hold only letters and digits." % passType))
+    if not _namePattern.match(name):
+        issues.append(PassIssue(ERROR, 'naming', "Pass name '%s' must hold only letters, "
+                                "digits and single underscores." % name))
+    return issues
+
+
+def CheckCelSyntax(expression):
+    """Return why a CEL expression cannot be parsed, or None if it can."""
+    expression = (expression or '').strip()
+    if expression in EMPTY_CELS:
+        return None
+    depth = 0
+    previous = None
+    for token in _celTokenPattern.findall(expression):
+        if token == '(':
+            depth += 1
+        elif token == ')':
+            if depth == 0:
+                return "Unbalanced ')'."
+            if previous == '(':
+                return "Empty parentheses."
+            if previous in _celOperators:
+                return "Operator '%s' has no right-hand side." % previous
+            depth -= 1
+        elif token in _celOperators:
+            if previous in (None, '(') or previous in _celOperators:
+                return "Operator '%s' has no left-hand side." % token
+        elif not _celPathPattern.match(token):
+            return "'%s' is not a scene graph path or a /$collection." % token
+        previous = token
+    if depth:
+        return "Unbalanced '('."
+    if previous in _celOperators:
+        return "Operator '%s' has no right-hand side." % previous
+    return None
+
+
+def _StaticIssues(fullName, settings):
+    """Checks that only depend on the pass itself."""
+    issues = CheckPassName(fullName)
+    for key in COLLECTION_SETTINGS:
+        error = CheckCelSyntax(settings.get(key))
+        if error is not None:
+            issues.append(PassIssue(ERROR, 'cel', '%s: %s' % (key, error), key))
+    return issues
+
+
+def _Digest(*values):
+    return hashlib.blake2b(repr(values).encode('utf-8'), digest_size=16).digest()
+
+
+class _Snapshot(object):
+    """What the workers need of a pass, copied on the calling thread."""
+
+    __slots__ = ('id', 'fullName', 'settings', 'collisions', 'digest')
+
+    def __init__(self, id, fullName, settings, collisions, digest):
+        self.id = id
+        self.fullName = fullName
+        self.settings = dict(settings)
+        self.collisions = collisions
+        self.digest = digest
+
+
+class ValidationRun(object):
+    """
+    One validation of a pass model, running on the validator's thread pool.
+
+    Results are handed over as (record id, issues) through ``takeResults``,
+    which the UI polls from its own thread, for the passes whose issues
+    changed since the results last taken; removed passes come with None.
+    """
+
+    def __init__(self, reporter):
+        self.__reporter = reporter
+        self.__results = queue.Queue()
+        # Chunks still running, plus one until _close is called
+        self.__pending = 1
+        self.__lock = threading.Lock()
+        self.__finished = threading.Event()
+        self.__cancelled = threading.Event()
+        self.__futures = []
+        self.checked = 0
+
+    def _put(self, results):
+        for result in results:
+            self.__results.put(result)
+
+    def _submit(self, executor, function, chunk):
+        with self.__lock:
+            self.__pending += 1
+        future = executor.submit(function, chunk, self)
+        future.add_done_callback(self.__onDone)
+        self.__futures.append(future)
+
+    def _close(self):
+        """No more chunks will be submitted."""
+        self.__release()
+
+    def __onDone(self, future):
+        if not future.cancelled() and future.exception() is not None:
+            log.error('Error validating passes', exc_info=future.exception())
+        self.__release()
+
+    def __release(self):
+        with self.__lock:
+            self.__pending -= 1
+            if not self.__pending:
+                self.__finished.set()
+
+    def cancel(self):
+        self.__cancelled.set()
+        for future in self.__futures:
+            future.cancel()
+
+    def isCancelled(self):
+        return self.__cancelled.is_set()
+
+    def isFinished(self):
+        """True once every chunk is done and every result has been taken."""
+        return self.__finished.is_set() and self.__results.empty()
+
+    def wait(self, timeout=None):
+        return self.__finished.wait(timeout)
+
+    def takeResults(self):
+        """Return the results produced since the last call, without blocking."""
+        results = []
+        while True:
+            try:
+                results.append(self.__results.get_nowait())
+            except queue.Empty:
+                return self.__reporter(results)
+
+
+class PassValidator(object):
+    """
+    Checks every pass of a PassModel on a thread pool: naming format, name
+    collisions, CEL syntax of the four collections, whether the camera
+    exists in the incoming scene and whether collections match anything.
+
+    Results are cached per pass under a hash of its name and effective
+    settings, so a run only re-checks the passes edited since the last one.
+    Checks against the incoming scene are also keyed by the scene hash of
+    the provider, a SceneGraph.SceneGraphProvider. The provider is only
+    called from the thread starting the run, which looks up each camera and
+    resolves each CEL once for every pass using the same value; the workers
+    run the checks on what was looked up. Without a provider only the pass
+    tables themselves are checked.
+    """
+
+    def __init__(self, passModel, resolver=None, provider=None, celCache=None,
+                 maxWorkers=None):
+        self.__passModel = passModel
+        self.__resolver = resolver
+        self.__provider = provider
+        self.__celCache = celCache if celCache is not None else GetSharedCelCache()
+        self.__maxWorkers = maxWorkers or min(4, os.cpu_count() or 1)
+        self.__executor = None
+        self.__lock = threading.Lock()
+        # record id -> (digest, scene hash, issues)
+        self.__entries = {}
+        # record id -> (name, settings, collisions, digest). The resolver
+        # hands out the same settings object until a pass is edited, so an
+        # unchanged pass is not hashed again.
+        self.__digests = {}
+        # Issues last handed out, to report only the passes whose issues
+        # changed. Only touched on the thread taking the results.
+        self.__reported = {}
+        self.__sceneValues = {}
+        self.__sceneHash = None
+
+    def shutdown(self):
+        if self.__executor is not None:
+            self.__executor.shutdown(wait=False)
+            self.__executor = None
+
+    def issues(self, record):
+        """Return the issues of a pass found by the last run, [] if none or unchecked."""
+        return self.__reported.get(record.id) or []
+
+    def __settings(self, record):
+        if self.__resolver is not None:
+            return self.__resolver.settings(record)
+        settings = OrderedDict(DEFAULT_SETTINGS)
+        settings.update(record.settings)
+        return settings
+
+    def __changedPasses(self, sceneHash, run):
+        """
+        Return snapshots of the passes whose cached issues are out of date,
+        and the ids of every pass. Passes checked by a run whose results
+        were never taken are handed to run as they are. Collisions are found
+        here, on the calling thread, and are part of each pass's content hash.
+        """
+        names = [(record, record.fullName) for record in self.__passModel]
+        byName = {}
+        for _record, fullName in names:
+            byName.setdefault(fullName.lower(), []).append(fullName)
+        snapshots = []
+        for record, fullName in names:
+            group = byName[fullName.lower()]
+            collisions = tuple(sorted(name for name in group if name != fullName)) \
+                if len(group) > 1 else ()
+            settings = self.__settings(record)
+            known = self.__digests.get(record.id)
+            if known is not None and known[1] is settings and known[0] == fullName \
+                    and known[2] == collisions:
+                digest = known[3]
+            else:
+                digest = _Digest(fullName, tuple(settings.items()), collisions)
+                self.__digests[record.id] = (fullName, settings, collisions, digest)
+            with self.__lock:
+                entry = self.__entries.get(record.id)
+            if entry is None or entry[0] != digest or entry[1] != sceneHash:
+                snapshots.append(_Snapshot(record.id, fullName, settings, collisions, digest))
+            elif entry[2] != self.__reported.get(record.id, []):
+                run._put([(record.id, entry[2])])
+        return snapshots, {record.id for record, _fullName in names}
+
+    def start(self):
+        """Start checking the passes that changed and return the ValidationRun."""
+        run = ValidationRun(self.__report)
+        with Span('validation.start', log, passes=len(self.__passModel)):
+            sceneHash = self.__provider.sceneHash() if self.__provider is not None else None
+            dirty, ids = self.__changedPasses(sceneHash, run)
+            removed = [id for id in set(self.__digests) | set(self.__reported) if id not in ids]
+            with self.__lock:
+                for id in removed:
+                    self.__entries.pop(id, None)
+            for id in removed:
+                self.__digests.pop(id, None)
+            run._put((id, None) for id in removed)
+
+            sceneValues = None
+            if dirty and self.__provider is not None:
+                if sceneHash != self.__sceneHash:
+                    # Runs still checking keep the values of their own scene
+                    self.__sceneValues = {}
+                    self.__sceneHash = sceneHash
+                    self.__provider.prepare()
+                with Span('validation.scene', log):
+                    sceneValues = self.__lookUpScene(dirty, sceneHash)
+            if dirty and self.__executor is None:
+                self.__executor = ThreadPoolExecutor(self.__maxWorkers,
+                                                     thread_name_prefix='PassValidator')
+            for start in range(0, len(dirty), CHUNK_SIZE):
+                run._submit(self.__executor, self.__checkChunk,
+                            (dirty[start:start + CHUNK_SIZE], sceneHash, sceneValues))
+            run._close()
+        Count('validation.dirty', len(dirty))
+        return run
+
+    def validate(self):
+        """
+        Check the passes that changed and wait. Returns {record id: issues}
+        for the passes whose issues changed since the previous run.
+        """
+        run = self.start()
+        run.wait()
+        return dict(run.takeResults())
+
+    def __report(self, results):
+        """Keep the results that change the issues last handed out."""
+        changed = []
+        for id, issues in results:
+            previous = self.__reported.get(id, [])
+            if issues is None:
+                self.__reported.pop(id, None)
+                if previous:
+                    changed.append((id, None))
+            elif issues != previous:
+                self.__reported[id] = issues
+                changed.append((id, issues))
+        return changed
+
+    def __checkChunk(self, chunk, run):
+        snapshots, sceneHash, sceneValues = chunk
+        results = []
+        for snapshot in snapshots:
+            if run.isCancelled():
+                break
+            issues = _StaticIssues(snapshot.fullName, snapshot.settings)
+            for name in snapshot.collisions:
+                issues.append(PassIssue(ERROR, 'collision', "Pass '%s' only differs from "
+                                        "'%s' by case." % (snapshot.fullName, name)))
+            if sceneValues is not None:
+                issues.extend(self.__sceneIssues(snapshot, sceneValues, issues))
+            with self.__lock:
+                run.checked += 1
+                self.__entries[snapshot.id] = (snapshot.digest, sceneHash, issues)
+            results.append((snapshot.id, issues))
+        run._put(results)
+
+    def __lookUpScene(self, snapshots, sceneHash):
+        """
+        Look up what the scene checks of snapshots need from the incoming
+        scene: the passes already in it, whether each camera exists and
+        whether each collection matches anything. The provider calls into
+        Katana, so this runs on the calling thread and the workers only read
+        the answers. Each value is looked up once per scene hash.
+        """
+        provider = self.__provider
+        values = self.__sceneValues
+        if 'incoming' not in values:
+            values['incoming'] = frozenset(provider.listChildren(PASS_LOCATION_ROOT))
+        for snapshot in snapshots:
+            camera = snapshot.settings.get('camera') or ''
+            if camera and ('location', camera) not in values:
+                values[('location', camera)] = bool(provider.locationExists(camera))
+            for key in COLLECTION_SETTINGS:
+                expression = snapshot.settings.get(key)
+                if (expression or '').strip() in EMPTY_CELS or ('cel', expression) in values \
+                        or CheckCelSyntax(expression) is not None:
+                    continue
+                values[('cel', expression)] = bool(
+                    self.__celCache.resolve(expression, sceneHash, provider.resolveCel))
+        return values
+
+    def __sceneIssues(self, snapshot, sceneValues, staticIssues):
+        issues = []
+        if snapshot.fullName in sceneValues['incoming']:
+            issues.append(PassIssue(WARNING, 'collision', "A pass named '%s' already "
+                                    "exists in the incoming scene." % snapshot.fullName))
+
+        camera = snapshot.settings.get('camera') or ''
+        if not camera:
+            issues.append(PassIssue(ERROR, 'camera', 'No camera is set.', 'camera'))
+        elif not sceneValues[('location', camera)]:
+            issues.append(PassIssue(ERROR, 'camera', "Camera '%s' is not in the incoming "
+                                    "scene." % camera, 'camera'))
+
+        badCels = {issue.setting for issue in staticIssues if issue.check == 'cel'}
+        for key in COLLECTION_SETTINGS:
+            expression = snapshot.settings.get(key)
+            if key in badCels or (expression or '').strip() in EMPTY_CELS:
+                continue
+            if not sceneValues[('cel', expression)]:
+                issues.append(PassIssue(WARNING, 'collection', '%s matches no location.'
+                                        % key, key))
+        return issues
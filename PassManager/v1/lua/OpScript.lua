@@ -1,9 +1,52 @@
 local mode = Interface.GetOpArg('user.mode'):getValue()
+
+-- Mode 2: merged override. Only the pass location itself is processed, the
+-- existing passSettings group is read once and written back with a single
+-- SetAttr, and nothing is done when these op args were already applied.
+if mode == 2 then
+    Interface.StopChildTraversal()
+
+    local argsHash = Interface.GetOpArg('user'):getHash()
+    local appliedHash = Interface.GetAttr('customAttributes.passSettingsHash')
+    if (appliedHash ~= nil) and (appliedHash:getValue() == argsHash) then
+        return
+    end
+
+    local gb = GroupBuilder()
+    local current = Interface.GetAttr('customAttributes.passSettings')
+    if current ~= nil then
+        gb:update(current)
+    end
+    gb:set('renderQuality', Interface.GetOpArg('user.renderQuality'))
+    gb:set('denoise', Interface.GetOpArg('user.denoise'))
+
+    -- Empty strings and empty CELs keep the inherited value
+    local overrides = {
+        camera = 'user.camera',
+        visible = 'user.VisibilityON',
+        hide = 'user.VisibilityOFF',
+        holdout = 'user.Holdout',
+        prune = 'user.Prune',
+    }
+    for name, opArg in pairs(overrides) do
+        local value = Interface.GetOpArg(opArg)
+        if (value ~= nil) and (value:getValue() ~= '') and (value:getValue() ~= '(())') then
+            gb:set(name, value)
+        end
+    end
+
+    Interface.SetAttr('customAttributes.passSettings', gb:build())
+    Interface.SetAttr('customAttributes.passSettingsHash', StringAttribute(argsHash))
+    return
+end
+
 local renderQuality = Interface.GetOpArg('user.renderQuality')
 local denoise = Interface.GetOpArg('user.denoise')
 local camera = Interface.GetOpArg('user.camera')
-local visible = Interface.GetOpArg('user.visibilityON')
-local hide = Interface.GetOpArg('user.visibilityOFF')
+local visible = Interface.GetOpArg('user.VisibilityON')
+local hide = Interface.GetOpArg('user.VisibilityOFF')
+local holdout = Interface.GetOpArg('user.Holdout')
+local prune = Interface.GetOpArg('user.Prune')
 
 if mode == 0 then
     -- Initialize a GroupBuilder to store attributes
@@ -13,6 +56,8 @@ if mode == 0 then
     gb:set('camera', camera)
     gb:set('visible', visible)
     gb:set('hide', hide)
+    gb:set('holdout', holdout)
+    gb:set('prune', prune)
 
     -- Set the customAttributes.renderPasses attribute
     Interface.SetAttr("customAttributes.passSettings", gb:build())
@@ -23,6 +68,8 @@ else
     local c_camera = Interface.GetAttr('customAttributes.passSettings.camera')
     local c_visible = Interface.GetAttr('customAttributes.passSettings.visible')
     local c_hide = Interface.GetAttr('customAttributes.passSettings.hide')
+    local c_holdout = Interface.GetAttr('customAttributes.passSettings.holdout')
+    local c_prune = Interface.GetAttr('customAttributes.passSettings.prune')
 
 
     -- Override values if they are different
@@ -43,4 +90,10 @@ else
     if (hide ~= c_hide) and (hide ~= nil) and (hide:getValue() ~= '(())') then
         Interface.SetAttr('customAttributes.passSettings.hide', hide)
     end
+    if (holdout ~= c_holdout) and (holdout ~= nil) and (holdout:getValue() ~= '(())') then
+        Interface.SetAttr('customAttributes.passSettings.holdout', holdout)
+    end
+    if (prune ~= c_prune) and (prune ~= nil) and (prune:getValue() ~= '(())') then
+        Interface.SetAttr('customAttributes.passSettings.prune', prune)
+    end
 end
\ No newline at end of file
@@ -0,0 +1,9 @@
+-- Table-driven pass settings: one OpScript serves every pass location.
+-- The PassManager node writes one row per enabled pass into user.passTable,
+-- keyed by pass name and already laid out like customAttributes.passSettings,
+-- so each location is a single op arg lookup and a single SetAttr.
+local row = Interface.GetOpArg('user.passTable.' .. Interface.GetOutputName())
+
+if row ~= nil then
+    Interface.SetAttr('customAttributes.passSettings', row)
+end
@@ -0,0 +1,151 @@
+"""
+Graph evaluation cost of PassManager networks with and without expressions.
+
+Each PassManager node is built twice, once with the default expressions on
+LocationCreate's locations.i0 and the OpScript CEL and once with the
+'literalValues' parameter on. An evaluation reads every parameter of every
+node inside the PassManager nodes, as Katana does when it cooks the graph,
+and the fake NodegraphAPI runs expressions again on every read. The numbers
+only approximate Katana's own expression engine, compare the two columns
+rather than reading them as absolute costs.
+
+    python benchmarks/bench_expressions.py --sizes 10 100 1000 10000 --output expression_results.json
+"""
+from __future__ import absolute_import
+
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+sys.path.insert(0, HERE)
+
+import fakes  # noqa: E402
+
+fakes.Install()
+
+from fakes import NodegraphAPI  # noqa: E402
+from PassManager import v1 as PassManager  # noqa: E402
+from PassManager.v1 import ScriptActions as SA  # noqa: E402
+from bench_passes import MakeSpecs  # noqa: E402
+
+DEFAULT_SIZES = (10, 100, 1000, 10000)
+
+NodegraphAPI.RegisterNodeType('PassManager', PassManager.PassManagerNode)
+
+
+def MakeNodes(nodes, count, networkMode, literal):
+    NodegraphAPI.Reset()
+    result = []
+    for _ in range(nodes):
+        node = NodegraphAPI.CreateNode('PassManager')
+        node.getParameter('networkMode').setValue(networkMode, 0)
+        node.getParameter('literalValues').setValue(int(literal), 0)
+        node.syncRootLocation()
+        node.addPasses(MakeSpecs(count))
+        result.append(node)
+    return result
+
+
+def _Leaves(param):
+    children = param.getChildren()
+    if not children:
+        return [param] if param.getType() != 'group' else []
+    leaves = []
+    for child in children:
+        leaves.extend(_Leaves(child))
+    return leaves
+
+
+def NetworkParameters(nodes):
+    """Every leaf parameter a graph evaluation reads, and the expressions among them."""
+    params = []
+    for node in nodes:
+        for child in node.getChildren():
+            params.extend(_Leaves(child.getParameters()))
+    return params, sum(1 for param in params if param.isExpression())
+
+
+def RootParameters(nodes):
+    params = []
+    for node in nodes:
+        params.append(SA.GetRefNode(node, 'locationCreate').getParameter('locations.i0'))
+        params.append(SA.GetRefNode(node, 'opScript').getParameter('CEL'))
+    return params
+
+
+def Evaluate(params, repeat):
+    """Return the seconds one evaluation of params takes, best of repeat."""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for param in params:
+            param.getValue(0)
+        seconds = time.perf_counter() - start
+        best = seconds if best is None else min(best, seconds)
+    return best
+
+
+def SurvivesRename(nodes):
+    """Rename every LocationCreate node and check the OpScript CEL still resolves."""
+    expected = [param.getValue(0) for param in RootParameters(nodes)[1::2]]
+    for node in nodes:
+        location_create_node = SA.GetRefNode(node, 'locationCreate')
+        location_create_node.setName(location_create_node.getName() + 'Renamed')
+    return [param.getValue(0) for param in RootParameters(nodes)[1::2]] == expected
+
+
+def Bench(nodes, count, networkMode, literal, repeat):
+    built = MakeNodes(nodes, count, networkMode, literal)
+    params, expressions = NetworkParameters(built)
+    return {
+        'parameters': len(params),
+        'expressions': expressions,
+        'evaluate': Evaluate(params, repeat),
+        'rootLocation': Evaluate(RootParameters(built), repeat),
+        'survivesRename': SurvivesRename(built),
+    }
+
+
+def Main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES,
+                        help='passes per PassManager node')
+    parser.add_argument('--nodes', type=int, default=1, help='PassManager nodes per scene')
+    parser.add_argument('--modes', nargs='+', default=['perPass', 'table'])
+    parser.add_argument('--repeat', type=int, default=5,
+                        help='evaluations per measurement, the best one is kept')
+    parser.add_argument('--output', default='expression_results.json')
+    args = parser.parse_args(argv)
+
+    results = []
+    for mode in args.modes:
+        for count in args.sizes:
+            entry = {'passes': count, 'nodes': args.nodes, 'networkMode': mode}
+            for key, literal in (('expressions', False), ('literal', True)):
+                entry[key] = Bench(args.nodes, count, mode, literal, args.repeat)
+            results.append(entry)
+            expressions, literal = entry['expressions'], entry['literal']
+            print('%-8s %6d passes  evaluate %.3fms -> %.3fms  root location %.1fus -> %.1fus'
+                  '  survives rename %s -> %s' % (
+                      mode, count,
+                      expressions['evaluate'] * 1000.0, literal['evaluate'] * 1000.0,
+                      expressions['rootLocation'] * 1e6, literal['rootLocation'] * 1e6,
+                      expressions['survivesRename'], literal['survivesRename']))
+
+    report = {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'results': results,
+    }
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print('Wrote %s' % args.output)
+
+
+if __name__ == '__main__':
+    Main()
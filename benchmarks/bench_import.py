@@ -0,0 +1,86 @@
+"""
+Import-time report for the PassManager plugin, runnable without a Katana licence.
+
+Each stage runs in a fresh interpreter with the fake Katana modules, so the
+numbers show what Katana pays when it loads the plugin and what is deferred
+until the first node and the first editor are created.
+
+    python benchmarks/bench_import.py --repeat 5 --output import_report.json
+"""
+from __future__ import absolute_import
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+
+# Code run in the child interpreter, prints a JSON line
+_STAGE_SCRIPT = '''
+import json, sys, time
+sys.path.insert(0, %(root)r)
+sys.path.insert(0, %(here)r)
+import fakes
+hasUI = fakes.Install()
+from fakes import NodegraphAPI
+import logging  # already loaded by Katana at startup
+before = set(sys.modules)
+start = time.perf_counter()
+import PassManager
+registered = time.perf_counter()
+NodegraphAPI.RegisterNodeType('PassManager', PassManager.PassManager.PassManagerNode)
+afterRegister = set(sys.modules)
+nodeStart = time.perf_counter()
+NodegraphAPI.CreateNode('PassManager', NodegraphAPI.GetRootNode())
+nodeEnd = time.perf_counter()
+afterNode = set(sys.modules)
+editorSeconds = None
+if hasUI:
+    editorStart = time.perf_counter()
+    PassManager.PassManager.GetEditor()
+    editorSeconds = time.perf_counter() - editorStart
+print(json.dumps({
+    'register': registered - start,
+    'firstNode': nodeEnd - nodeStart,
+    'editorImport': editorSeconds,
+    'registerModules': sorted(m for m in afterRegister - before if m.startswith('PassManager')),
+    'firstNodeModules': sorted(m for m in afterNode - afterRegister if m.startswith('PassManager')),
+}))
+'''
+
+
+def RunStage():
+    script = _STAGE_SCRIPT % {'root': ROOT, 'here': HERE}
+    output = subprocess.check_output([sys.executable, '-c', script])
+    return json.loads(output.decode().strip().splitlines()[-1])
+
+
+def Main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--output', help='also write the report as JSON')
+    args = parser.parse_args(argv)
+
+    runs = [RunStage() for _ in range(args.repeat)]
+    report = {'runs': len(runs)}
+    for key in ('register', 'firstNode', 'editorImport'):
+        values = sorted(run[key] for run in runs if run[key] is not None)
+        report[key] = values[len(values) // 2] if values else None
+        print('%-14s %s' % (key, 'skipped' if report[key] is None
+                            else 'median %.3fms' % (report[key] * 1000.0)))
+    report['registerModules'] = runs[0]['registerModules']
+    report['firstNodeModules'] = runs[0]['firstNodeModules']
+    print('Loaded to register the plugin: %s' % ', '.join(report['registerModules']))
+    print('Loaded by the first node:      %s' % ', '.join(report['firstNodeModules']))
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print('Wrote %s' % args.output)
+
+
+if __name__ == '__main__':
+    Main()
@@ -0,0 +1,164 @@
+"""
+Benchmarks for the PassManager SuperTool, runnable without a Katana licence.
+
+Katana, NodegraphAPI, Utils and UI4 are replaced by the stand-ins in
+benchmarks/fakes. Editor benchmarks need PyQt5 and run on the offscreen
+platform, they are reported as skipped when PyQt5 is not installed.
+
+    python benchmarks/bench_passes.py --sizes 10 100 1000 10000 --output bench_results.json
+"""
+from __future__ import absolute_import
+
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+sys.path.insert(0, HERE)
+
+import fakes  # noqa: E402
+
+HAS_UI = fakes.Install()
+
+from fakes import NodegraphAPI  # noqa: E402
+from PassManager import v1 as PassManager  # noqa: E402
+from PassManager.v1 import Instrumentation  # noqa: E402
+from PassManager.v1.PassModel import DEFAULT_SETTINGS  # noqa: E402
+from PassManager.v1.SceneGraph import LocalSceneGraph  # noqa: E402
+
+DEFAULT_SIZES = (10, 100, 1000, 10000)
+PASS_TYPES = ('bty', 'rfl', 'shdw', 'util')
+PASS_NAMES = ('char', 'crowd', 'env', 'fx', 'prop', 'vhcl')
+
+NodegraphAPI.RegisterNodeType('PassManager', PassManager.PassManagerNode)
+
+
+def MakeSpecs(count):
+    """Spread count passes over every type and name, like a real shot setup."""
+    specs = []
+    for index in range(count):
+        specs.append({
+            'type': PASS_TYPES[index % len(PASS_TYPES)],
+            'name': PASS_NAMES[(index // len(PASS_TYPES)) % len(PASS_NAMES)],
+        })
+    return specs
+
+
+def Timed(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return time.perf_counter() - start, result
+
+
+def MakeNode(count, networkMode):
+    NodegraphAPI.Reset()
+    node = NodegraphAPI.CreateNode('PassManager')
+    node.getParameter('networkMode').setValue(networkMode, 0)
+    node.addPasses(MakeSpecs(count))
+    return node
+
+
+def BenchNode(count, networkMode, operations):
+    """Time node construction and the per-pass edits through the node's model."""
+    results = {}
+    NodegraphAPI.Reset()
+    results['construct'], node = Timed(MakeNode, count, networkMode)
+
+    model = node.getPassModel()
+    records = list(model)[:operations]
+
+    def Rename():
+        for record in records:
+            model.renamePass(record.fullName, record.fullName.rsplit('_', 1)[0] + '_%02d' % (
+                record.iteration + 100000))
+
+    def Duplicate():
+        return [model.duplicatePass(record.fullName) for record in records]
+
+    def Delete(duplicates):
+        for record in duplicates:
+            model.deletePass(record.fullName)
+
+    seconds, _ = Timed(Rename)
+    results['rename'] = seconds / len(records)
+    seconds, duplicates = Timed(Duplicate)
+    results['duplicate'] = seconds / len(records)
+    seconds, _ = Timed(Delete, duplicates)
+    results['delete'] = seconds / len(records)
+
+    # Reading the stored pass table back, as when an editor opens on a loaded node
+    loaded = NodegraphAPI.CreateNode('PassManager')
+    loaded.getParameter('passes').setValue(node.getParameter('passes').getValue(0), 0)
+    results['load'], _ = Timed(loaded.getPassModel)
+    loaded.delete()
+
+    # A full validation, then one after a single edit, which only re-checks that pass
+    scene = LocalSceneGraph({DEFAULT_SETTINGS['camera']: None})
+    results['validate'], _ = Timed(node.validatePasses, scene)
+    model.updateSettings(records[0].fullName, Prune='((/root/world/geo))')
+    results['revalidate'], _ = Timed(node.validatePasses, scene)
+    return results, node
+
+
+def BenchEditor(node):
+    """Time building the editor over an already populated node."""
+    from PyQt5 import QtWidgets
+    from PassManager.v1.Editor import PassManagerEditor
+
+    def Populate():
+        editor = PassManagerEditor(None, node)
+        QtWidgets.QApplication.processEvents()
+        return editor
+
+    seconds, editor = Timed(Populate)
+    editor.deleteLater()
+    return seconds
+
+
+def Main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES)
+    parser.add_argument('--modes', nargs='+', default=['perPass', 'table'])
+    parser.add_argument('--operations', type=int, default=50,
+                        help='passes renamed, duplicated and deleted per size')
+    parser.add_argument('--output', default='bench_results.json')
+    parser.add_argument('--trace', help='also write the spans as a Chrome trace')
+    args = parser.parse_args(argv)
+
+    application = None
+    if HAS_UI:
+        os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+        from PyQt5 import QtWidgets
+        application = QtWidgets.QApplication.instance() or QtWidgets.QApplication([])
+
+    results = []
+    for mode in args.modes:
+        for count in args.sizes:
+            timings, node = BenchNode(count, mode, min(args.operations, count))
+            timings['editorPopulate'] = BenchEditor(node) if application else None
+            entry = {'passes': count, 'networkMode': mode, 'seconds': timings}
+            results.append(entry)
+            print('%-8s %6d passes  %s' % (mode, count, '  '.join(
+                '%s=%s' % (key, 'skipped' if value is None else '%.3fms' % (value * 1000.0))
+                for key, value in timings.items())))
+
+    report = {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'ui': bool(application),
+        'results': results,
+    }
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print('Wrote %s' % args.output)
+    print(Instrumentation.Summary())
+    if args.trace:
+        Instrumentation.DumpChromeTrace(args.trace)
+
+
+if __name__ == '__main__':
+    Main()
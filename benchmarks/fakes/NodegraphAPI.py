@@ -0,0 +1,369 @@
+"""
+Minimal in-memory stand-in for Katana's NodegraphAPI.
+
+Only the calls made by the PassManager SuperTool are implemented, with the
+same names and argument order as the real API.
+"""
+from __future__ import absolute_import
+
+import re
+
+_nodes = {}
+_nameCounters = {}
+_references = re.compile(r"getNode\('([^']*)'\)\.getNodeName\(\)")
+# String literals, or 'node/param.path' references where '~' is the owner
+_expressionTokens = re.compile(r"\"[^\"]*\"|'[^']*'|(~|[A-Za-z_]\w*)/([A-Za-z_][\w.]*)")
+_compiled = {}
+
+
+def _Compile(expression):
+    """Compile a '=...' expression once, its references become _ref() calls."""
+    code = _compiled.get(expression)
+    if code is None:
+        def Reference(match):
+            if match.group(1) is None:
+                return match.group(0)
+            return '_ref(%r, %r)' % (match.group(1), match.group(2))
+        source = _expressionTokens.sub(Reference, expression[1:])
+        code = _compiled[expression] = compile(source, expression, 'eval')
+    return code
+
+
+def _Evaluate(param, expression, time):
+    """
+    Evaluate an expression on every call, like Katana does on each graph
+    evaluation: every reference is looked up again.
+    """
+    def Reference(nodeName, path):
+        node = param.getNode() if nodeName == '~' else _nodes.get(nodeName)
+        target = node.getParameter(path) if node is not None else None
+        return target.getValue(time) if target is not None else ''
+    return eval(_Compile(expression), {'_ref': Reference})
+
+
+class Parameter(object):
+    def __init__(self, node, name, kind, value=None, parent=None):
+        self.__node = node
+        self.__name = name
+        self.__kind = kind
+        self.__value = value
+        self.__parent = parent
+        self.__children = []
+        self.__childrenByName = {}
+        self.__expression = None
+        self.__hints = ''
+
+    def getName(self):
+        return self.__name
+
+    def getNode(self):
+        return self.__node
+
+    def getParent(self):
+        return self.__parent
+
+    def getType(self):
+        return self.__kind
+
+    def getFullName(self):
+        if self.__parent is None or self.__parent.getParent() is None:
+            return self.__name
+        return self.__parent.getFullName() + '.' + self.__name
+
+    # Values
+
+    def getValue(self, time):
+        if self.__expression is not None:
+            match = _references.match(self.__expression)
+            if match:
+                node = _nodes.get(match.group(1))
+                return node.getName() if node is not None else ''
+            if self.__expression.startswith('='):
+                return _Evaluate(self, self.__expression, time)
+            return self.__expression
+        return self.__value
+
+    def setValue(self, value, time):
+        self.__expression = None
+        self.__value = value
+
+    def setExpression(self, expression):
+        self.__expression = expression
+
+    def setExpressionFlag(self, enabled):
+        if not enabled:
+            self.__expression = None
+
+    def getExpression(self):
+        return self.__expression
+
+    def isExpression(self):
+        return self.__expression is not None
+
+    def setHintString(self, hints):
+        self.__hints = hints
+
+    def getHintString(self):
+        return self.__hints
+
+    # Children
+
+    def __addChild(self, name, kind, value):
+        child = Parameter(self.__node, name, kind, value, self)
+        self.__children.append(child)
+        self.__childrenByName[name] = child
+        return child
+
+    def createChildGroup(self, name):
+        return self.__addChild(name, 'group', None)
+
+    def createChildString(self, name, value):
+        return self.__addChild(name, 'string', value)
+
+    def createChildNumber(self, name, value):
+        return self.__addChild(name, 'number', value)
+
+    def createChildStringArray(self, name, size):
+        array = self.__addChild(name, 'stringArray', None)
+        array.resizeArray(size)
+        return array
+
+    def getChildren(self):
+        return list(self.__children)
+
+    def getNumChildren(self):
+        return len(self.__children)
+
+    def getChild(self, name):
+        return self.__childrenByName.get(name)
+
+    def getChildByIndex(self, index):
+        return self.__children[index]
+
+    def deleteChild(self, child):
+        self.__children.remove(child)
+        del self.__childrenByName[child.getName()]
+
+    def resizeArray(self, size):
+        for child in self.__children[size:]:
+            del self.__childrenByName[child.getName()]
+        del self.__children[size:]
+        while len(self.__children) < size:
+            self.__addChild('i%d' % len(self.__children), 'string', '')
+
+
+def _IterParameters(param):
+    yield param
+    for child in param.getChildren():
+        for descendant in _IterParameters(child):
+            yield descendant
+
+
+class Port(object):
+    def __init__(self, node, name, isOutput):
+        self.__node = node
+        self.__name = name
+        self.__isOutput = isOutput
+        self.__connected = []
+
+    def getNode(self):
+        return self.__node
+
+    def getName(self):
+        return self.__name
+
+    def getConnectedPorts(self):
+        return list(self.__connected)
+
+    def connect(self, other):
+        if other not in self.__connected:
+            self.__connected.append(other)
+            other.connect(self)
+
+    def disconnect(self, other):
+        if other in self.__connected:
+            self.__connected.remove(other)
+            other.disconnect(self)
+
+
+class Node(object):
+    """Base of every fake node, state is set up in __new__ like a C++ wrapper."""
+
+    def __new__(cls, *args, **kwargs):
+        self = super().__new__(cls)
+        self._name = None
+        self._type = getattr(cls, 'nodeType', cls.__name__)
+        self._parent = None
+        self._children = []
+        self._inputs = []
+        self._outputs = []
+        self._sendPorts = {}
+        self._returnPorts = {}
+        self._bypassed = False
+        self._locked = False
+        self._params = Parameter(self, '', 'group')
+        return self
+
+    def _register(self, name, parent):
+        base = name
+        while name in _nodes:
+            index = _nameCounters[base] = _nameCounters.get(base, 1) + 1
+            name = '%s%d' % (base, index)
+        self._name = name
+        self._parent = parent
+        _nodes[name] = self
+        if parent is not None:
+            parent._children.append(self)
+
+    def getName(self):
+        return self._name
+
+    def setName(self, name):
+        oldName = self._name
+        del _nodes[self._name]
+        parent = self._parent
+        if parent is not None:
+            parent._children.remove(self)
+        self._register(name, parent)
+        # Katana follows renames in getNode() references, not in parameter paths
+        old = "getNode(%r)" % oldName
+        for node in _nodes.values():
+            for param in _IterParameters(node.getParameters()):
+                expression = param.getExpression()
+                if expression and old in expression:
+                    param.setExpression(expression.replace(old, "getNode(%r)" % self._name))
+        return self._name
+
+    def getType(self):
+        return self._type
+
+    def getParent(self):
+        return self._parent
+
+    def getChildren(self):
+        return list(self._children)
+
+    def delete(self):
+        for port in self._inputs + self._outputs:
+            for other in port.getConnectedPorts():
+                port.disconnect(other)
+        if self._parent is not None:
+            self._parent._children.remove(self)
+        _nodes.pop(self._name, None)
+
+    def isLocked(self):
+        return self._locked
+
+    def setBypassed(self, bypassed):
+        self._bypassed = bypassed
+
+    def isBypassed(self):
+        return self._bypassed
+
+    def getParameters(self):
+        return self._params
+
+    def getParameter(self, path):
+        param = self._params
+        for name in path.split('.'):
+            param = param.getChild(name)
+            if param is None:
+                return None
+        return param
+
+    def addInputPort(self, name):
+        port = Port(self, name, False)
+        self._inputs.append(port)
+        self._sendPorts[name] = Port(self, name, True)
+        return port
+
+    def addOutputPort(self, name):
+        port = Port(self, name, True)
+        self._outputs.append(port)
+        self._returnPorts[name] = Port(self, name, False)
+        return port
+
+    def getInputPortByIndex(self, index):
+        return self._inputs[index]
+
+    def getOutputPortByIndex(self, index):
+        return self._outputs[index]
+
+    def getOutputPort(self, name):
+        for port in self._outputs:
+            if port.getName() == name:
+                return port
+        return None
+
+    def getSendPort(self, name):
+        return self._sendPorts[name]
+
+    def getReturnPort(self, name):
+        return self._returnPorts[name]
+
+
+class SuperTool(Node):
+    def hideNodegraphGroupControls(self):
+        pass
+
+
+class _Merge(Node):
+    nodeType = 'Merge'
+
+    def __init__(self):
+        self.addOutputPort('out')
+
+
+class _LocationCreate(Node):
+    nodeType = 'LocationCreate'
+
+    def __init__(self):
+        self.addOutputPort('out')
+        self._params.createChildStringArray('locations', 1)
+        self._params.createChildString('type', 'group')
+
+
+class _OpScript(Node):
+    nodeType = 'OpScript'
+
+    def __init__(self):
+        self.addInputPort('i0')
+        self.addOutputPort('out')
+        self._params.createChildString('CEL', '')
+        self._params.createChildGroup('script').createChildString('lua', '')
+
+
+_nodeTypes = {'Merge': _Merge, 'LocationCreate': _LocationCreate, 'OpScript': _OpScript}
+
+
+def RegisterNodeType(name, cls):
+    _nodeTypes[name] = cls
+
+
+def CreateNode(nodeType, parent=None):
+    node = _nodeTypes[nodeType]()
+    node._type = nodeType
+    node._register(nodeType, parent)
+    return node
+
+
+def GetNode(name):
+    return _nodes.get(name)
+
+
+def GetAllNodesByType(nodeType):
+    return [node for node in _nodes.values() if node.getType() == nodeType]
+
+
+def SetNodePosition(node, position):
+    node._position = position
+
+
+def GetRootNode():
+    return None
+
+
+def Reset():
+    """Forget every node, between benchmark runs."""
+    _nodes.clear()
+    _nameCounters.clear()
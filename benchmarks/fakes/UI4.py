@@ -0,0 +1,30 @@
+"""Minimal stand-in for Katana's UI4 module, built on PyQt5 widgets."""
+from __future__ import absolute_import
+
+import types
+
+from PyQt5 import QtGui, QtWidgets
+
+
+class ToolbarButton(QtWidgets.QToolButton):
+    def __init__(self, toolTip='', parent=None, normalPixmap=None, rolloverPixmap=None):
+        super().__init__(parent)
+        self.setToolTip(toolTip)
+        if normalPixmap is not None:
+            self.setIcon(QtGui.QIcon(normalPixmap))
+
+
+class VBoxLayoutResizer(QtWidgets.QWidget):
+    def __init__(self, widget, height=None, parent=None):
+        super().__init__(parent)
+
+
+class IconManager(object):
+    @staticmethod
+    def GetPixmap(path):
+        return QtGui.QPixmap(path)
+
+
+Widgets = types.SimpleNamespace(ToolbarButton=ToolbarButton,
+                                VBoxLayoutResizer=VBoxLayoutResizer)
+Util = types.SimpleNamespace(IconManager=IconManager)
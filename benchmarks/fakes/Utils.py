@@ -0,0 +1,35 @@
+"""Minimal in-memory stand-in for Katana's Utils module."""
+from __future__ import absolute_import
+
+
+class UndoStack(object):
+    groups = 0
+    captureDisabled = 0
+
+    @classmethod
+    def OpenGroup(cls, name):
+        cls.groups += 1
+
+    @classmethod
+    def CloseGroup(cls):
+        pass
+
+    @classmethod
+    def DisableCapture(cls):
+        cls.captureDisabled += 1
+
+    @classmethod
+    def EnableCapture(cls):
+        cls.captureDisabled -= 1
+
+
+class EventModule(object):
+    handlers = []
+
+    @classmethod
+    def RegisterCollapsedHandler(cls, handler, eventType, eventID=None):
+        cls.handlers.append((handler, eventType, eventID))
+
+    @classmethod
+    def QueueEvent(cls, eventType, eventID, **kwargs):
+        pass
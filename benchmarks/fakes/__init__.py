@@ -0,0 +1,31 @@
+"""
+Fake Katana modules for running the PassManager SuperTool outside Katana.
+
+Call Install() before importing PassManager: it registers stand-ins for
+'Katana', 'Katana.NodegraphAPI', 'Utils' and, when PyQt5 is available, 'UI4'.
+"""
+from __future__ import absolute_import
+
+import sys
+import types
+
+
+def Install():
+    """Register the fake modules and return True if the UI fakes are available."""
+    from . import NodegraphAPI, Utils
+
+    katana = types.ModuleType('Katana')
+    katana.NodegraphAPI = NodegraphAPI
+    katana.Utils = Utils
+    sys.modules['Katana'] = katana
+    sys.modules['Katana.NodegraphAPI'] = NodegraphAPI
+    sys.modules['NodegraphAPI'] = NodegraphAPI
+    sys.modules['Utils'] = Utils
+
+    try:
+        from . import UI4
+    except ImportError:
+        return False
+    katana.UI4 = UI4
+    sys.modules['UI4'] = UI4
+    return True
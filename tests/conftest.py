@@ -0,0 +1,39 @@
+"""
+Tests run without Katana: the stand-in modules of benchmarks/fakes are
+installed before PassManager is imported.
+"""
+from __future__ import absolute_import
+
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'benchmarks'))
+
+import fakes  # noqa: E402
+
+fakes.Install()
+
+from fakes import NodegraphAPI  # noqa: E402
+from PassManager import v1 as PassManager  # noqa: E402
+
+NodegraphAPI.RegisterNodeType('PassManager', PassManager.PassManagerNode)
+
+
+@pytest.fixture
+def nodegraph():
+    """An empty fake node graph, emptied again after the test."""
+    NodegraphAPI.Reset()
+    yield NodegraphAPI
+    NodegraphAPI.Reset()
+
+
+@pytest.fixture(scope='session')
+def qapp():
+    """The QApplication of the Qt tests, on the offscreen platform."""
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    QtWidgets = pytest.importorskip('PyQt5.QtWidgets')
+    return QtWidgets.QApplication.instance() or QtWidgets.QApplication([])
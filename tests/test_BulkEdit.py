@@ -0,0 +1,128 @@
+from __future__ import absolute_import
+
+import pytest
+
+from PassManager.v1.PassModel import PassModelError
+from PassManager.v1.BulkEdit import ParsePassQuery, FindPasses, BulkEdit
+
+
+class _Node(object):
+    def __init__(self, name):
+        self.name = name
+
+    def getName(self):
+        return self.name
+
+
+def _Matches(query, record, settings=None, node='PassManager1'):
+    return ParsePassQuery(query).matches(_Node(node), record, settings)
+
+
+@pytest.fixture
+def record():
+    from PassManager.v1.PassModel import PassModel
+    model = PassModel()
+    return model.addPass('bty', 'char', 3, settings={'renderQuality': 2,
+                                                     'camera': '/root/world/cam/shot'})
+
+
+def test_query_operators(record):
+    assert _Matches('', record)
+    assert _Matches('type bty', record)
+    assert _Matches('all passes of type bty', record)
+    assert _Matches('type = bty where iteration > 2', record)
+    assert not _Matches('type bty and iteration >= 4', record)
+    assert _Matches('iteration <= 3 and iteration != 4', record)
+    assert _Matches('name ~ ch*', record)
+    assert _Matches('camera = "/root/world/cam/*"', record)
+    assert _Matches('renderQuality = 2 and enabled = true', record)
+    assert not _Matches('enabled = no', record)
+
+
+@pytest.mark.parametrize('query', [
+    'node PassManager1',
+    'node = PassManager*',
+    'type bty',
+    'name = char',
+    'iteration 3',
+    'enabled = on',
+    'pass bty_char_03',
+    'pass = bty_char_03',
+    'all passes of pass = bty_*',
+    'every pass bty_char_03',
+    'fullName = bty_char_03',
+    'renderQuality >= 2',
+    'denoise = 0',
+    'camera = /root/world/cam/shot',
+    'VisibilityON = ""',
+    'visible = ""',
+    'VisibilityOFF = ""',
+    'hide = ""',
+    'Holdout = ""',
+    'holdout = ""',
+    'Prune = ""',
+    'prune = ""',
+])
+def test_query_fields(record, query):
+    assert _Matches(query, record)
+
+
+def test_query_field_mismatch(record):
+    for query in ('pass bty_char_01', 'pass = rfl_*', 'node Other', 'name env',
+                  'iteration != 3', 'denoise 1', 'prune = /root/world'):
+        assert not _Matches(query, record), query
+
+
+def test_query_errors():
+    for query in ('type', 'colour = red', 'iteration = x', 'enabled = maybe',
+                  'type bty iteration 3', 'denoise = on'):
+        with pytest.raises(PassModelError):
+            ParsePassQuery(query)
+
+
+def test_BulkEdit_one_undo_group_and_skips_unchanged(nodegraph):
+    import Utils
+    node = nodegraph.CreateNode('PassManager')
+    node.addPasses(['bty_char_01', 'bty_char_02', 'rfl_env_01'])
+    groups = Utils.UndoStack.groups
+    assert BulkEdit('type bty', [node], denoise=1) == {node.getName(): 2}
+    assert Utils.UndoStack.groups == groups + 2
+    assert BulkEdit('type bty', [node], denoise=1) == {}
+    assert [record.fullName for _node, record in FindPasses('denoise = 1', [node])] == \
+        ['bty_char_01', 'bty_char_02']
+    with pytest.raises(PassModelError):
+        BulkEdit('type bty', [node], colour=1)
+
+
+class _IndexedOnly(object):
+    """A pass model that fails the test if a query scans every pass."""
+
+    def __init__(self, model):
+        self.model = model
+
+    def __iter__(self):
+        raise AssertionError('scanned every pass')
+
+    def __getattr__(self, name):
+        return getattr(self.model, name)
+
+
+def test_equalities_use_the_model_indexes():
+    from PassManager.v1.PassModel import PassModel
+    model = PassModel()
+    model.addPasses(['bty_char_01', 'bty_char_02', 'bty_env_01', 'rfl_char_01'])
+    indexed = _IndexedOnly(model)
+
+    def Names(query):
+        return sorted(record.fullName for record in ParsePassQuery(query).candidates(indexed)
+                      if ParsePassQuery(query).matches(_Node('PassManager1'), record))
+
+    assert Names('type bty') == ['bty_char_01', 'bty_char_02', 'bty_env_01']
+    assert Names('type bty and name char and iteration > 1') == ['bty_char_02']
+    assert Names('pass rfl_char_01') == ['rfl_char_01']
+    assert Names('pass rfl_char_09') == []
+    assert Names('type bty and type rfl') == []
+    with pytest.raises(AssertionError):
+        Names('name char')
+    assert [record.fullName for record in ParsePassQuery('type ~ b*').candidates(model)] == \
+        [record.fullName for record in model]
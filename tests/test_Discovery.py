@@ -0,0 +1,67 @@
+from __future__ import absolute_import
+
+import threading
+
+from PassManager.v1.Discovery import PassDiscovery
+from PassManager.v1.SceneGraph import LocalSceneGraph
+
+
+class _Scene(LocalSceneGraph):
+    """Records the threads the scene is cooked from."""
+
+    def __init__(self, locations):
+        LocalSceneGraph.__init__(self, locations)
+        self.threads = set()
+
+    def listChildren(self, location):
+        self.threads.add(threading.current_thread())
+        return LocalSceneGraph.listChildren(self, location)
+
+    def getPassSettings(self, location):
+        self.threads.add(threading.current_thread())
+        return LocalSceneGraph.getPassSettings(self, location)
+
+
+def _Scene200():
+    locations = {'/root/world/passes/bty_char_%02d' % index: {'denoise': index % 2}
+                 for index in range(1, 201)}
+    locations['/root/world/passes/notAPass'] = None
+    return _Scene(locations)
+
+
+def test_batches():
+    scene = _Scene200()
+    discovery = PassDiscovery(scene, batchSize=64, timeSlice=None)
+    discovery.start()
+    batches = discovery.takeBatches()
+    assert [len(batch) for batch in batches] == [64, 64, 64, 8]
+    assert discovery.isFinished() and discovery.count == 200
+    assert batches[0][0] == ('bty_char_01', {'denoise': 1})
+    assert scene.threads == {threading.main_thread()}
+    assert discovery.takeBatches() == []
+
+
+def test_time_slices_and_cancel():
+    discovery = PassDiscovery(_Scene200(), batchSize=10, timeSlice=0.0)
+    discovery.start()
+    # A zero time slice still cooks one location per call
+    assert discovery.takeBatches() == []
+    assert discovery.count == 1 and not discovery.isFinished()
+    for _ in range(9):
+        batches = discovery.takeBatches()
+    assert [len(batch) for batch in batches] == [10]
+    discovery.cancel()
+    assert discovery.takeBatches() == []
+    assert discovery.isFinished() and discovery.count == 10
+
+
+def test_errors_finish_the_discovery():
+    class _Broken(LocalSceneGraph):
+        def getPassSettings(self, location):
+            raise RuntimeError('cook failed')
+
+    discovery = PassDiscovery(_Broken({'/root/world/passes/bty_char_01': None}))
+    discovery.start()
+    discovery.wait()
+    assert discovery.isFinished()
+    assert isinstance(discovery.error, RuntimeError)
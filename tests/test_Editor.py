@@ -0,0 +1,54 @@
+from __future__ import absolute_import
+
+import pytest
+
+pytest.importorskip('PyQt5.QtWidgets')
+from PyQt5 import QtWidgets  # noqa: E402
+
+from PassManager.v1 import Editor  # noqa: E402
+from PassManager.v1.SceneGraph import KatanaSceneGraphProvider  # noqa: E402
+
+
+@pytest.fixture
+def editor(qapp, nodegraph, monkeypatch):
+    # The stand-in Katana has no FnGeolib to cook the upstream scene with
+    monkeypatch.setattr(KatanaSceneGraphProvider, 'prepare', lambda self: None)
+    monkeypatch.setattr(Editor, 'EXPAND_PASS_LIMIT', 5)
+    node = nodegraph.CreateNode('PassManager')
+    node.addPasses([{'type': passType, 'name': name}
+                    for passType in ('bty', 'shdw') for name in ('char', 'env')
+                    for _ in range(3)])
+    widget = Editor.PassManagerEditor(None, node)
+    yield widget
+    widget.deleteLater()
+
+
+def _ExpandedNames(widget):
+    view = widget.findChild(QtWidgets.QTreeView)
+    model = view.model()
+    names = []
+    for typeRow in range(model.rowCount()):
+        typeIndex = model.index(typeRow, 0)
+        assert view.isExpanded(typeIndex)
+        for nameRow in range(model.rowCount(typeIndex)):
+            index = model.index(nameRow, 0, typeIndex)
+            if view.isExpanded(index):
+                names.append('%s_%s' % (typeIndex.data(), index.data()))
+    return names
+
+
+def _Filter(widget, text):
+    lineEdit = [child for child in widget.findChildren(QtWidgets.QLineEdit)
+                if child.placeholderText() == 'Filter passes'][0]
+    lineEdit.setText(text)
+
+
+def test_filter_expands_name_rows_up_to_the_pass_limit(editor):
+    # Three passes per name row, only the first fits in five passes
+    assert _ExpandedNames(editor) == ['bty_char']
+    _Filter(editor, 'env')
+    assert _ExpandedNames(editor) == ['bty_env']
+    _Filter(editor, '01')
+    assert _ExpandedNames(editor) == ['bty_char', 'bty_env', 'shdw_char', 'shdw_env']
+    _Filter(editor, '')
+    assert _ExpandedNames(editor) == ['bty_char']
@@ -0,0 +1,63 @@
+from __future__ import absolute_import
+
+import json
+
+from PassManager.v1 import Presets
+from PassManager.v1.PassModel import PassModel
+from PassManager.v1.Inheritance import SettingsResolver
+from PassManager.v1 import ScriptActions as SA
+from PassManager.v1.NetworkSync import PASS_REF_PREFIX
+
+
+def test_inherited_settings():
+    model = PassModel()
+    base, variant, other = model.addPasses([
+        {'fullName': 'bty_char_01', 'denoise': 1, 'Prune': '/root/world/geo/a'},
+        {'fullName': 'bty_char_02', 'base': 'bty_char_01', 'Prune': ''},
+        {'fullName': 'rfl_char_01', 'base': 'bty_char_02', 'renderQuality': 2},
+    ])
+    resolver = SettingsResolver(model)
+    assert resolver.settings(other)['denoise'] == 1
+    assert resolver.settings(variant)['Prune'] == '/root/world/geo/a'
+    model.updateSettings('bty_char_01', denoise=0)
+    resolver.passChanged(base)
+    assert resolver.settings(other)['denoise'] == 0
+    assert resolver.settings(other)['renderQuality'] == 2
+
+
+def test_defaults_stay_under_base_values():
+    presets = {'bty': {'renderQuality': 1}, 'rfl': {'renderQuality': 2, 'denoise': 1}}
+    model = PassModel()
+    base, variant, plain = model.addPasses([
+        'bty_char_01',
+        {'fullName': 'rfl_char_01', 'base': 'bty_char_01'},
+        'rfl_env_01',
+    ])
+    resolver = SettingsResolver(model, lambda passType: presets.get(passType, {}))
+    assert resolver.settings(base)['renderQuality'] == 1
+    assert resolver.settings(plain)['renderQuality'] == 2
+    # A variant takes its base's presets, not the ones of its own type
+    assert resolver.settings(variant)['denoise'] == 0
+    model.updateSettings('bty_char_01', renderQuality=3)
+    resolver.passChanged(base)
+    assert resolver.settings(variant)['renderQuality'] == 3
+    assert variant.settings == {}
+
+
+def test_node_resolves_presets(nodegraph, tmp_path, monkeypatch):
+    path = tmp_path / 'studio.json'
+    path.write_text(json.dumps({'types': {'bty': {'renderQuality': 1}}}))
+    library = Presets.PresetLibrary([str(path)])
+    monkeypatch.setattr(Presets, '_sharedLibrary', library)
+
+    node = nodegraph.CreateNode('PassManager')
+    record, = node.addPasses(['bty_char_01'])
+    passNode = SA.GetRefNode(node, PASS_REF_PREFIX + str(record.id))
+    assert record.settings == {}
+    assert passNode.getParameter('user.renderQuality').getValue(0) == 1
+
+    path.write_text(json.dumps({'types': {'bty': {'renderQuality': 2, 'denoise': 1}}}))
+    library.refresh(force=True)
+    node.syncNetwork()
+    assert passNode.getParameter('user.renderQuality').getValue(0) == 2
+    assert passNode.getParameter('user.denoise').getValue(0) == 1
@@ -0,0 +1,58 @@
+from __future__ import absolute_import
+
+import io
+import json
+
+from PassManager.v1.PassModel import PassModel
+from PassManager.v1.PassStore import EncodePasses
+from PassManager.v1.Manifest import GetManifestTasks, IterManifestJobs, WriteManifest
+
+
+def _Table(specs):
+    model = PassModel()
+    model.addPasses(specs)
+    return EncodePasses(model)
+
+
+def _Tasks():
+    return [
+        ('PassManager1', _Table(
+            [{'fullName': 'bty_char_%02d' % index, 'enabled': index % 3 != 0}
+             for index in range(1, 12)]
+            + [{'fullName': 'rfl_char_01', 'base': 'bty_char_01', 'Prune': '/root/world/geo/a '},
+               {'fullName': 'bty_char_20', 'denoise': 1, 'Holdout': '((/root/world/geo/b))'}])),
+        ('PassManager2', ''),
+        ('PassManager3', _Table(['shdw_env_01'])),
+    ]
+
+
+def test_jobs():
+    jobs = list(IterManifestJobs(_Tasks(), processes=1))
+    assert [job['node'] for job in jobs] == ['PassManager1'] * 10 + ['PassManager3']
+    names = [job['pass'] for job in jobs]
+    assert names[:2] == ['bty_char_01', 'bty_char_02'] and 'bty_char_03' not in names
+    variant = jobs[names.index('rfl_char_01')]
+    assert variant == dict(variant, type='rfl', name='char', iteration=1,
+                           location='/root/world/passes/rfl_char_01',
+                           prune='/root/world/geo/a')
+    assert jobs[names.index('bty_char_20')]['holdout'] == '((/root/world/geo/b))'
+    assert set(variant) == {'node', 'pass', 'type', 'name', 'iteration', 'location',
+                            'renderQuality', 'denoise', 'camera', 'visible', 'hide',
+                            'holdout', 'prune'}
+
+
+def test_pool_chunks_match_in_process_jobs():
+    tasks = _Tasks()
+    assert list(IterManifestJobs(tasks, processes=2, chunkSize=3)) == \
+        list(IterManifestJobs(tasks, processes=1))
+
+
+def test_WriteManifest_and_tasks(nodegraph):
+    node = nodegraph.CreateNode('PassManager')
+    node.addPasses(['bty_char_01', 'bty_char_02'])
+    tasks = GetManifestTasks([node])
+    assert tasks == [(node.getName(), node.getParameter('passes').getValue(0))]
+    stream = io.StringIO()
+    assert WriteManifest(IterManifestJobs(tasks, processes=1), stream) == 2
+    lines = stream.getvalue().splitlines()
+    assert [json.loads(line)['pass'] for line in lines] == ['bty_char_01', 'bty_char_02']
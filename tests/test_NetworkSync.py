@@ -0,0 +1,70 @@
+from __future__ import absolute_import
+
+import re
+
+from PassManager.v1 import ScriptActions as SA
+from PassManager.v1.PassModel import PASS_ATTRIBUTE_NAMES
+from PassManager.v1.NetworkSync import (
+    GetOpScriptLua, PASS_REF_PREFIX, PER_PASS_MODE, TABLE_MODE, TABLE_REF_KEY)
+
+
+def test_per_pass_script_writes_every_pass_attribute():
+    """Mode 0 cooks the same passSettings as the table mode and the manifest."""
+    source = GetOpScriptLua()
+    mode0 = source[source.index('if mode == 0 then'):source.index('else')]
+    assert set(re.findall(r"gb:set\('(\w+)'", mode0)) == set(PASS_ATTRIBUTE_NAMES.values())
+    override = source[source.index('else'):]
+    for attribute in PASS_ATTRIBUTE_NAMES.values():
+        assert "'customAttributes.passSettings.%s'" % attribute in override
+
+
+def _TableRows(node):
+    table = SA.GetRefNode(node, TABLE_REF_KEY).getParameter('user.passTable')
+    return {row.getName(): row.getChild('denoise').getValue(0) for row in table.getChildren()}
+
+
+def _Locations(node):
+    param = SA.GetRefNode(node, 'locationCreate').getParameter('locations')
+    return [child.getValue(0) for child in param.getChildren()][1:]
+
+
+def test_table_mode_keeps_one_row_per_enabled_pass(nodegraph):
+    node = nodegraph.CreateNode('PassManager')
+    node.getParameter('networkMode').setValue(TABLE_MODE, 0)
+    node.addPasses(['bty_char_01', 'bty_char_02', 'rfl_env_01'])
+    model = node.getPassModel()
+    assert _TableRows(node) == {'bty_char_01': 0, 'bty_char_02': 0, 'rfl_env_01': 0}
+    assert SA.GetNodeReferenceParams(node, PASS_REF_PREFIX) == {}
+
+    model.renamePass('bty_char_02', 'shdw_char_01')
+    model.setEnabled('rfl_env_01', False)
+    model.updateSettings('bty_char_01', denoise=1)
+    assert _TableRows(node) == {'bty_char_01': 1, 'shdw_char_01': 0}
+    # The disabled pass's slot points back at the passes root until reused
+    assert _Locations(node) == ['/root/world/passes/bty_char_01',
+                                '/root/world/passes/shdw_char_01', '/root/world/passes']
+
+    # A row added behind the reconciler's back is only dropped by a full sync
+    model.deletePass('shdw_char_01')
+    node.getNetworkReconciler().invalidate()
+    table = SA.GetRefNode(node, TABLE_REF_KEY).getParameter('user.passTable')
+    table.createChildGroup('stale_row_01')
+    assert node.syncNetwork()['deleted'] == 1
+    assert _TableRows(node) == {'bty_char_01': 1}
+
+
+def test_switching_network_modes(nodegraph):
+    node = nodegraph.CreateNode('PassManager')
+    node.addPasses(['bty_char_01', 'rfl_env_01'])
+    assert sorted(SA.GetNodeReferenceParams(node, PASS_REF_PREFIX)) == ['1', '2']
+    assert SA.GetRefNode(node, TABLE_REF_KEY) is None
+
+    node.getParameter('networkMode').setValue(TABLE_MODE, 0)
+    node.syncNetwork()
+    assert SA.GetNodeReferenceParams(node, PASS_REF_PREFIX) == {}
+    assert sorted(_TableRows(node)) == ['bty_char_01', 'rfl_env_01']
+
+    node.getParameter('networkMode').setValue(PER_PASS_MODE, 0)
+    node.syncNetwork()
+    assert SA.GetRefNode(node, TABLE_REF_KEY) is None
+    assert sorted(SA.GetNodeReferenceParams(node, PASS_REF_PREFIX)) == ['1', '2']
@@ -0,0 +1,101 @@
+from __future__ import absolute_import
+
+from PassManager.v1 import Node
+from PassManager.v1 import ScriptActions as SA
+from PassManager.v1.NetworkSync import PASS_REF_PREFIX
+
+
+def _PassNodeIds(node):
+    return sorted(int(key) for key in SA.GetNodeReferenceParams(node, PASS_REF_PREFIX))
+
+
+def _Denoise(node, record):
+    passNode = SA.GetRefNode(node, PASS_REF_PREFIX + str(record.id))
+    return passNode.getParameter('user.denoise').getValue(0)
+
+
+def test_undo_reloads_passes_and_network(nodegraph):
+    node = nodegraph.CreateNode('PassManager')
+    node.addPasses(['bty_char_01', 'rfl_env_01'])
+    model = node.getPassModel()
+    record = model.getPass('bty_char_01')
+    passesParam = node.getParameter('passes')
+    stored = passesParam.getValue(0)
+
+    # The edit
+    model.updateSettings('bty_char_01', denoise=1)
+    added = model.addPass('bty', 'char')
+    assert _PassNodeIds(node) == [1, 2, added.id]
+    assert _Denoise(node, record) == 1
+
+    # What Katana's undo puts back, the parameter and the network
+    passesParam.setValue(stored, 0)
+    SA.GetRefNode(node, PASS_REF_PREFIX + str(added.id)).delete()
+    SA.RemoveNodeReferenceParam(node, 'node_' + PASS_REF_PREFIX + str(added.id))
+    SA.GetRefNode(node, PASS_REF_PREFIX + str(record.id)) \
+        .getParameter('user.denoise').setValue(0, 0)
+    Node._OnParameterSetValue([('parameter_setValue', None,
+                                {'node': node, 'param': passesParam})])
+
+    assert [record.fullName for record in model] == ['bty_char_01', 'rfl_env_01']
+    record = model.getPass('bty_char_01')
+    assert record.settings == {}
+    assert node.getSettingsResolver().settings(record)['denoise'] == 0
+
+    # The same edit again reaches the network
+    model.updateSettings('bty_char_01', denoise=1)
+    assert _Denoise(node, record) == 1
+    assert _PassNodeIds(node) == [1, 2]
+    assert passesParam.getValue(0) != stored
+    for record in model:
+        passNode = SA.GetRefNode(node, PASS_REF_PREFIX + str(record.id))
+        assert passNode.getParameter('CEL').getValue(0).endswith(record.fullName)
+
+
+def test_reloadPasses_ignores_own_writes(nodegraph):
+    node = nodegraph.CreateNode('PassManager')
+    node.addPasses(['bty_char_01'])
+    assert not node.reloadPasses()
+
+
+def test_upgrade_from_version_1(nodegraph):
+    from PassManager.v1.Upgrade import Upgrade, NeedsUpgrade, CURRENT_VERSION
+
+    node = nodegraph.CreateNode('PassManager')
+    root = node.getParameters()
+    # What the first release's __init__ created
+    for name in ('networkMode', 'literalValues', 'passes', 'node_merge',
+                 'node_locationCreate', 'node_opScript'):
+        root.deleteChild(node.getParameter(name))
+    user = [child for child in node.getChildren() if child.getType() == 'OpScript'][0] \
+        .getParameter('user')
+    user.deleteChild(user.getChild('mode'))
+    node.getParameter('version').setValue(1, 0)
+
+    assert NeedsUpgrade(node)
+    Upgrade(node)
+    assert node.getParameter('version').getValue(0) == CURRENT_VERSION == 2
+    for name in ('networkMode', 'literalValues', 'passes'):
+        assert node.getParameter(name) is not None
+    assert SA.GetRefNode(node, 'opScript').getParameter('user.mode') is not None
+    node.addPasses(['bty_char_01'])
+    assert node.getParameter('passes').getValue(0).startswith('1:')
+
+
+def test_undoGroup_syncs_once(nodegraph):
+    import Utils
+
+    node = nodegraph.CreateNode('PassManager')
+    node.addPasses(['bty_char_01', 'bty_char_02'])
+    groups = Utils.UndoStack.groups
+    stored = node.getParameter('passes').getValue(0)
+    with node.undoGroup('Edit') as model:
+        model.deletePass('bty_char_01')
+        duplicate = model.duplicatePass('bty_char_02')
+        model.setBase(duplicate.fullName, 'bty_char_02')
+        # Nothing reaches the node until the block ends
+        assert node.getParameter('passes').getValue(0) == stored
+        assert _PassNodeIds(node) == [1, 2]
+    assert Utils.UndoStack.groups == groups + 1
+    assert _PassNodeIds(node) == [2, duplicate.id]
+    assert node.getParameter('passes').getValue(0) != stored
@@ -0,0 +1,40 @@
+from __future__ import absolute_import
+
+from PassManager.v1.PassModel import PassModel
+from PassManager.v1.PassEdits import PassEditQueue, ApplyPassEdits
+
+
+def test_queue_collapses_edits_and_shows_pending_values():
+    model = PassModel()
+    first, second = model.addPasses(['bty_char_01', 'bty_char_02'])
+    queue = PassEditQueue()
+    queue.setEnabled(second, False)
+    queue.renamePass(first, 'bty_char_05')
+    queue.setEnabled(first, False)
+    queue.setEnabled(first, True)
+    queue.updateSettings(first, denoise=1)
+    assert len(queue) == 2
+    assert queue.pendingEnabled(second) is False
+    assert queue.pendingName(first) == 'bty_char_05'
+    assert queue.pendingName(second) == 'bty_char_02'
+
+    edits = queue.take()
+    assert len(queue) == 0
+    assert queue.pendingEnabled(second) is True
+    assert [edit.record for edit in edits] == [second, first]
+    assert ApplyPassEdits(model, edits) == 2
+    assert (first.fullName, first.enabled, first.settings) == ('bty_char_05', True, {'denoise': 1})
+    assert second.enabled is False
+
+
+def test_edits_of_deleted_or_refused_passes_are_dropped():
+    model = PassModel()
+    first, second, third = model.addPasses(['bty_char_01', 'bty_char_02', 'bty_char_03'])
+    queue = PassEditQueue()
+    queue.setEnabled(first, False)
+    queue.renamePass(second, 'bty_char_03')
+    queue.setEnabled(third, False)
+    model.deletePass('bty_char_01')
+    assert ApplyPassEdits(model, queue.take()) == 1
+    assert second.fullName == 'bty_char_02'
+    assert third.enabled is False
@@ -0,0 +1,200 @@
+from __future__ import absolute_import
+
+import pytest
+
+from PassManager.v1.PassModel import (
+    PassModel, PassModelError, IterationAllocator, FormatPassName, ParsePassName, CoerceSetting)
+
+
+def test_ParsePassName():
+    assert ParsePassName('bty_char_01') == ('bty', 'char', 1)
+    assert ParsePassName('bty_big_char_12') == ('bty', 'big_char', 12)
+    assert FormatPassName('bty', 'char', 3) == 'bty_char_03'
+    for name in ('bty_char', 'bty_char_x', '_char_01', 'bty__01'):
+        with pytest.raises(PassModelError):
+            ParsePassName(name)
+
+
+def test_IterationAllocator_reuses_released_iterations_lowest_first():
+    allocator = IterationAllocator()
+    assert [allocator.allocate() for _ in range(4)] == [1, 2, 3, 4]
+    allocator.release(3)
+    allocator.release(2)
+    assert allocator.allocate() == 2
+    assert allocator.allocate() == 3
+    assert allocator.allocate() == 5
+
+
+def test_IterationAllocator_skips_reserved_iterations():
+    allocator = IterationAllocator()
+    allocator.reserve(2)
+    assert allocator.allocate() == 1
+    assert allocator.allocate() == 3
+    with pytest.raises(PassModelError):
+        allocator.reserve(3)
+    allocator.release(2)
+    # Releasing above the cursor does not queue the iteration twice
+    allocator.release(10)
+    assert allocator.allocate() == 2
+    assert allocator.allocate() == 4
+    assert len(allocator) == 4
+
+
+def test_addPass_allocates_and_indexes():
+    model = PassModel()
+    first = model.addPass('bty', 'char')
+    second = model.addPass('bty', 'char')
+    model.addPass('rfl', 'env', 5)
+    assert (first.fullName, second.fullName) == ('bty_char_01', 'bty_char_02')
+    assert len(model) == 3
+    assert 'rfl_env_05' in model
+    assert sorted(model.types()) == ['bty', 'rfl']
+    assert model.passesOf('bty', 'char') == [first, second]
+    with pytest.raises(PassModelError):
+        model.addPass('rfl', 'env', 5)
+
+
+def test_renamePass_compares_parsed_names():
+    model = PassModel()
+    first, second = model.addPasses(['bty_char_01', 'bty_char_02'])
+    events = []
+    model.addListener(lambda event, record, oldFullName: events.append(event))
+    with pytest.raises(PassModelError):
+        model.renamePass('bty_char_02', 'bty_char_1')
+    assert model.getPass('bty_char_02') is second
+    assert second.fullName == 'bty_char_02'
+    assert len(model) == 2
+    assert model.renamePass('bty_char_01', 'bty_char_1') is first
+    assert first.fullName == 'bty_char_01'
+    assert events == []
+    model.renamePass('bty_char_02', 'bty_char_3')
+    assert model.getPass('bty_char_03') is second
+
+
+def test_deletePass_frees_its_iteration():
+    model = PassModel()
+    for _ in range(3):
+        model.addPass('bty', 'char')
+    model.deletePass('bty_char_02')
+    assert model.addPass('bty', 'char').fullName == 'bty_char_02'
+    assert model.duplicatePass('bty_char_01').fullName == 'bty_char_04'
+
+
+def test_renamePass_reindexes():
+    model = PassModel()
+    record = model.addPass('bty', 'char')
+    model.addPass('bty', 'char')
+    model.renamePass('bty_char_01', 'bty_char_07')
+    assert model.getPass('bty_char_07') is record
+    assert 'bty_char_01' not in model
+    with pytest.raises(PassModelError):
+        model.renamePass('bty_char_07', 'bty_char_02')
+    assert model.addPass('bty', 'char').fullName == 'bty_char_01'
+
+
+def test_listeners_and_batch():
+    model = PassModel()
+    events = []
+    listener = lambda event, record, oldFullName: events.append((event, oldFullName))
+    model.addListener(listener)
+    record = model.addPass('bty', 'char')
+    model.renamePass(record.fullName, 'bty_char_02')
+    model.setEnabled('bty_char_02', False)
+    model.setEnabled('bty_char_02', False)
+    model.updateSettings('bty_char_02', denoise=1)
+    model.updateSettings('bty_char_02', denoise=1)
+    assert events == [(PassModel.ADDED, None), (PassModel.RENAMED, 'bty_char_01'),
+                      (PassModel.CHANGED, None), (PassModel.CHANGED, None)]
+    del events[:]
+    with model.batch():
+        with model.batch():
+            model.addPass('bty', 'char')
+        model.deletePass('bty_char_02')
+    assert events == [(PassModel.RESET, None)]
+    model.removeListener(listener)
+    model.addPass('bty', 'env')
+    assert len(events) == 1
+
+
+def test_addPasses_rolls_back_on_error():
+    model = PassModel()
+    model.addPass('bty', 'char')
+    with pytest.raises(PassModelError):
+        model.addPasses([{'type': 'rfl', 'name': 'env'}, 'bty_char_01'])
+    assert [record.fullName for record in model] == ['bty_char_01']
+    with pytest.raises(PassModelError):
+        model.addPasses([{'name': 'env'}])
+    assert len(model) == 1
+
+
+def test_addPasses_specs():
+    model = PassModel()
+    records = model.addPasses([
+        'bty_char_03',
+        {'fullName': 'rfl_env_02', 'enabled': 'off'},
+        {'type': 'shdw', 'name': 'fx', 'iteration': '4', 'base': 'bty_char_03',
+         'settings': {'denoise': 1}, 'camera': '/root/world/cam/shot'},
+    ])
+    assert [record.fullName for record in records] == ['bty_char_03', 'rfl_env_02', 'shdw_fx_04']
+    assert records[1].enabled is False
+    assert records[2].settings == {'denoise': 1, 'camera': '/root/world/cam/shot'}
+    assert model.baseOf(records[2]) is records[0]
+
+
+def test_CoerceSetting():
+    assert CoerceSetting('renderQuality', ' 2 ') == 2
+    assert CoerceSetting('denoise', 1.0) == 1
+    assert CoerceSetting('camera', '/root/world/cam/shot') == '/root/world/cam/shot'
+    with pytest.raises(PassModelError):
+        CoerceSetting('colour', 'red')
+    with pytest.raises(PassModelError):
+        CoerceSetting('denoise', 'on')
+
+
+def test_addPasses_coerces_spec_settings():
+    model = PassModel()
+    record, = model.addPasses([{'fullName': 'bty_char_01', 'renderQuality': '3',
+                                'settings': {'denoise': 1.0}}])
+    assert record.settings == {'renderQuality': 3, 'denoise': 1}
+    assert type(record.settings['denoise']) is int
+    with pytest.raises(PassModelError):
+        model.addPasses([{'fullName': 'bty_char_02', 'colour': 'red'}])
+    with pytest.raises(PassModelError):
+        model.addPasses([{'fullName': 'bty_char_02', 'settings': {'denoise': 'on'}}])
+    assert len(model) == 1
+
+
+def test_setBase_rejects_cycles():
+    model = PassModel()
+    model.addPasses(['bty_a_01', 'bty_b_01', 'bty_c_01'])
+    model.setBase('bty_b_01', 'bty_a_01')
+    model.setBase('bty_c_01', 'bty_b_01')
+    for base in ('bty_c_01', 'bty_b_01'):
+        with pytest.raises(PassModelError):
+            model.setBase('bty_a_01', base)
+    with pytest.raises(PassModelError):
+        model.setBase('bty_a_01', 'bty_a_01')
+    a = model.getPass('bty_a_01')
+    assert [record.fullName for record in model.descendantsOf(a)] == ['bty_b_01', 'bty_c_01']
+
+
+def test_deletePass_reparents_variants():
+    model = PassModel()
+    model.addPasses(['bty_a_01', 'bty_b_01', 'bty_c_01'])
+    model.setBase('bty_b_01', 'bty_a_01')
+    model.setBase('bty_c_01', 'bty_b_01')
+    model.deletePass('bty_b_01')
+    c = model.getPass('bty_c_01')
+    assert model.baseOf(c) is model.getPass('bty_a_01')
+    model.deletePass('bty_a_01')
+    assert model.baseOf(c) is None
+
+
+def test_restore_keeps_ids():
+    model = PassModel()
+    model.addPasses(['bty_a_01', 'bty_b_01'])
+    model.deletePass('bty_a_01')
+    copy = PassModel()
+    copy.restore(list(model))
+    assert [(record.id, record.fullName) for record in copy] == [(2, 'bty_b_01')]
+    assert copy.addPass('bty', 'c').id == 3
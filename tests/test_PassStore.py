@@ -0,0 +1,94 @@
+from __future__ import absolute_import
+
+import random
+
+import pytest
+
+from PassManager.v1 import PassStore
+from PassManager.v1.PassModel import PassModel, PassModelError
+from PassManager.v1.PassStore import EncodePasses, DecodePasses, PassTableEncoder
+
+
+def _Rows(records):
+    return sorted((record.id, record.fullName, record.enabled, record.settings, record.base)
+                  for record in records)
+
+
+def test_round_trip():
+    model = PassModel()
+    model.addPasses([
+        'bty_char_01',
+        {'fullName': 'rfl_env_03', 'enabled': False, 'Prune': '((/root/world/geo))'},
+        {'type': 'bty', 'name': 'char', 'base': 'bty_char_01', 'denoise': 1},
+    ])
+    text = EncodePasses(model)
+    assert _Rows(DecodePasses(text)) == _Rows(model)
+    assert EncodePasses(PassModel()) == ''
+    assert DecodePasses('') == []
+
+
+def test_decode_errors():
+    with pytest.raises(PassModelError):
+        DecodePasses('99:abc')
+    with pytest.raises(PassModelError):
+        DecodePasses('1:not base64!')
+
+
+def test_PassTableEncoder_matches_EncodePasses():
+    random.seed(7)
+    model = PassModel()
+    encoder = PassTableEncoder()
+
+    def Listener(event, record, oldFullName):
+        if event == PassModel.RESET:
+            encoder.passesReset()
+        elif event == PassModel.REMOVED:
+            encoder.passRemoved(record)
+        else:
+            encoder.passChanged(record)
+
+    model.addListener(Listener)
+    model.addPasses([{'type': 'bty', 'name': 'n%d' % (index % 5)} for index in range(30)])
+    for _ in range(200):
+        records = list(model)
+        record = random.choice(records)
+        action = random.randrange(5)
+        if action == 0:
+            model.deletePass(record.fullName)
+        elif action == 1:
+            model.duplicatePass(record.fullName)
+        elif action == 2:
+            model.setEnabled(record.fullName, not record.enabled)
+        elif action == 3:
+            model.updateSettings(record.fullName, renderQuality=random.randrange(3))
+        else:
+            model.addPass('rfl', 'n%d' % random.randrange(5))
+        assert encoder.encode(model) == EncodePasses(model)
+
+
+def test_node_decodes_its_passes_once_on_first_use(nodegraph, monkeypatch):
+    source = nodegraph.CreateNode('PassManager')
+    source.addPasses(['bty_char_01', {'fullName': 'rfl_env_01', 'denoise': 1}])
+    text = source.getParameter('passes').getValue(0)
+    decoded = []
+
+    def Decode(text):
+        decoded.append(text)
+        return DecodePasses(text)
+
+    monkeypatch.setattr(PassStore, 'DecodePasses', Decode)
+    node = nodegraph.CreateNode('PassManager')
+    node.getParameter('passes').setValue(text, 0)
+    # Nothing is decoded until the passes are asked for
+    assert not node.reloadPasses()
+    assert decoded == []
+    model = node.getPassModel()
+    assert decoded == [text]
+    assert _Rows(model) == _Rows(source.getPassModel())
+    assert node.getPassModel() is model and not node.reloadPasses()
+
+    # Edits write the table again without decoding it
+    model.setEnabled('bty_char_01', False)
+    stored = node.getParameter('passes').getValue(0)
+    assert decoded == [text]
+    assert [record.enabled for record in DecodePasses(stored)] == [False, True]
@@ -0,0 +1,125 @@
+from __future__ import absolute_import
+
+import pytest
+
+pytest.importorskip('PyQt5.QtTest')
+from PyQt5 import QtCore, QtTest  # noqa: E402
+
+from PassManager.v1.PassModel import PassModel  # noqa: E402
+from PassManager.v1.PassTreeModel import (  # noqa: E402
+    PassTreeModel, PassFilterProxyModel, ENABLE_COLUMN)
+from PassManager.v1.SearchIndex import PassSearchIndex  # noqa: E402
+
+
+def _Model():
+    model = PassModel()
+    model.addPasses([{'type': 'bty', 'name': 'char'}, {'type': 'bty', 'name': 'char'},
+                     {'type': 'bty', 'name': 'env'}, {'type': 'shdw', 'name': 'char'}])
+    return model
+
+
+def _Rows(model, parent=QtCore.QModelIndex()):
+    """The tree as nested (text, children) tuples."""
+    rows = []
+    for row in range(model.rowCount(parent)):
+        index = model.index(row, 0, parent)
+        rows.append((index.data(), _Rows(model, index)))
+    return rows
+
+
+def _Tested(model):
+    return QtTest.QAbstractItemModelTester(
+        model, QtTest.QAbstractItemModelTester.FailureReportingMode.Fatal)
+
+
+def test_tree_follows_model_edits(qapp):
+    passModel = _Model()
+    model = PassTreeModel(passModel)
+    tester = _Tested(model)
+    assert _Rows(model) == [
+        ('bty', [('char', [('bty_char_01', []), ('bty_char_02', [])]),
+                 ('env', [('bty_env_01', [])])]),
+        ('shdw', [('char', [('shdw_char_01', [])])])]
+
+    passModel.renamePass('bty_env_01', 'fx_smoke_01')
+    passModel.deletePass('shdw_char_01')
+    passModel.addPass('bty', 'char')
+    assert _Rows(model) == [
+        ('bty', [('char', [('bty_char_01', []), ('bty_char_02', []), ('bty_char_03', [])])]),
+        ('fx', [('smoke', [('fx_smoke_01', [])])])]
+    index = model.indexForRecord(passModel.getPass('fx_smoke_01'))
+    assert index.data() == 'fx_smoke_01'
+    assert model.parent(index) == model.indexForKey(('fx', 'smoke'))
+    assert not model.indexForKey(('shdw', 'char')).isValid()
+
+    with passModel.batch():
+        passModel.clear()
+        passModel.addPass('util', 'crowd')
+    assert _Rows(model) == [('util', [('crowd', [('util_crowd_01', [])])])]
+    assert tester is not None
+
+
+def test_enable_column_and_incoming_rows(qapp):
+    passModel = _Model()
+    incomingModel = PassModel()
+    incomingModel.addPass('bty', 'char', iteration=1)
+    model = PassTreeModel(passModel)
+    tester = _Tested(model)
+    model.setIncomingModel(incomingModel)
+    charIndex = model.indexForKey(('bty', 'char'))
+    assert [model.index(row, 0, charIndex).data() for row in range(3)] == [
+        'bty_char_01', 'bty_char_01', 'bty_char_02']
+    incoming = model.indexForRecord(incomingModel.getPass('bty_char_01'), ENABLE_COLUMN,
+                                    incoming=True)
+    assert model.isIncoming(incoming)
+    assert incoming.data(QtCore.Qt.CheckStateRole) is None
+    assert not model.flags(incoming) & QtCore.Qt.ItemIsUserCheckable
+    assert not model.setData(incoming, QtCore.Qt.Unchecked, QtCore.Qt.CheckStateRole)
+
+    record = passModel.getPass('bty_char_02')
+    local = model.indexForRecord(record, ENABLE_COLUMN)
+    assert model.flags(local) & QtCore.Qt.ItemIsUserCheckable
+    assert local.data(QtCore.Qt.CheckStateRole) == QtCore.Qt.Checked
+    assert model.setData(local, QtCore.Qt.Unchecked, QtCore.Qt.CheckStateRole)
+    assert not record.enabled
+    assert local.data(QtCore.Qt.CheckStateRole) == QtCore.Qt.Unchecked
+
+    # With a check handler the change is handed over instead of written
+    checked = []
+    model.setCheckHandler(lambda record, enabled: checked.append((record.fullName, enabled)))
+    assert model.setData(local, QtCore.Qt.Checked, QtCore.Qt.CheckStateRole)
+    assert checked == [('bty_char_02', True)] and not record.enabled
+
+    model.setIncomingModel(None)
+    assert model.rowCount(model.indexForKey(('bty', 'char'))) == 2
+    assert tester is not None
+
+
+def test_filter_shows_matches_and_their_parents(qapp):
+    passModel = _Model()
+    proxy = PassFilterProxyModel()
+    proxy.setSourceModel(PassTreeModel(passModel))
+    tester = _Tested(proxy)
+    search = PassSearchIndex(passModel)
+    assert proxy.passCounts() == [(('bty', 'char'), 2), (('bty', 'env'), 1),
+                                  (('shdw', 'char'), 1)]
+
+    proxy.setMatches(search.search('char 02'))
+    assert proxy.isFiltering()
+    assert _Rows(proxy) == [('bty', [('char', [('bty_char_02', [])])])]
+    assert proxy.passCounts() == [(('bty', 'char'), 1)]
+
+    proxy.setMatches(search.search('char'))
+    assert _Rows(proxy) == [
+        ('bty', [('char', [('bty_char_01', []), ('bty_char_02', [])])]),
+        ('shdw', [('char', [('shdw_char_01', [])])])]
+
+    # Passes added while filtering only show once the matches are set again
+    passModel.addPass('shdw', 'env')
+    proxy.setMatches(search.search('env'))
+    assert proxy.passCounts() == [(('bty', 'env'), 1), (('shdw', 'env'), 1)]
+
+    proxy.setMatches(None)
+    assert not proxy.isFiltering()
+    assert len(proxy.passCounts()) == 4
+    assert tester is not None
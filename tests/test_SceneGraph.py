@@ -0,0 +1,61 @@
+from __future__ import absolute_import
+
+from PassManager.v1 import SceneGraph
+from PassManager.v1.SceneGraph import KatanaSceneGraphProvider, LocalSceneGraph
+
+
+def _Edit(**kwargs):
+    SceneGraph._OnNodegraphChanged([('parameter_finalizeValue', None, kwargs)])
+
+
+def test_sceneHash_ignores_edits_inside_the_node(nodegraph):
+    upstream = nodegraph.CreateNode('Merge')
+    node = nodegraph.CreateNode('PassManager')
+    upstream.getOutputPort('out').connect(node.getInputPortByIndex(0))
+    other = nodegraph.CreateNode('PassManager')
+    provider = KatanaSceneGraphProvider(node)
+    otherProvider = KatanaSceneGraphProvider(other)
+    sceneHash = provider.sceneHash()
+    assert sceneHash[0] == upstream.getName()
+
+    node.addPasses(['bty_char_01', 'bty_char_02'])
+    for child in node.getChildren():
+        _Edit(node=child)
+    _Edit(node=node)
+    assert provider.sceneHash() == sceneHash
+    assert otherProvider.sceneHash() != (None, 0)
+
+    _Edit(node=upstream)
+    assert provider.sceneHash() != sceneHash
+    sceneHash = provider.sceneHash()
+    SceneGraph._OnNodegraphChanged([('port_connect', None,
+                                     {'nodeNameA': 'Gone', 'nodeNameB': node.getName()})])
+    assert provider.sceneHash() != sceneHash
+
+
+def test_LocalSceneGraph():
+    scene = LocalSceneGraph({'/root/world/geo/a': {'denoise': 1}, '/root/world/geo/b': None})
+    sceneHash = scene.sceneHash()
+    assert scene.listChildren('/root/world/geo') == ['a', 'b']
+    assert scene.locationExists('/root/world/geo/a')
+    assert not scene.locationExists('/root/world/geo/c')
+    assert scene.resolveCel('/root/world/geo/*') == ['/root/world/geo/a', '/root/world/geo/b']
+    assert scene.getPassSettings('/root/world/geo/a') == {'denoise': 1}
+    scene.addLocation('/root/world/geo/c')
+    assert scene.sceneHash() != sceneHash
+
+
+def test_new_provider_does_not_reuse_older_scene_hashes(nodegraph):
+    from PassManager.v1.CelCache import CelResolutionCache
+
+    upstream = nodegraph.CreateNode('Merge')
+    node = nodegraph.CreateNode('PassManager')
+    upstream.getOutputPort('out').connect(node.getInputPortByIndex(0))
+    cache = CelResolutionCache()
+    first = KatanaSceneGraphProvider(node)
+    cache.resolve('((/root/a))', first.sceneHash(), lambda expression: ['/root/a'])
+
+    _Edit(node=upstream)
+    second = KatanaSceneGraphProvider(node)
+    assert second.sceneHash() == first.sceneHash()
+    assert cache.peek('((/root/a))', second.sceneHash()) is None
@@ -0,0 +1,43 @@
+from __future__ import absolute_import
+
+from PassManager.v1.PassModel import PassModel
+from PassManager.v1.SearchIndex import PassSearchIndex
+
+
+def _Names(records):
+    return sorted(record.fullName for record in records)
+
+
+def _Model():
+    model = PassModel()
+    model.addPasses([{'type': 'bty', 'name': 'char'}, {'type': 'bty', 'name': 'char'},
+                     {'type': 'bty', 'name': 'big_env'}, {'type': 'shdw', 'name': 'char'}])
+    return model
+
+
+def test_search_matches_every_term_as_a_prefix():
+    index = PassSearchIndex(_Model())
+    assert index.search('') is None
+    assert index.search('   ') is None
+    assert _Names(index.search('bty')) == ['bty_big_env_01', 'bty_char_01', 'bty_char_02']
+    assert _Names(index.search('BTY ch 02')) == ['bty_char_02']
+    assert _Names(index.search('char_01')) == ['bty_char_01', 'shdw_char_01']
+    # The parts of a name with underscores are tokens of their own
+    assert _Names(index.search('env')) == ['bty_big_env_01']
+    assert _Names(index.search('2')) == ['bty_char_02']
+    assert index.search('ty') == []
+    assert index.search('bty zzz') == []
+
+
+def test_search_follows_model_changes():
+    model = _Model()
+    index = PassSearchIndex(model)
+    model.renamePass('bty_char_02', 'fx_smoke_01')
+    model.deletePass('shdw_char_01')
+    assert _Names(index.search('char')) == ['bty_char_01']
+    assert _Names(index.search('smo')) == ['fx_smoke_01']
+    model.clear()
+    assert len(index) == 0 and index.search('bty') == []
+    with model.batch():
+        model.addPass('util', 'crowd')
+    assert _Names(index.search('crowd')) == ['util_crowd_01']
@@ -0,0 +1,60 @@
+from __future__ import absolute_import
+
+import threading
+
+from PassManager.v1.PassModel import PassModel
+from PassManager.v1.SceneGraph import LocalSceneGraph
+from PassManager.v1.CelCache import CelResolutionCache
+from PassManager.v1.Validation import PassValidator, CheckCelSyntax
+
+
+class _MainThreadScene(LocalSceneGraph):
+    """Fails the test if a worker calls into the scene."""
+
+    def __init__(self, locations):
+        LocalSceneGraph.__init__(self, locations)
+        self.calls = []
+
+    def __check(self, name):
+        assert threading.current_thread() is threading.main_thread(), name
+        self.calls.append(name)
+
+    def listChildren(self, location):
+        self.__check('listChildren')
+        return LocalSceneGraph.listChildren(self, location)
+
+    def locationExists(self, location):
+        self.__check('locationExists')
+        return LocalSceneGraph.locationExists(self, location)
+
+    def resolveCel(self, expression):
+        self.__check('resolveCel')
+        return LocalSceneGraph.resolveCel(self, expression)
+
+
+def test_CheckCelSyntax():
+    assert CheckCelSyntax('') is None
+    assert CheckCelSyntax('(/root/world/geo/a + /root/world/geo/b) - /$hero') is None
+    assert CheckCelSyntax('(/root/world/geo') is not None
+    assert CheckCelSyntax('+ /root/world') is not None
+    assert CheckCelSyntax('root/world') is not None
+
+
+def test_scene_checks_run_on_the_calling_thread():
+    scene = _MainThreadScene({'/root/world/cam/camera': None, '/root/world/geo/a': None,
+                              '/root/world/passes/bty_char_02': None})
+    model = PassModel()
+    model.addPasses([{'fullName': 'bty_char_%02d' % index, 'VisibilityON': '/root/world/geo/a'}
+                     for index in range(1, 200)])
+    model.addPasses([{'fullName': 'bty_env_01', 'camera': '/root/world/cam/missing',
+                      'Prune': '/root/world/geo/b'}])
+    validator = PassValidator(model, provider=scene, celCache=CelResolutionCache(), maxWorkers=4)
+    results = validator.validate()
+    validator.shutdown()
+
+    # Each value is looked up once, however many passes use it
+    assert scene.calls.count('locationExists') == 2
+    assert scene.calls.count('resolveCel') == 2
+    assert set(results) == {model.getPass('bty_char_02').id, model.getPass('bty_env_01').id}
+    checks = sorted(issue.check for issue in results[model.getPass('bty_env_01').id])
+    assert checks == ['camera', 'collection']